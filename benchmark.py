@@ -0,0 +1,535 @@
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import simpy
+import config
+from src.simulation import PaintShopSimulation
+from src.fast_engine import FastLineSimulation, validate_against_simpy
+from src.event_engine import EventLineSimulation, validate_event_engine
+from src.farm import FarmCoordinator, start_local_workers
+from src.variates import distribution_mean
+from src.replication import run_replications
+from src.scenario import Scenario
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+LOG_LEVELS = ["DETAILED", "SUMMARY", "MINIMAL", "OFF"]
+STAGE_COUNTS = [3, 6, 12, 24]
+
+# Suite scenarios: horizon name -> number of shifts, line name -> station list
+SUITE_HORIZONS = {"shift": 1, "week": 7 * config.SHIFTS_PER_DAY, "month": 30 * config.SHIFTS_PER_DAY}
+SUITE_REPLICATIONS = [1, 10, 100]
+SUITE_LINES = {"overloaded": config.LINE_STATIONS, "balanced": config.BALANCED_LINE_STATIONS}
+
+
+def synthetic_line(num_stages):
+    """
+    Build a balanced line of identical single-machine stages.
+
+    Each stage takes 6-9 minutes against 8-12 minute arrivals (about 75%
+    utilization), so queues stay bounded whatever the number of stages.
+    """
+    return [(f"Stage{number}", 1, ("uniform", 6, 9)) for number in range(1, num_stages + 1)]
+
+
+def benchmark_logging(replications=50):
+    """
+    Measure simulation speed at each log level.
+
+    Args:
+        replications (int): Number of simulation runs per log level
+
+    Returns:
+        list: One dict per log level with events, wall time and events/sec
+    """
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        log_path = os.path.join(tmp_dir, "benchmark_log.txt")
+
+        for level in LOG_LEVELS:
+            events = 0
+            start = time.perf_counter()
+            for _ in range(replications):
+                sim = PaintShopSimulation(log_level=level, log_path=log_path, verbose=False)
+                sim.run()
+                events += sim.logger.events_offered
+            elapsed = time.perf_counter() - start
+
+            rows.append({
+                'level': level,
+                'events': events,
+                'wall_time': elapsed,
+                'events_per_sec': events / elapsed if elapsed > 0 else 0
+            })
+
+    return rows
+
+
+def print_logging_benchmark(rows):
+    """Print the logging benchmark as a table"""
+    print("\n" + "=" * 80)
+    print("LOGGING BENCHMARK")
+    print("=" * 80)
+    print(f"{'Level':<12}{'Events':>12}{'Wall time (s)':>16}{'Events/sec':>16}")
+    for row in rows:
+        print(f"{row['level']:<12}{row['events']:>12}{row['wall_time']:>16.3f}{row['events_per_sec']:>16,.0f}")
+    print("=" * 80)
+
+
+def benchmark_engines(replications=100, long_cars=100000):
+    """
+    Compare the SimPy engine with the vectorized fast engine.
+
+    One-shift runs are dominated by per-run setup, so the fast engine's
+    advantage there is modest; the long-horizon case (one run of about
+    long_cars cars on the stable BALANCED_LINE_STATIONS layout) shows the
+    per-car cost, which is what matters for very long runs.
+
+    Args:
+        replications (int): Number of one-shift runs per engine
+        long_cars (int): Cars in the long-horizon run (0 = skip it)
+
+    Returns:
+        dict: Wall time per engine, speedup and whether both engines agreed
+            on identical draws, for one-shift runs and for the long run
+    """
+    start = time.perf_counter()
+    for seed in range(replications):
+        PaintShopSimulation(seed=seed, log_level="OFF", verbose=False).run()
+    simpy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for seed in range(replications):
+        FastLineSimulation(seed=seed, keep_cars=False).run()
+    fast_time = time.perf_counter() - start
+
+    row = {
+        'replications': replications,
+        'simpy_time': simpy_time,
+        'fast_time': fast_time,
+        'speedup': simpy_time / fast_time if fast_time > 0 else 0,
+        'validated': all(validate_against_simpy(seed)['match'] for seed in range(10)),
+        'long_cars': 0
+    }
+
+    if long_cars:
+        base = Scenario.from_config().replace(stations=config.BALANCED_LINE_STATIONS)
+        horizon = long_cars * distribution_mean(base.arrival_distribution)
+        scenario = base.replace(simulation_time=horizon, acceptance_time=horizon)
+
+        start = time.perf_counter()
+        fast_results = FastLineSimulation(scenario, seed=0, keep_cars=False).run()
+        long_fast_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        simpy_results = PaintShopSimulation(scenario, seed=0, log_level="OFF", verbose=False, keep_cars=False).run()
+        long_simpy_time = time.perf_counter() - start
+
+        row.update({
+            'long_cars': fast_results['total_cars'],
+            'long_simpy_time': long_simpy_time,
+            'long_fast_time': long_fast_time,
+            'long_speedup': long_simpy_time / long_fast_time if long_fast_time > 0 else 0,
+            'long_validated': (fast_results['total_cars'] == simpy_results['total_cars'] and
+                               abs(fast_results['avg_system_time'] - simpy_results['avg_system_time']) < 1e-6)
+        })
+    return row
+
+
+def print_engine_benchmark(row):
+    """Print the engine comparison"""
+    print("\n" + "=" * 80)
+    print(f"ENGINE BENCHMARK ({row['replications']} one-shift replications)")
+    print("=" * 80)
+    print(f"SimPy engine:       {row['simpy_time']:.3f} s")
+    print(f"Fast NumPy engine:  {row['fast_time']:.3f} s")
+    print(f"Speedup:            {row['speedup']:.1f}x")
+    print(f"Identical draws agree: {'yes' if row['validated'] else 'NO'}")
+    if row['long_cars']:
+        print(f"\nLong horizon ({row['long_cars']:,} cars in one run, balanced line)")
+        print(f"SimPy engine:       {row['long_simpy_time']:.3f} s")
+        print(f"Fast NumPy engine:  {row['long_fast_time']:.3f} s")
+        print(f"Speedup:            {row['long_speedup']:.1f}x")
+        print(f"Identical draws agree: {'yes' if row['long_validated'] else 'NO'}")
+    print("=" * 80)
+
+
+def benchmark_event_core(replications=100, conformance_seeds=50):
+    """
+    Compare the heap-calendar engine with the SimPy engine, per line.
+
+    Both engines handle the same model events (arrivals, including the one
+    that closes acceptance, and service completions), so events/sec is
+    counted on the heap engine's calendar events for both. The conformance
+    check runs both engines on the same seeds and requires every car's times,
+    queue statistics and alerts to agree (see validate_event_engine()).
+
+    Args:
+        replications (int): One-shift runs per engine and line
+        conformance_seeds (int): Seeds checked per line
+
+    Returns:
+        list: One dict per line with events, wall time and events/sec per
+            engine, speedup and conformance result
+    """
+    rows = []
+    for line_name, stations in SUITE_LINES.items():
+        events = 0
+        start = time.perf_counter()
+        for seed in range(replications):
+            sim = EventLineSimulation(seed=seed, log_level="OFF", verbose=False, stations=stations, keep_cars=False)
+            sim.run()
+            events += sim.events_processed
+        heap_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        for seed in range(replications):
+            PaintShopSimulation(seed=seed, log_level="OFF", verbose=False, stations=stations, keep_cars=False).run()
+        simpy_time = time.perf_counter() - start
+
+        rows.append({
+            'line': line_name,
+            'events': events,
+            'simpy_time': simpy_time,
+            'heap_time': heap_time,
+            'simpy_events_per_sec': events / simpy_time if simpy_time > 0 else 0,
+            'heap_events_per_sec': events / heap_time if heap_time > 0 else 0,
+            'speedup': simpy_time / heap_time if heap_time > 0 else 0,
+            'conforms': all(validate_event_engine(seed, stations=stations)['match']
+                            for seed in range(conformance_seeds))
+        })
+    return rows
+
+
+def print_event_core_benchmark(rows):
+    """Print the heap engine comparison as a table"""
+    print("\n" + "=" * 80)
+    print("EVENT CORE BENCHMARK (heapq calendar vs SimPy processes)")
+    print("=" * 80)
+    print(f"{'Line':<12}{'Events':>10}{'SimPy ev/s':>14}{'Heap ev/s':>14}{'Speedup':>10}{'Conforms':>10}")
+    for row in rows:
+        print(f"{row['line']:<12}{row['events']:>10}{row['simpy_events_per_sec']:>14,.0f}"
+              f"{row['heap_events_per_sec']:>14,.0f}{row['speedup']:>9.1f}x{'yes' if row['conforms'] else 'NO':>10}")
+    print("=" * 80)
+
+
+def benchmark_stages(replications=20, stage_counts=STAGE_COUNTS):
+    """
+    Measure how simulation speed scales with the number of stations.
+
+    Args:
+        replications (int): Number of simulation runs per line length
+        stage_counts (list): Line lengths to test
+
+    Returns:
+        list: One dict per line length with events, wall time and events/sec
+    """
+    rows = []
+    for num_stages in stage_counts:
+        line = synthetic_line(num_stages)
+        events = 0
+        start = time.perf_counter()
+        for seed in range(replications):
+            sim = PaintShopSimulation(seed=seed, log_level="OFF", verbose=False, stations=line)
+            sim.run()
+            events += sim.logger.events_offered
+        elapsed = time.perf_counter() - start
+
+        rows.append({
+            'stages': num_stages,
+            'events': events,
+            'wall_time': elapsed,
+            'events_per_sec': events / elapsed if elapsed > 0 else 0
+        })
+
+    return rows
+
+
+def print_stage_benchmark(rows):
+    """Print the stage scaling benchmark as a table"""
+    print("\n" + "=" * 80)
+    print("STAGE SCALING BENCHMARK")
+    print("=" * 80)
+    print(f"{'Stages':<12}{'Events':>12}{'Wall time (s)':>16}{'Events/sec':>16}{'µs/event':>12}")
+    for row in rows:
+        micros = 1e6 / row['events_per_sec'] if row['events_per_sec'] else 0
+        print(f"{row['stages']:<12}{row['events']:>12}{row['wall_time']:>16.3f}"
+              f"{row['events_per_sec']:>16,.0f}{micros:>12.2f}")
+    print("=" * 80)
+
+
+def peak_rss_mb():
+    """Peak resident set size of this process in MB (None where unsupported)"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and in kilobytes elsewhere
+    return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def run_suite_scenario(horizon, line, replications):
+    """
+    Time one suite scenario with fixed seeds 0..replications-1.
+
+    Runs in its own process (see benchmark_suite()) so the peak RSS belongs
+    to this scenario alone. Timing runs without tracemalloc; the Python heap
+    peak is then measured on a separate traced run of seed 0, because tracing
+    slows the simulation several times over.
+
+    Args:
+        horizon (str): Key of SUITE_HORIZONS
+        line (str): Key of SUITE_LINES
+        replications (int): Number of replications to run back to back
+
+    Returns:
+        dict: Scenario result row
+    """
+    num_shifts = SUITE_HORIZONS[horizon]
+    stations = SUITE_LINES[line]
+
+    def run_once(seed):
+        sim = PaintShopSimulation(seed=seed, log_level="OFF", verbose=False, stations=stations, keep_cars=False)
+        for _ in sim.run_shifts(num_shifts):
+            pass
+        return sim
+
+    rss_before = peak_rss_mb()
+    events = 0
+    cars = 0
+    start = time.perf_counter()
+    for seed in range(replications):
+        sim = run_once(seed)
+        events += sim.logger.events_offered
+        cars += sim.system_time_stats.count
+    elapsed = time.perf_counter() - start
+    rss_after = peak_rss_mb()
+
+    tracemalloc.start()
+    run_once(0)
+    _, traced_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        'scenario': f"{line}-{horizon}-x{replications}",
+        'line': line,
+        'horizon': horizon,
+        'shifts': num_shifts,
+        'replications': replications,
+        'events': events,
+        'cars': cars,
+        'wall_time': elapsed,
+        'events_per_sec': events / elapsed if elapsed > 0 else 0,
+        'cars_per_sec': cars / elapsed if elapsed > 0 else 0,
+        'peak_rss_mb': rss_after,
+        'rss_growth_mb': rss_after - rss_before if rss_after is not None else None,
+        'tracemalloc_peak_mb': traced_peak / 2 ** 20
+    }
+
+
+def benchmark_suite(max_replications=max(SUITE_REPLICATIONS)):
+    """
+    Run every horizon x replication count x line scenario.
+
+    Each scenario gets a fresh process, so memory figures are not inflated
+    by earlier scenarios and imports are the same for all of them.
+
+    Args:
+        max_replications (int): Skip scenarios with more replications than this
+
+    Returns:
+        dict: Environment metadata and one row per scenario
+    """
+    rows = []
+    context = multiprocessing.get_context("spawn")
+    for line in SUITE_LINES:
+        for horizon in SUITE_HORIZONS:
+            for replications in SUITE_REPLICATIONS:
+                if replications > max_replications:
+                    continue
+                with ProcessPoolExecutor(max_workers=1, mp_context=context) as executor:
+                    row = executor.submit(run_suite_scenario, horizon, line, replications).result()
+                print(f"  {row['scenario']:<30} {row['wall_time']:>9.3f} s", flush=True)
+                rows.append(row)
+
+    return {
+        'created': time.strftime("%Y-%m-%dT%H:%M:%S"),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'numpy': np.__version__,
+        'simpy': simpy.__version__,
+        'scenarios': rows
+    }
+
+
+def print_suite_benchmark(suite):
+    """Print the suite results as a table"""
+    print("\n" + "=" * 100)
+    print("BENCHMARK SUITE")
+    print("=" * 100)
+    print(f"{'Scenario':<30}{'Wall time (s)':>14}{'Events/sec':>14}{'Cars/sec':>12}"
+          f"{'Peak RSS (MB)':>15}{'Traced peak (MB)':>18}")
+    for row in suite['scenarios']:
+        rss = f"{row['peak_rss_mb']:.1f}" if row['peak_rss_mb'] is not None else "n/a"
+        print(f"{row['scenario']:<30}{row['wall_time']:>14.3f}{row['events_per_sec']:>14,.0f}"
+              f"{row['cars_per_sec']:>12,.0f}{rss:>15}{row['tracemalloc_peak_mb']:>18.2f}")
+    print("=" * 100)
+
+
+def compare_suites(baseline, current, tolerance=0.2):
+    """
+    Find scenarios whose throughput dropped compared with a baseline run.
+
+    Args:
+        baseline (dict): Earlier benchmark_suite() output (e.g. loaded from JSON)
+        current (dict): New benchmark_suite() output
+        tolerance (float): Allowed relative drop in events/sec before flagging
+
+    Returns:
+        list: (scenario, baseline events/sec, current events/sec) for each regression
+    """
+    previous = {row['scenario']: row for row in baseline['scenarios']}
+    regressions = []
+    for row in current['scenarios']:
+        old = previous.get(row['scenario'])
+        if old and row['events_per_sec'] < old['events_per_sec'] * (1 - tolerance):
+            regressions.append((row['scenario'], old['events_per_sec'], row['events_per_sec']))
+    return regressions
+
+
+def benchmark_farm(replications=200, worker_counts=(1, 2, 4), chunk_size=8):
+    """
+    Measure replication farm throughput on localhost, with one worker killed mid-run.
+
+    Each run serves both suite lines; after a quarter of the replications
+    the first worker is killed, so its chunks must be re-issued. The merged
+    summaries must equal run_replications() in one process, seed for seed.
+
+    Args:
+        replications (int): Replications per line
+        worker_counts (tuple): Local worker processes per run
+        chunk_size (int): Replications per chunk
+
+    Returns:
+        dict: 'serial_throughput' (replications/s in one process) and 'rows',
+            one dict per worker count with throughput, speedup, re-issued
+            chunks and conformance
+    """
+    scenarios = [Scenario.from_config().replace(stations=stations) for stations in SUITE_LINES.values()]
+
+    start = time.perf_counter()
+    expected = [run_replications(replications, base_seed=0, workers=1, scenario=scenario) for scenario in scenarios]
+    serial_throughput = replications * len(scenarios) / (time.perf_counter() - start)
+
+    rows = []
+    for count in worker_counts:
+        workers = []
+
+        def kill_first(progress):
+            if progress['replications_done'] >= progress['replications_total'] // 4 and workers[0].is_alive():
+                workers[0].kill()
+
+        coordinator = FarmCoordinator(scenarios, replications, base_seed=0, chunk_size=chunk_size, port=0,
+                                      on_progress=kill_first if count > 1 else None, progress_interval=0.2)
+        result = coordinator.run(lambda port: workers.extend(start_local_workers(count, port=port)))
+        for worker in workers:
+            worker.join()
+        rows.append({
+            'workers': count,
+            'throughput': result['throughput'],
+            'speedup': result['throughput'] / serial_throughput,
+            'reissued': result['reissued'],
+            'conforms': [job['summaries'] for job in result['scenarios']] == expected
+        })
+    return {'serial_throughput': serial_throughput, 'rows': rows}
+
+
+def print_farm_benchmark(result):
+    """Print the farm throughput table"""
+    print("\n" + "=" * 80)
+    print(f"REPLICATION FARM BENCHMARK (one process: {result['serial_throughput']:.1f} replications/s)")
+    print("=" * 80)
+    print(f"{'Workers':<10}{'Repl/s':>12}{'Speedup':>10}{'Re-issued':>12}{'Conforms':>10}")
+    for row in result['rows']:
+        print(f"{row['workers']:<10}{row['throughput']:>12.1f}{row['speedup']:>9.1f}x{row['reissued']:>12}"
+              f"{'yes' if row['conforms'] else 'NO':>10}")
+    print("=" * 80)
+
+
+def main():
+    """
+    Run a benchmark by name.
+
+    Usage: python benchmark.py logging [replications]
+           python benchmark.py engines [replications] [long_cars]
+           python benchmark.py event-core [replications]
+           python benchmark.py stages [replications]
+           python benchmark.py farm [replications]
+           python benchmark.py suite [max_replications] [baseline.json]
+
+    The suite writes its results to config.BENCHMARK_RESULTS_PATH and, given a
+    baseline file from an earlier version, lists scenarios that got slower.
+    """
+    args = sys.argv[1:]
+    name = args[0] if args else "logging"
+
+    if name == "logging":
+        replications = int(args[1]) if len(args) > 1 else 50
+        print_logging_benchmark(benchmark_logging(replications))
+    elif name == "engines":
+        replications = int(args[1]) if len(args) > 1 else 100
+        long_cars = int(args[2]) if len(args) > 2 else 100000
+        print_engine_benchmark(benchmark_engines(replications, long_cars))
+    elif name == "event-core":
+        replications = int(args[1]) if len(args) > 1 else 100
+        rows = benchmark_event_core(replications)
+        print_event_core_benchmark(rows)
+        if not all(row['conforms'] for row in rows):
+            sys.exit(1)
+    elif name == "farm":
+        replications = int(args[1]) if len(args) > 1 else 200
+        result = benchmark_farm(replications)
+        print_farm_benchmark(result)
+        if not all(row['conforms'] for row in result['rows']):
+            sys.exit(1)
+    elif name == "stages":
+        replications = int(args[1]) if len(args) > 1 else 20
+        print_stage_benchmark(benchmark_stages(replications))
+    elif name == "suite":
+        max_replications = int(args[1]) if len(args) > 1 else max(SUITE_REPLICATIONS)
+        baseline = None
+        if len(args) > 2:
+            with open(args[2]) as f:
+                baseline = json.load(f)
+
+        suite = benchmark_suite(max_replications)
+        print_suite_benchmark(suite)
+
+        os.makedirs(os.path.dirname(config.BENCHMARK_RESULTS_PATH), exist_ok=True)
+        with open(config.BENCHMARK_RESULTS_PATH, "w") as f:
+            json.dump(suite, f, indent=2)
+        print(f"Results saved to: {config.BENCHMARK_RESULTS_PATH}")
+
+        if baseline is not None:
+            regressions = compare_suites(baseline, suite)
+            for scenario, old, new in regressions:
+                print(f"REGRESSION {scenario}: {old:,.0f} -> {new:,.0f} events/sec")
+            if regressions:
+                sys.exit(1)
+    else:
+        print(f"Unknown benchmark: {name}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
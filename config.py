@@ -1,13 +1,19 @@
 # Configuration file for Paint Shop Simulation
 # All parameters in one place for easy modification
 
-import random
-
 # ============================================================================
 # SIMULATION TIMING PARAMETERS
 # ============================================================================
 SIMULATION_TIME = 480  # 8 hours in minutes
 NEW_CAR_ACCEPTANCE_TIME = 480  # Stop accepting new cars after 480 minutes
+MAX_DRAIN_TIME = 4800  # Safety cap: minutes allowed after acceptance closes for the line to empty
+
+# ============================================================================
+# SHIFT CALENDAR (multi-shift runs)
+# ============================================================================
+SHIFT_LENGTH = 480  # minutes
+SHIFTS_PER_DAY = 3  # Back to back from midnight
+SHIFT_BREAKS = [(120, 135), (240, 270), (360, 375)]  # (start, end) minutes into each shift; no new cars
 
 # ============================================================================
 # CAR ARRIVAL PARAMETERS
@@ -36,35 +42,66 @@ PAINTING_MACHINES = 1
 PAINTING_TIME_MIN = 30  # minutes
 PAINTING_TIME_MAX = 40  # minutes
 
+# ============================================================================
+# RANDOM DISTRIBUTIONS
+# ============================================================================
+# Each quantity is drawn from its own random stream. Supported specs:
+#   ("uniform", low, high), ("triangular", low, mode, high),
+#   ("lognormal", mean, std), ("empirical", [measured times ...])
+CAR_ARRIVAL_DISTRIBUTION = ("uniform", CAR_ARRIVAL_INTERVAL_MIN, CAR_ARRIVAL_INTERVAL_MAX)
+CLEANING_TIME_DISTRIBUTION = ("uniform", CLEANING_TIME_MIN, CLEANING_TIME_MAX)
+PRIMER_TIME_DISTRIBUTION = ("uniform", PRIMER_TIME_MIN, PRIMER_TIME_MAX)
+PAINTING_TIME_DISTRIBUTION = ("uniform", PAINTING_TIME_MIN, PAINTING_TIME_MAX)
+VARIATE_BLOCK_SIZE = 512  # Values per independently seeded block of a random stream (changes the draws)
+
+# ============================================================================
+# LINE LAYOUT
+# ============================================================================
+# Stations in processing order: (name, machines, processing time distribution).
+# Add, remove or reorder entries to model a different line.
+LINE_STATIONS = [
+    ("Cleaning", CLEANING_MACHINES, CLEANING_TIME_DISTRIBUTION),
+    ("Primer", PRIMER_MACHINES, PRIMER_TIME_DISTRIBUTION),
+    ("Painting", PAINTING_MACHINES, PAINTING_TIME_DISTRIBUTION),
+]
+
+# Same line with enough machines that every station stays below 90% utilization
+# (the default layout above is overloaded at Cleaning and Painting)
+BALANCED_LINE_STATIONS = [
+    ("Cleaning", 2, CLEANING_TIME_DISTRIBUTION),
+    ("Primer", 4, PRIMER_TIME_DISTRIBUTION),
+    ("Painting", 4, PAINTING_TIME_DISTRIBUTION),
+]
+
 # ============================================================================
 # BOTTLENECK DETECTION PARAMETERS
 # ============================================================================
 BOTTLENECK_THRESHOLD = 3  # Alert if queue > this many cars
+BOTTLENECK_CLEAR_THRESHOLD = 1  # Open alert closes once queue <= this many cars (hysteresis)
 
 # ============================================================================
 # LOGGING PARAMETERS
 # ============================================================================
 VERBOSE_LOGGING = True  # Set to False to reduce console output
-LOG_DETAIL_LEVEL = "SUMMARY"  # Only logs arrivals, exits, alerts
+LOG_DETAIL_LEVEL = "SUMMARY"  # DETAILED, SUMMARY (arrivals, exits, alerts), MINIMAL (alerts) or OFF
+LOG_BUFFER_SIZE = 256  # Log lines held in memory before each write to disk
 LOG_FILE_PATH = "output/simulation_log.txt"
 RESULTS_FILE_PATH = "output/metrics_results.txt"
+BENCHMARK_RESULTS_PATH = "output/benchmark_results.json"
 
 # ============================================================================
-# HELPER FUNCTIONS
+# RESULT CACHE (main.py --cache)
 # ============================================================================
+RESULT_CACHE_PATH = "output/result_cache.sqlite"
+RESULT_CACHE_MAX_ENTRIES = 100000  # Least recently used entries beyond this are dropped
+RESULT_CACHE_MAX_AGE_DAYS = 30  # Entries older than this are dropped
 
-def get_car_arrival_interval():
-    """Returns random arrival interval in minutes"""
-    return random.uniform(CAR_ARRIVAL_INTERVAL_MIN, CAR_ARRIVAL_INTERVAL_MAX)
-
-def get_cleaning_time():
-    """Returns random cleaning time in minutes"""
-    return random.uniform(CLEANING_TIME_MIN, CLEANING_TIME_MAX)
-
-def get_primer_time():
-    """Returns random primer time in minutes"""
-    return random.uniform(PRIMER_TIME_MIN, PRIMER_TIME_MAX)
+# ============================================================================
+# STATISTICS PARAMETERS
+# ============================================================================
+KEEP_STATION_HISTORY = False  # Keep every wait/processing time and queue change (memory grows with run length)
 
-def get_painting_time():
-    """Returns random painting time in minutes"""
-    return random.uniform(PAINTING_TIME_MIN, PAINTING_TIME_MAX)
\ No newline at end of file
+# ============================================================================
+# REPLICATION PARAMETERS
+# ============================================================================
+CONFIDENCE_LEVEL = 0.95  # Confidence level for replication intervals
@@ -1,39 +1,435 @@
-
+import argparse
+import asyncio
 import os
+from contextlib import contextmanager
+import config
 from src.simulation import PaintShopSimulation
-from src.metrics import print_results, get_bottleneck_recommendations
+from src.scenario import Scenario
+from src.metrics import (print_results, get_bottleneck_recommendations, format_replication_report,
+                         format_shift_summary, format_instrumentation_report, format_capacity_report,
+                         format_precision_report, format_batch_means_report, format_optimization_report,
+                         format_comparison_report, format_branch_report, format_analytic_validation,
+                         format_sensitivity_report, format_forecast, format_farm_progress,
+                         format_farm_report)
+from src.replication import run_replications, aggregate_replications, run_until_precision, run_batch_means
+from src.instrumentation import profiled
+from src.capacity_sweep import capacity_sweep
+from src.optimizer import OBJECTIVES, candidate_grid, parse_constraint, select_best
+from src.variance_reduction import METHODS, compare_scenarios
+from src.snapshot import snapshot_at, fork
+from src.analytic import validate_analytic
+from src.sensitivity import estimate_sensitivities
+from src.event_trace import EventTrace
+from src.digital_twin import DigitalTwin, tail_events, socket_events
+from src.result_cache import ResultCache
+from src.results import SimulationResults
+from src.farm import FarmCoordinator, run_worker, start_local_workers
+
+
+def parse_args():
+    """Parse command-line options"""
+    parser = argparse.ArgumentParser(description="Paint shop conveyor system simulation")
+    parser.add_argument("--scenario", default=None,
+                        help="Scenario file (.json, .yaml); unset values come from config.py")
+    parser.add_argument("--seed", type=int, default=None,
+                        help="Random seed for reproducible results")
+    parser.add_argument("--replications", type=int, default=1,
+                        help="Number of independent replications (default: 1)")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Worker processes for replications (default: CPU count)")
+    parser.add_argument("--shifts", type=int, default=0,
+                        help="Run this many shifts (days/weeks) and stream per-shift summaries")
+    parser.add_argument("--precision", type=float, default=None, metavar="FRACTION",
+                        help="Add replications until average system time is known to within "
+                             "this fraction (e.g. 0.02 for +-2%%)")
+    parser.add_argument("--max-replications", type=int, default=1000,
+                        help="Replication budget for --precision (default: 1000)")
+    parser.add_argument("--steady-state", type=int, default=0, metavar="SHIFTS",
+                        help="Estimate steady-state system time from one run of SHIFTS shifts (batch means)")
+    parser.add_argument("--cache", action="store_true",
+                        help="Reuse replication results stored in output/ (needs --seed)")
+    parser.add_argument("--sweep", type=int, default=0, metavar="MAX_MACHINES",
+                        help="Measure every machine count from 1 to MAX_MACHINES per station "
+                             "and print the Pareto-optimal capacity plan")
+    parser.add_argument("--max-utilization", type=float, default=None, metavar="LOAD",
+                        help="Skip configurations in --sweep and --optimize where a station's load (after "
+                             "upstream throttling) is at or above LOAD (default: simulate them all)")
+    parser.add_argument("--max-system-time", type=float, default=None, metavar="MINUTES",
+                        help="Leave --sweep configurations averaging more than MINUTES in the system off "
+                             "the fronts, and skip those the analytic estimate puts far above it")
+    parser.add_argument("--slack-utilization", type=float, default=None, metavar="PERCENT",
+                        help="In --sweep, do not add a machine to a station measured below PERCENT "
+                             "utilization with one machine fewer (default: try every count)")
+    parser.add_argument("--optimize", type=int, default=0, metavar="MAX_MACHINES",
+                        help="Pick the best machine counts (1 to MAX_MACHINES per station) by "
+                             "ranking and selection instead of a full sweep")
+    parser.add_argument("--objective", choices=sorted(OBJECTIVES), default="throughput_per_machine_cost",
+                        help="Objective for --optimize (default: throughput_per_machine_cost)")
+    parser.add_argument("--constraint", action="append", default=[], metavar="METRIC<=BOUND",
+                        help="Constraint for --optimize, e.g. p95_system_time<=900 (repeatable)")
+    parser.add_argument("--budget", type=int, default=2000,
+                        help="Replication budget for --optimize (default: 2000)")
+    parser.add_argument("--compare", default=None, metavar="SCENARIO",
+                        help="Compare this scenario file against the base scenario (difference in "
+                             "average system time with variance reduction)")
+    parser.add_argument("--variance-reduction", choices=METHODS, default="antithetic",
+                        help="Random-number scheme for --compare (default: antithetic)")
+    parser.add_argument("--control-variates", action="store_true",
+                        help="Also adjust --compare by the realized mean processing times")
+    parser.add_argument("--what-if", type=float, default=None, metavar="MINUTE",
+                        help="Pause the shift at MINUTE and compare finishing it as is or with "
+                             "one more machine at each station")
+    parser.add_argument("--analytic", action="store_true",
+                        help="Compare queueing-formula estimates with simulation for the scenario "
+                             "and one more machine at each station")
+    parser.add_argument("--sensitivities", action="store_true",
+                        help="Estimate derivatives of system time and throughput with respect to each "
+                             "station's processing times and the arrival rate (IPA)")
+    parser.add_argument("--trace", default=None, metavar="PATH",
+                        help="Also record the single run as a binary event trace")
+    parser.add_argument("--json", default=None, metavar="PATH",
+                        help="Also write the single run's results as JSON")
+    parser.add_argument("--replay", default=None, metavar="PATH",
+                        help="Recompute and print the results of a recorded trace instead of simulating")
+    parser.add_argument("--twin", default=None, metavar="SOURCE",
+                        help="Follow live controller events (a JSON-lines file, or tcp:PORT) and forecast "
+                             "the rest of the shift")
+    parser.add_argument("--forecast-interval", type=float, default=5.0, metavar="SECONDS",
+                        help="Seconds between digital-twin forecasts")
+    parser.add_argument("--farm", type=int, default=None, metavar="PORT",
+                        help="Coordinate a replication farm on PORT: serve chunks of the scenarios "
+                             "to workers and merge their summaries")
+    parser.add_argument("--farm-scenario", action="append", default=[], metavar="SCENARIO",
+                        help="Another scenario file for --farm (repeatable; the base scenario is always run)")
+    parser.add_argument("--farm-host", default="127.0.0.1",
+                        help="Interface --farm listens on (0.0.0.0 to accept other machines)")
+    parser.add_argument("--local-workers", type=int, default=0,
+                        help="Worker processes --farm starts on this machine")
+    parser.add_argument("--chunk-size", type=int, default=16,
+                        help="Replications per farm chunk (default: 16)")
+    parser.add_argument("--worker", default=None, metavar="HOST:PORT",
+                        help="Run as a farm worker for the coordinator at HOST:PORT")
+    parser.add_argument("--profile", action="store_true",
+                        help="Instrument and profile a single run (reports in output/profile.*)")
+    return parser.parse_args()
+
+
+@contextmanager
+def open_cache(args):
+    """
+    Open the result cache if --cache was given.
+
+    Yields the ResultCache (or None without --cache); on exit it prints how
+    many replications were reused and closes the cache.
+    """
+    if not args.cache:
+        yield None
+        return
+
+    cache = ResultCache(config.RESULT_CACHE_PATH, config.RESULT_CACHE_MAX_ENTRIES,
+                        config.RESULT_CACHE_MAX_AGE_DAYS)
+    try:
+        yield cache
+        print(f"Result cache: {cache.hits} reused, {cache.misses} simulated")
+    finally:
+        cache.close()
+
+
+def run_replication_study(args, scenario):
+    """
+    Run several independent replications and print confidence intervals.
+    """
+    print(f"\nRunning {args.replications} replications...")
+    with open_cache(args) as cache:
+        summaries = run_replications(args.replications, base_seed=args.seed, workers=args.workers,
+                                     scenario=scenario, cache=cache)
+    aggregate = aggregate_replications(summaries, scenario.confidence_level)
+    print(format_replication_report(aggregate, len(summaries), scenario.confidence_level))
+
+
+def run_precision_study(args, scenario):
+    """
+    Run replications until the requested precision (or the budget) is reached.
+    """
+    print(f"\nRunning replications until average system time is within ±{args.precision * 100:g}%...")
+    with open_cache(args) as cache:
+        result = run_until_precision("avg_system_time", args.precision, scenario=scenario, base_seed=args.seed,
+                                     workers=args.workers, max_replications=args.max_replications, cache=cache)
+    print(format_precision_report(result, scenario.confidence_level))
+
+
+def run_steady_state_study(args, scenario):
+    """
+    Estimate the steady-state average system time from one long run.
+    """
+    print(f"\nRunning {args.steady_state} shifts for a batch-means estimate...")
+    interval = run_batch_means(args.steady_state, scenario, seed=args.seed)
+    print(format_batch_means_report(interval, scenario.confidence_level))
+
+
+def run_shift_study(args, scenario):
+    """
+    Run a multi-shift horizon, printing each shift's summary as it finishes.
+    """
+    print(f"\nRunning {args.shifts} shifts ({scenario.shifts_per_day} per day, "
+          f"{scenario.shift_length} min each)...\n")
+    sim = PaintShopSimulation(scenario, seed=args.seed, verbose=False, keep_cars=False)
+    for summary in sim.run_shifts(args.shifts):
+        print(format_shift_summary(summary))
+
+    results = sim.get_results()
+    print(f"\nTotal cars completed: {results['total_cars']}, "
+          f"average system time: {results['avg_system_time']:.2f} min, "
+          f"cars truncated by safety cap: {results['cars_truncated']}")
+
+
+def run_capacity_sweep(args, scenario):
+    """
+    Sweep machine counts per station and print the capacity plan.
+    """
+    replications = args.replications if args.replications > 1 else 10
+    machine_ranges = {name: range(1, args.sweep + 1) for name in scenario.station_names}
+    print(f"\nSweeping 1-{args.sweep} machines per station, {replications} replications each...")
+    sweep = capacity_sweep(scenario, machine_ranges, replications=replications, base_seed=args.seed,
+                           workers=args.workers, max_utilization=args.max_utilization,
+                           slack_utilization=args.slack_utilization, max_system_time=args.max_system_time)
+    print(format_capacity_report(sweep))
+
+
+def run_optimization(args, scenario):
+    """
+    Choose machine counts by ranking and selection and print the choice.
+    """
+    machine_ranges = {name: range(1, args.optimize + 1) for name in scenario.station_names}
+    candidates = candidate_grid(scenario, machine_ranges)
+    constraints = [parse_constraint(text) for text in args.constraint]
+    print(f"\nSelecting among {len(candidates)} configurations (budget {args.budget} replications)...")
+    result = select_best(candidates, args.objective, constraints=constraints, budget=args.budget,
+                         base_seed=args.seed, workers=args.workers, max_utilization=args.max_utilization)
+    print(format_optimization_report(result))
+
+
+def run_comparison(args, scenario):
+    """
+    Compare an alternative scenario against the base one and print the difference.
+    """
+    alternative = Scenario.from_file(args.compare, base=scenario)
+    replications = args.replications if args.replications > 1 else 20
+    print(f"\nComparing {args.compare} against the base scenario, {replications} replications...")
+    result = compare_scenarios(scenario, alternative, replications=replications, method=args.variance_reduction,
+                               control_variates=args.control_variates, base_seed=args.seed, workers=args.workers)
+    print(format_comparison_report(result, scenario.confidence_level))
+
+
+def run_what_if(args, scenario):
+    """
+    Fork the rest of the shift from a snapshot, adding one machine per branch.
+    """
+    snapshot = snapshot_at(args.what_if, scenario, seed=args.seed)
+    labels = ["As is"]
+    branches = [scenario]
+    for spec in scenario.stations:
+        labels.append(f"+1 {spec.name} machine")
+        branches.append(scenario.with_machines(spec.name, spec.machines + 1))
+    summaries = fork(snapshot, branches, workers=args.workers)
+    print(format_branch_report(snapshot.time, snapshot.cars_in_system, list(zip(labels, summaries))))
+
+
+def run_analytic_validation(args, scenario):
+    """
+    Check the analytic estimator against simulation around the current scenario.
+    """
+    replications = args.replications if args.replications > 1 else 10
+    scenarios = [scenario] + [scenario.with_machines(spec.name, spec.machines + 1) for spec in scenario.stations]
+    print(f"\nValidating analytic estimates on {len(scenarios)} configurations, {replications} replications each...")
+    print(format_analytic_validation(validate_analytic(scenarios, replications, base_seed=args.seed)))
+
+
+def run_sensitivity_study(args, scenario):
+    """
+    Estimate IPA gradients over replications and print them.
+    """
+    replications = args.replications if args.replications > 1 else 20
+    print(f"\nEstimating sensitivities from {replications} replications...")
+    estimate = estimate_sensitivities(scenario, replications, base_seed=args.seed, workers=args.workers)
+    print(format_sensitivity_report(estimate, scenario.confidence_level))
+
+
+def replay_trace(args):
+    """
+    Rebuild a recorded run's results from its trace and print them.
+    """
+    with EventTrace(args.replay) as trace:
+        print(f"\nReplaying {len(trace)} events from {args.replay}...")
+        results = SimulationResults.from_results(trace.get_results())
+        print_results(results, save=False)
+        print(get_bottleneck_recommendations(results))
+
+
+def run_digital_twin(args, scenario):
+    """
+    Mirror the live line from a controller feed and print forecasts until stopped.
+    """
+    replications = args.replications if args.replications > 1 else 64
+    if args.twin.startswith("tcp:"):
+        events = socket_events(port=int(args.twin[len("tcp:"):]))
+    else:
+        events = tail_events(args.twin)
+    print(f"\nFollowing {args.twin}, forecasting every {args.forecast_interval:g} s "
+          f"with {replications} replications (Ctrl-C to stop)...")
+    twin = DigitalTwin(scenario, replications=replications, workers=args.workers, base_seed=args.seed)
+    try:
+        asyncio.run(twin.run(events, args.forecast_interval, lambda forecast: print(format_forecast(forecast))))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        twin.close()
+
+
+def run_farm(args, scenario):
+    """
+    Coordinate a replication farm over the base and --farm-scenario scenarios and print the merged results.
+    """
+    scenarios = [scenario] + [Scenario.from_file(path, base=scenario) for path in args.farm_scenario]
+    replications = args.replications if args.replications > 1 else 100
+    workers = []
+
+    def ready(port):
+        print(f"\nServing {len(scenarios)} scenario(s) x {replications} replications on "
+              f"{args.farm_host}:{port}; start workers with: python main.py --worker HOST:{port}")
+        workers.extend(start_local_workers(args.local_workers, port=port))
+
+    coordinator = FarmCoordinator(scenarios, replications, base_seed=args.seed, chunk_size=args.chunk_size,
+                                  host=args.farm_host, port=args.farm,
+                                  on_progress=lambda progress: print(format_farm_progress(progress)))
+    result = coordinator.run(ready)
+    for worker in workers:
+        worker.join()
+    print(format_farm_report(result, coordinator.confidence))
+
+
+def run_farm_worker(args):
+    """
+    Run chunks for a farm coordinator until it is done.
+    """
+    host, port = args.worker.rsplit(":", 1)
+    print(f"\nWorking for the farm at {host}:{port}...")
+    replications = run_worker(host, int(port))
+    print(f"\n✓ Ran {replications} replications")
+
+
+def run_profiled(args, scenario):
+    """
+    Run once with instrumentation under cProfile and save the reports.
+    """
+    sim = PaintShopSimulation(scenario, seed=args.seed, log_level="OFF", verbose=False, instrument=True)
+    with profiled("output/profile", sim.instrumentation):
+        sim.run()
+
+    print(format_instrumentation_report(sim.instrumentation.summary()))
+    print("  - Profile saved to: output/profile.prof (pstats), output/profile.txt, output/profile.json")
 
 
 def main():
     """
     Main function to run the complete simulation.
     """
-    
+    args = parse_args()
+    scenario = Scenario.from_file(args.scenario) if args.scenario else Scenario.from_config()
+
     # Create output directory if it doesn't exist
     if not os.path.exists("output"):
         os.makedirs("output")
-    
+
     print("\n" + "=" * 80)
     print("PAINT SHOP CONVEYOR SYSTEM SIMULATION")
     print("=" * 80)
+
+    if args.replay:
+        replay_trace(args)
+        return
+
+    if args.worker:
+        run_farm_worker(args)
+        return
+
+    if args.farm is not None:
+        run_farm(args, scenario)
+        return
+
+    if args.twin:
+        run_digital_twin(args, scenario)
+        return
+
+    if args.sweep > 0:
+        run_capacity_sweep(args, scenario)
+        return
+
+    if args.optimize > 0:
+        run_optimization(args, scenario)
+        return
+
+    if args.analytic:
+        run_analytic_validation(args, scenario)
+        return
+
+    if args.sensitivities:
+        run_sensitivity_study(args, scenario)
+        return
+
+    if args.what_if is not None:
+        run_what_if(args, scenario)
+        return
+
+    if args.compare:
+        run_comparison(args, scenario)
+        return
+
+    if args.precision is not None:
+        run_precision_study(args, scenario)
+        return
+
+    if args.steady_state > 0:
+        run_steady_state_study(args, scenario)
+        return
+
+    if args.replications > 1:
+        run_replication_study(args, scenario)
+        return
+
+    if args.shifts > 0:
+        run_shift_study(args, scenario)
+        return
+
+    if args.profile:
+        run_profiled(args, scenario)
+        return
+
     print("\nInitializing simulation...")
-    
+
     # Create and run simulation
-    sim = PaintShopSimulation()
-    results = sim.run()
-    
+    sim = PaintShopSimulation(scenario, seed=args.seed, trace_path=args.trace)
+    results = SimulationResults.from_results(sim.run())
+
     # Print results
     print_results(results)
-    
+    if args.json:
+        with open(args.json, "w") as f:
+            f.write(results.to_json(indent=2))
+
     # Print optimization recommendations
     recommendations = get_bottleneck_recommendations(results)
     print(recommendations)
-    
+
     print("\n✓ Simulation complete!")
     print(f"  - Detailed log saved to: output/simulation_log.txt")
     print(f"  - Results saved to: output/metrics_results.txt")
+    if args.trace:
+        print(f"  - Event trace saved to: {args.trace}")
+    if args.json:
+        print(f"  - JSON results saved to: {args.json}")
     print("\n" + "=" * 80)
 
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,339 @@
+# analytic.py
+# Closed-form queueing approximations of the line, for instant estimates and sweep pre-screening
+
+import math
+import time
+from src.car_store import CarStore
+from src.scenario import resolve_scenario
+from src.variates import distribution_mean, distribution_variance
+
+
+def offered_load(scenario):
+    """
+    Long-run utilization each station would need to keep up with arrivals.
+
+    Every station is loaded with the raw arrival rate, ignoring that a
+    saturated upstream station passes cars on at its own capacity; see
+    station_loads() for the load each station actually sees.
+
+    Args:
+        scenario (Scenario): Scenario to check
+
+    Returns:
+        dict: Station name -> mean service time / (mean interarrival time * machines)
+    """
+    interarrival = distribution_mean(scenario.arrival_distribution)
+    return {
+        spec.name: distribution_mean(spec.distribution) / (interarrival * spec.machines)
+        for spec in scenario.stations
+    }
+
+
+def erlang_c(machines, load):
+    """
+    Probability that an arriving car waits in an M/M/c queue.
+
+    Args:
+        machines (int): Number of parallel machines (c)
+        load (float): Offered load in machines (arrival rate x mean service time), below c
+    """
+    term = 1.0
+    total = 1.0
+    for k in range(1, machines):
+        term *= load / k
+        total += term
+    last = term * load / machines / (1 - load / machines)
+    return last / (total + last)
+
+
+def wait_quantile(q, avg_wait, wait_probability, unstable):
+    """
+    Approximate quantile of a station's wait.
+
+    Stable stations: a car waits with probability wait_probability, and a
+    wait, when there is one, is exponential. Unstable stations: the backlog
+    grows steadily, so waits are spread evenly from 0 to twice the average.
+    """
+    if unstable:
+        return 2 * avg_wait * q
+    if avg_wait <= 0 or 1 - q >= wait_probability:
+        return 0.0
+    return avg_wait / wait_probability * math.log(wait_probability / (1 - q))
+
+
+class AnalyticWait:
+    """
+    Approximate wait time distribution of one station, with the get_quantile() method of QuantileSketch.
+    """
+
+    def __init__(self, avg_wait, wait_probability, unstable):
+        self.avg_wait = avg_wait
+        self.wait_probability = wait_probability
+        self.unstable = unstable
+
+    def get_quantile(self, q):
+        """Approximate q-quantile of the wait (see wait_quantile())"""
+        return wait_quantile(q, self.avg_wait, self.wait_probability, self.unstable)
+
+
+class AnalyticStation:
+    """
+    Approximate performance of one station, with the reporting methods of Station.
+
+    Lets estimates go through the same reports and summaries as simulated
+    results (metrics.print_results(), metrics.summarize_results()).
+    """
+
+    def __init__(self, name, num_machines, offered_load, avg_wait, wait_probability, avg_processing_time,
+                 cars, queue_area, max_queue_length):
+        self.name = name
+        self.num_machines = num_machines
+        self.offered_load = offered_load  # Arrival rate x mean service time / machines
+        self.unstable = offered_load >= 1
+        self.avg_wait = avg_wait
+        self.wait_probability = wait_probability
+        self.avg_processing_time = avg_processing_time
+        self.cars = cars
+        self.total_busy_time = cars * avg_processing_time
+        self.queue_area = queue_area
+        self.max_queue_length = max_queue_length
+        self.current_queue_length = 0
+        self.wait_sketch = AnalyticWait(avg_wait, wait_probability, self.unstable)
+
+    def get_avg_wait_time(self):
+        """Average wait time at this station"""
+        return self.avg_wait
+
+    def get_avg_processing_time(self):
+        """Average processing time at this station"""
+        return self.avg_processing_time
+
+    def get_wait_percentile(self, percentile):
+        """Approximate wait time percentile (see wait_quantile())"""
+        return self.wait_sketch.get_quantile(percentile / 100)
+
+    def get_processed_count(self):
+        """Number of cars processed"""
+        return self.cars
+
+    def get_avg_queue_length(self, end_time):
+        """Time-weighted average queue length up to end_time"""
+        return self.queue_area / end_time if end_time > 0 else 0
+
+    def get_queue_area(self, current_time):
+        """Integral of queue length over the run"""
+        return self.queue_area
+
+    def get_utilization(self, total_simulation_time):
+        """Machine utilization percentage, as Station.get_utilization()"""
+        if total_simulation_time == 0:
+            return 0
+        return self.total_busy_time / (self.num_machines * total_simulation_time) * 100
+
+    def __repr__(self):
+        return f"AnalyticStation_{self.name}"
+
+
+class AnalyticSystemTime:
+    """
+    Approximate system time distribution, with the get_quantile() method of QuantileSketch.
+
+    A quantile is the sum of the stations' wait quantiles plus the mean
+    processing times (waits at successive stations are treated as moving
+    together, which errs on the high side).
+    """
+
+    def __init__(self, stations):
+        self.stations = stations
+
+    def get_quantile(self, q):
+        """Approximate q-quantile of the time in the system"""
+        return sum(station.get_wait_percentile(q * 100) + station.avg_processing_time for station in self.stations)
+
+
+def analytic_results(scenario=None):
+    """
+    Estimate a run from queueing formulas instead of simulating it.
+
+    Each station is a GI/G/c queue. Stable stations (offered load below 1)
+    use the Allen-Cunneen approximation (Kingman's formula for one machine):
+        Wq = (ca^2 + cs^2) / 2 * ErlangC(c, a) * s / (c - a)
+    and pass on a departure stream whose variability follows the linking
+    equation cd^2 = 1 + (1 - rho^2)(ca^2 - 1) + rho^2 (cs^2 - 1) / sqrt(c).
+    Near saturation the steady-state wait is capped by how far a queue can
+    drift within the shift. Unstable stations (offered load 1 or more) are
+    modelled as fluid: the backlog grows at the arrival rate minus the
+    capacity while cars arrive, and the station then releases cars at full
+    capacity, with the variability of its processing times.
+
+    Alerts are only predicted for unstable stations, and per-station peak
+    queues of stable stations are rough.
+
+    Args:
+        scenario (Scenario): Scenario to estimate (default: Scenario.from_config())
+
+    Returns:
+        dict: Same keys as PaintShopSimulation.get_results(), with
+            AnalyticStation objects in 'stations', plus 'unstable_stations'
+    """
+    scenario = resolve_scenario(scenario)
+    interarrival = distribution_mean(scenario.arrival_distribution)
+    window = scenario.acceptance_time
+    rate = 1 / interarrival  # Cars per minute reaching the current station
+    scv = distribution_variance(scenario.arrival_distribution) / interarrival ** 2
+    # Renewal count of arrivals before the acceptance time
+    cars = max(0, round(window / interarrival + (scv - 1) / 2))
+
+    duration = window  # How long cars keep reaching the current station
+    first_arrival = interarrival  # When the first car reaches the current station
+    last_arrival = window  # When the last car reaches the current station
+
+    stations = []
+    bottlenecks = {}
+    for spec in scenario.stations:
+        machines = spec.machines
+        service = distribution_mean(spec.distribution)
+        service_scv = distribution_variance(spec.distribution) / service ** 2
+        capacity = machines / service
+        load = rate * service / machines
+        unstable = load >= 1
+        report = {'alerts': 0, 'bottleneck_time': 0.0, 'peak_queue': 0, 'avg_onset_latency': 0, 'intervals': []}
+
+        if unstable:
+            # Fluid backlog: grows while cars arrive, then drains at full capacity
+            backlog = (rate - capacity) * duration
+            avg_wait = duration / 2 * (rate / capacity - 1)
+            last_wait = 2 * avg_wait
+            wait_probability = 1.0
+            max_queue = int(backlog)
+            if backlog > scenario.bottleneck_threshold:
+                opened = first_arrival + scenario.bottleneck_threshold / (rate - capacity)
+                closed = first_arrival + duration * rate / capacity
+                report.update(alerts=1, bottleneck_time=closed - opened, peak_queue=max_queue,
+                              intervals=[(opened, closed, max_queue)])
+            duration = duration * rate / capacity
+            rate = capacity
+            # Every machine is always busy: departures merge the machines' renewal streams
+            scv = service_scv
+        else:
+            wait_probability = erlang_c(machines, rate * service)
+            avg_wait = (scv + service_scv) / 2 * wait_probability * service / (machines - rate * service)
+            # A queue cannot drift further in one shift than a random walk of the shift's length
+            avg_wait = min(avg_wait, math.sqrt(rate * duration * (scv + service_scv)) / capacity)
+            last_wait = avg_wait
+            # Largest queue over the shift: geometric tail, level reached about once in `cars` arrivals
+            queue = rate * avg_wait
+            ratio = queue / (wait_probability + queue) if queue > 0 else 0
+            max_queue = int(math.log(wait_probability * cars) / -math.log(ratio)) if 0 < ratio and wait_probability * cars > 1 else 0
+            scv = 1 + (1 - load ** 2) * (scv - 1) + load ** 2 * (service_scv - 1) / math.sqrt(machines)
+
+        stations.append(AnalyticStation(spec.name, machines, load, avg_wait, wait_probability, service, cars,
+                                        cars * avg_wait, max_queue))
+        bottlenecks[spec.name] = report
+        first_arrival += service
+        last_arrival += last_wait + service
+
+    # The run ends when the last car leaves, or at the safety cap
+    cap_time = window + scenario.max_drain_time
+    end_time = min(last_arrival, cap_time)
+    cars_truncated = math.ceil((last_arrival - cap_time) * rate) if last_arrival > cap_time else 0
+    total_cars = cars - cars_truncated
+    system_time = AnalyticSystemTime(stations)
+
+    results = {
+        'total_cars': total_cars,
+        'avg_system_time': sum(station.avg_wait + station.avg_processing_time for station in stations),
+        'system_time_sketch': system_time,
+        'stations': stations,
+        'alert_count': sum(report['alerts'] for report in bottlenecks.values()),
+        'cars_completed': CarStore(scenario.station_names),
+        'simulation_time': scenario.simulation_time,
+        'end_time': end_time,
+        'cars_truncated': cars_truncated,
+        'bottlenecks': bottlenecks,
+        'scenario': scenario,
+        'unstable_stations': [station.name for station in stations if station.unstable]
+    }
+    for station in stations:
+        results[f"{station.name.lower()}_station"] = station
+    return results
+
+
+def station_loads(scenario):
+    """
+    Load each station sees once upstream stations throttle the flow.
+
+    A saturated station releases cars at its capacity, so the stations
+    after it see that rate rather than the arrival rate (as in
+    analytic_results()). Only the first saturated station can be above 1.
+
+    Args:
+        scenario (Scenario): Scenario to check
+
+    Returns:
+        dict: Station name -> arrival rate reaching it x mean service time / machines
+    """
+    return {station.name: station.offered_load for station in analytic_results(scenario)['stations']}
+
+
+# Metrics compared by validate_analytic() ("<Station>." metrics are checked for every station)
+VALIDATION_METRICS = ("total_cars", "avg_system_time", "p95_system_time", "drain_throughput_per_hour", "alert_count")
+STATION_VALIDATION_METRICS = ("utilization", "avg_wait", "avg_queue")
+
+
+def validate_analytic(scenarios, replications=10, base_seed=None):
+    """
+    Compare analytic estimates with simulated replications.
+
+    Simulates with FastLineSimulation, which matches PaintShopSimulation
+    exactly, using the same seeds for every scenario.
+
+    Args:
+        scenarios (list): Scenarios to check
+        replications (int): Replications per scenario
+        base_seed (int): Root seed of the replications
+
+    Returns:
+        list: Per scenario: 'machines', 'unstable_stations', 'analytic_time'
+            and 'simulation_time' (seconds), and 'metrics' (name -> analytic,
+            simulated mean, half_width and relative error)
+    """
+    from src.fast_engine import FastLineSimulation
+    from src.metrics import summarize_results
+    from src.replication import aggregate_replications, spawn_seeds
+
+    seeds = spawn_seeds(replications, base_seed)
+    report = []
+    for scenario in scenarios:
+        start = time.perf_counter()
+        results = analytic_results(scenario)
+        estimate = summarize_results(results)
+        analytic_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        summaries = [summarize_results(FastLineSimulation(scenario, seed=seed, keep_cars=False).run())
+                     for seed in seeds]
+        simulated = aggregate_replications(summaries, scenario.confidence_level)
+        simulation_time = time.perf_counter() - start
+
+        names = list(VALIDATION_METRICS) + [f"{station}.{metric}" for station in scenario.station_names
+                                            for metric in STATION_VALIDATION_METRICS]
+        metrics = {}
+        for name in names:
+            mean = simulated[name]['mean']
+            metrics[name] = {
+                'analytic': estimate[name],
+                'simulated': mean,
+                'half_width': simulated[name]['half_width'],
+                'error': (estimate[name] - mean) / abs(mean) if mean else None
+            }
+
+        report.append({
+            'machines': {spec.name: spec.machines for spec in scenario.stations},
+            'unstable_stations': results['unstable_stations'],
+            'analytic_time': analytic_time,
+            'simulation_time': simulation_time,
+            'replications': replications,
+            'metrics': metrics
+        })
+    return report
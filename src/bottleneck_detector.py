@@ -1,40 +1,188 @@
 # bottleneck_detector.py
 # Detects when queues exceed threshold and triggers alerts
 
+import numpy as np
+
+
+class StationAlertState:
+    """
+    Alert state and totals for one station.
+    """
+
+    __slots__ = ("alert_open", "opened_at", "rising_since", "interval_peak",
+                 "peak_queue", "alert_count", "bottleneck_time", "onset_latency_total", "intervals")
+
+    def __init__(self):
+        self.alert_open = False
+        self.opened_at = 0.0  # Start of the open alert interval
+        self.rising_since = None  # When the queue last rose above the clear level
+        self.interval_peak = 0  # Peak queue during the open alert interval
+        self.peak_queue = 0  # Peak queue ever seen
+        self.alert_count = 0
+        self.bottleneck_time = 0.0  # Total time in closed alert intervals
+        self.onset_latency_total = 0.0
+        self.intervals = []  # Closed alerts as (start, end, peak_queue)
+
+
 class BottleneckDetector:
     """
     Monitors queue lengths at each station.
     Triggers alerts when queues exceed a defined threshold.
+
+    Called on every queue change of a station. An alert opens when the queue
+    rises above threshold and stays open until the queue falls back to
+    clear_threshold or below, so an overloaded station raises one alert per
+    episode instead of one per event.
     """
-    
-    def __init__(self, threshold=3):
+
+    def __init__(self, threshold=3, clear_threshold=None):
         """
         Initialize bottleneck detector.
-        
+
         Args:
             threshold (int): Queue length threshold for alert (default: 3)
+            clear_threshold (int): Queue length at or below which an open alert
+                closes (default: threshold, i.e. no hysteresis)
         """
         self.threshold = threshold
-        self.alerts = {}  # Track alerts per station to avoid duplicates
-        
+        self.clear_threshold = threshold if clear_threshold is None else clear_threshold
+        if self.clear_threshold > threshold:
+            raise ValueError("clear_threshold must not be above threshold")
+        self.alerts = {}  # Station name -> StationAlertState
+
     def check_bottleneck(self, station_name, current_queue_length, current_time):
         """
-        Check if a station has a bottleneck (queue exceeds threshold).
-        
+        Update a station's alert state after its queue changed.
+
         Args:
-            station_name (str): Name of the station to check
+            station_name (str): Name of the station whose queue changed
             current_queue_length (int): Current number of cars waiting
             current_time (float): Current simulation time
-        
+
         Returns:
-            bool: True if bottleneck detected, False otherwise
+            bool: True if a new alert opened, False otherwise
         """
+        state = self.alerts.get(station_name)
+        if state is None:
+            state = self.alerts[station_name] = StationAlertState()
+
+        if current_queue_length > state.peak_queue:
+            state.peak_queue = current_queue_length
+
+        if state.alert_open:
+            if current_queue_length > state.interval_peak:
+                state.interval_peak = current_queue_length
+            elif current_queue_length <= self.clear_threshold:
+                # Queue is back to normal: close the alert interval
+                state.alert_open = False
+                state.bottleneck_time += current_time - state.opened_at
+                state.intervals.append((state.opened_at, current_time, state.interval_peak))
+                state.rising_since = None
+            return False
+
+        if current_queue_length <= self.clear_threshold:
+            state.rising_since = None
+            return False
+
+        if state.rising_since is None:
+            state.rising_since = current_time
+
         # If queue exceeds threshold, it's a bottleneck
         if current_queue_length > self.threshold:
+            state.alert_open = True
+            state.opened_at = current_time
+            state.interval_peak = current_queue_length
+            state.alert_count += 1
+            state.onset_latency_total += current_time - state.rising_since
             return True
-        
+
         return False
-    
+
+    def get_report(self, end_time, station_names=()):
+        """
+        Summarize alerts per station.
+
+        Args:
+            end_time (float): End of the run (closes any alert still open)
+            station_names (list): Stations to include even if their queue never changed
+
+        Returns:
+            dict: Station name -> dict with alerts, bottleneck_time, peak_queue,
+                avg_onset_latency and intervals
+        """
+        for station_name in station_names:
+            if station_name not in self.alerts:
+                self.alerts[station_name] = StationAlertState()
+
+        report = {}
+        for station_name in list(station_names) + [name for name in self.alerts if name not in station_names]:
+            state = self.alerts[station_name]
+            intervals = list(state.intervals)
+            bottleneck_time = state.bottleneck_time
+            if state.alert_open:
+                intervals.append((state.opened_at, end_time, state.interval_peak))
+                bottleneck_time += end_time - state.opened_at
+
+            report[station_name] = {
+                'alerts': state.alert_count,
+                'bottleneck_time': bottleneck_time,
+                'peak_queue': state.peak_queue,
+                'avg_onset_latency': state.onset_latency_total / state.alert_count if state.alert_count else 0,
+                'intervals': intervals
+            }
+        return report
+
     def reset_alerts(self):
         """Clear alert history"""
-        self.alerts = {}
\ No newline at end of file
+        self.alerts = {}
+
+
+def alert_intervals(change_times, queue_lengths, threshold, clear_threshold, end_time):
+    """
+    Apply the detector's hysteresis rule to a whole queue-length series at once.
+
+    Gives the same alerts as feeding every change to BottleneckDetector, for
+    engines (or traces) that have the full series as arrays.
+
+    Args:
+        change_times (numpy.ndarray): Times of queue changes, sorted
+        queue_lengths (numpy.ndarray): Queue length after each change
+        threshold (int): Alert opens above this length
+        clear_threshold (int): Alert closes at or below this length
+        end_time (float): End of the run (closes any alert still open)
+
+    Returns:
+        dict: Same fields as one station's entry in BottleneckDetector.get_report()
+    """
+    if len(queue_lengths) == 0:
+        return {'alerts': 0, 'bottleneck_time': 0.0, 'peak_queue': 0, 'avg_onset_latency': 0, 'intervals': []}
+
+    # State after each change is set by the latest change that was either
+    # above threshold (open) or at/below the clear level (closed)
+    above = queue_lengths > threshold
+    cleared = queue_lengths <= clear_threshold
+    positions = np.arange(len(queue_lengths))
+    last_decisive = np.maximum.accumulate(np.where(above | cleared, positions, -1))
+    is_open = np.where(last_decisive >= 0, above[np.maximum(last_decisive, 0)], False)
+
+    was_open = np.concatenate(([False], is_open[:-1]))
+    opens = np.flatnonzero(is_open & ~was_open)
+    closes = np.flatnonzero(~is_open & was_open)
+    open_times = change_times[opens]
+    close_times = np.concatenate((change_times[closes], [end_time] * (len(opens) - len(closes))))
+
+    # Onset latency: from the latest rise above the clear level to the alert
+    elevated = ~cleared
+    rises = np.flatnonzero(elevated & ~np.concatenate(([False], elevated[:-1])))
+    rise_times = change_times[rises][np.searchsorted(rises, opens, side="right") - 1]
+
+    stops = closes.tolist() + [len(queue_lengths)] * (len(opens) - len(closes))
+    peaks = [int(queue_lengths[start:stop].max()) for start, stop in zip(opens.tolist(), stops)]
+
+    return {
+        'alerts': len(opens),
+        'bottleneck_time': float((close_times - open_times).sum()),
+        'peak_queue': int(queue_lengths.max()),
+        'avg_onset_latency': float((open_times - rise_times).mean()) if len(opens) else 0,
+        'intervals': list(zip(open_times.tolist(), close_times.tolist(), peaks))
+    }
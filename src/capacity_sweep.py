@@ -0,0 +1,266 @@
+# capacity_sweep.py
+# Measures machine-count configurations and reports the Pareto front
+
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from src.fast_engine import FastLineSimulation
+from src.event_engine import EventLineSimulation
+from src.simulation import PaintShopSimulation
+from src.metrics import summarize_results
+from src.replication import spawn_seeds, aggregate_replications
+from src.variates import scale_distribution
+from src.analytic import analytic_results
+
+ENGINES = {"fast": FastLineSimulation, "heap": EventLineSimulation, "simpy": PaintShopSimulation}
+
+# Statuses of a configuration in the sweep
+EVALUATED = "evaluated"
+INFEASIBLE = "infeasible"  # Some station's load is at or above max_utilization (only when set)
+DOMINATED = "dominated"  # Adds a machine to a station that was idle without it
+SCREENED = "screened"  # Analytic system time estimate far above max_system_time
+
+
+def configure(scenario, machines, arrival_rate=1.0):
+    """
+    Return a copy of a scenario with new machine counts and arrival rate.
+
+    Args:
+        scenario (Scenario): Base scenario
+        machines (tuple): Machine count per station, in processing order
+        arrival_rate (float): Multiplier on the base arrival rate (2.0 = twice as many cars)
+    """
+    stations = [spec._replace(machines=count) for spec, count in zip(scenario.stations, machines)]
+    arrival_distribution = scenario.arrival_distribution
+    if arrival_rate != 1.0:
+        arrival_distribution = scale_distribution(arrival_distribution, 1 / arrival_rate)
+    return scenario.replace(stations=stations, arrival_distribution=arrival_distribution)
+
+
+def run_configuration(scenario, seeds, engine="fast", antithetic=False):
+    """
+    Run one configuration for every seed.
+
+    Module-level so it can be sent to worker processes.
+
+    Args:
+        scenario (Scenario): Configuration to run
+        seeds (list): One seed per replication
+        engine (str): "fast" (FastLineSimulation), "heap" (EventLineSimulation)
+            or "simpy" (PaintShopSimulation)
+        antithetic (bool): Use the antithetic twin of each seed's streams
+
+    Returns:
+        list: One summary dict (metrics.summarize_results()) per seed
+    """
+    engine_class = ENGINES[engine]
+    summaries = []
+    for seed in seeds:
+        if engine != "fast":
+            sim = engine_class(scenario, seed=seed, log_level="OFF", verbose=False, keep_cars=False,
+                               antithetic=antithetic)
+        else:
+            sim = engine_class(scenario, seed=seed, keep_cars=False, antithetic=antithetic)
+        summaries.append(summarize_results(sim.run()))
+    return summaries
+
+
+def evaluate_configuration(scenario, seeds, engine="fast", confidence=0.95):
+    """
+    Run one configuration for every seed and aggregate the summaries.
+
+    Module-level so it can be sent to worker processes.
+
+    Args:
+        scenario (Scenario): Configuration to run
+        seeds (list): One seed per replication
+        engine (str): "fast", "heap" or "simpy" (see run_configuration())
+        confidence (float): Confidence level of the intervals
+
+    Returns:
+        dict: Output of replication.aggregate_replications()
+    """
+    return aggregate_replications(run_configuration(scenario, seeds, engine), confidence)
+
+
+def pareto_front(rows, cost, value, maximize=True, half_width=None, margin=0.0):
+    """
+    Return the rows not dominated on a cost and a value.
+
+    A row is dominated when another row costs no more and has an equal or
+    better value, and is strictly better on one of the two. A costlier row
+    only joins the front when it beats the last row on the front by more
+    than margin plus both rows' half-widths, so a gain that sampling noise
+    could explain does not count.
+
+    Args:
+        rows (list): Row dicts
+        cost (str): Key to minimize (e.g. 'total_machines')
+        value (str): Key to maximize, or to minimize when maximize is False
+        maximize (bool): Whether a larger value is better
+        half_width (str): Key of the value's confidence half-width (None =
+            compare means only; infinite half-widths, from a single
+            replication, are ignored)
+        margin (float): Indifference margin: smallest gain worth paying for
+
+    Returns:
+        list: Non-dominated rows, cheapest first
+    """
+    sign = 1 if maximize else -1
+    ordered = sorted(rows, key=lambda row: (row[cost], -sign * row[value]))
+
+    def noise(row):
+        width = row[half_width] if half_width is not None else 0.0
+        return width if math.isfinite(width) else 0.0
+
+    front = []
+    for row in ordered:
+        if not front:
+            front.append(row)
+            continue
+        last = front[-1]
+        if sign * (row[value] - last[value]) > margin + noise(row) + noise(last):
+            front.append(row)
+    return front
+
+
+def capacity_sweep(scenario, machine_ranges, arrival_rates=(1.0,), replications=10, base_seed=None,
+                   workers=None, max_utilization=None, slack_utilization=None, max_system_time=None,
+                   engine="fast", objective="drain_throughput_per_hour", analytic_margin=2.0):
+    """
+    Evaluate machine-count combinations and find the Pareto-optimal ones.
+
+    Configurations are evaluated in waves of equal total machine count, each
+    wave in parallel across a process pool. Before a configuration is run it
+    is skipped when:
+        - max_system_time is set and the analytic estimate (src/analytic.py)
+          of its average system time is more than analytic_margin times it, or
+        - max_utilization is set and a station's load (analytic.station_loads(),
+          which accounts for upstream stations throttling the flow) is at or
+          above it, or
+        - slack_utilization is set and it adds a machine to a station whose
+          measured utilization was below slack_utilization% in the
+          configuration without that machine.
+    All three are off by default, so every configuration is run: every run
+    drains the line, so overloaded configurations still have a measured
+    throughput and belong on the throughput-vs-machines front. Every configuration uses the
+    same seeds (common random numbers), so differences between
+    configurations are not masked by sampling noise, and a costlier
+    configuration joins a front only if its gain exceeds the combined
+    confidence half-widths (see pareto_front()).
+
+    Args:
+        scenario (Scenario): Base scenario (its machine counts are ignored)
+        machine_ranges (dict): Station name -> iterable of machine counts to try
+        arrival_rates (list): Multipliers on the base arrival rate to try
+        replications (int): Replications per configuration
+        base_seed (int): Root seed shared by all configurations
+        workers (int): Worker processes (None = CPU count, 1 = run in this process)
+        max_utilization (float): Station load at or above which a configuration
+            is skipped as infeasible (None = run them all)
+        slack_utilization (float): Measured utilization (%) below which a station
+            does not get another machine (None = try every machine count)
+        max_system_time (float): Average system time above which an evaluated
+            configuration is left off the fronts (None = no limit)
+        engine (str): "fast", "heap" or "simpy" (see run_configuration())
+        objective (str): Summary metric to maximize
+        analytic_margin (float): How far above max_system_time the analytic
+            estimate must be before a configuration is skipped (None = never)
+
+    Returns:
+        dict: 'rows' (one per configuration, with 'status'), 'fronts'
+            (arrival rate -> {'objective': [...], 'system_time': [...]}, both
+            against total machines), counts per status, replications and wall_time
+    """
+    start = time.perf_counter()
+    names = scenario.station_names
+    ranges = [sorted(machine_ranges.get(name, [spec.machines])) for name, spec in zip(names, scenario.stations)]
+    seeds = spawn_seeds(replications, base_seed)
+    workers = workers or os.cpu_count() or 1
+    confidence = scenario.confidence_level
+
+    # Waves of equal total machine count, so every parent (one machine fewer) is done first
+    waves = {}
+    for rate in arrival_rates:
+        for machines in itertools.product(*ranges):
+            waves.setdefault(sum(machines), []).append((rate, machines))
+
+    rows = {}  # (rate, machines) -> row
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        for total in sorted(waves):
+            to_run = []
+            for rate, machines in waves[total]:
+                config = configure(scenario, machines, rate)
+                estimate = analytic_results(config)
+                row = {
+                    'arrival_rate': rate,
+                    'machines': dict(zip(names, machines)),
+                    'total_machines': total,
+                    'max_offered_load': max(station.offered_load for station in estimate['stations']),
+                    'status': EVALUATED
+                }
+                rows[(rate, machines)] = row
+
+                if (max_system_time is not None and analytic_margin is not None and
+                        estimate['avg_system_time'] > analytic_margin * max_system_time):
+                    row['status'] = SCREENED
+                elif max_utilization is not None and row['max_offered_load'] >= max_utilization:
+                    row['status'] = INFEASIBLE
+                elif (slack_utilization is not None and
+                      _adds_idle_machine(rows, rate, machines, names, slack_utilization)):
+                    row['status'] = DOMINATED
+                else:
+                    to_run.append((row, config))
+
+            if pool is None:
+                aggregates = [evaluate_configuration(config, seeds, engine, confidence) for _, config in to_run]
+            else:
+                futures = [pool.submit(evaluate_configuration, config, seeds, engine, confidence)
+                           for _, config in to_run]
+                aggregates = [future.result() for future in futures]
+
+            for (row, _), aggregate in zip(to_run, aggregates):
+                row['objective'] = aggregate[objective]['mean']
+                row['objective_half_width'] = aggregate[objective]['half_width']
+                row['avg_system_time'] = aggregate['avg_system_time']['mean']
+                row['avg_system_time_half_width'] = aggregate['avg_system_time']['half_width']
+                row['utilization'] = {name: aggregate[f"{name}.utilization"]['mean'] for name in names}
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    all_rows = list(rows.values())
+    fronts = {}
+    for rate in arrival_rates:
+        candidates = [row for row in all_rows if row['arrival_rate'] == rate and row['status'] == EVALUATED
+                      and (max_system_time is None or row['avg_system_time'] <= max_system_time)]
+        fronts[rate] = {
+            'objective': pareto_front(candidates, 'total_machines', 'objective',
+                                      half_width='objective_half_width'),
+            'system_time': pareto_front(candidates, 'total_machines', 'avg_system_time', maximize=False,
+                                        half_width='avg_system_time_half_width')
+        }
+
+    return {
+        'objective': objective,
+        'rows': all_rows,
+        'fronts': fronts,
+        'evaluated': sum(row['status'] == EVALUATED for row in all_rows),
+        'infeasible': sum(row['status'] == INFEASIBLE for row in all_rows),
+        'dominated': sum(row['status'] == DOMINATED for row in all_rows),
+        'screened': sum(row['status'] == SCREENED for row in all_rows),
+        'replications': replications,
+        'wall_time': time.perf_counter() - start
+    }
+
+
+def _adds_idle_machine(rows, rate, machines, names, slack_utilization):
+    """True if some evaluated parent (one machine fewer at a station) left that station idle"""
+    for index, name in enumerate(names):
+        parent = rows.get((rate, machines[:index] + (machines[index] - 1,) + machines[index + 1:]))
+        if parent is not None and parent['status'] == EVALUATED and parent['utilization'][name] < slack_utilization:
+            return True
+    return False
@@ -0,0 +1,150 @@
+# car_store.py
+# Compact columnar storage for completed cars
+
+import numpy as np
+
+
+def car_record_fields(station_names):
+    """
+    Return the column names of a car record, in order.
+
+    Args:
+        station_names (list): Station names in processing order
+
+    Returns:
+        list: "car_id", "arrival_time", then "<station>_start_time" and
+            "<station>_end_time" per station, then "exit_time"
+    """
+    fields = ["car_id", "arrival_time"]
+    for name in station_names:
+        fields.append(f"{name.lower()}_start_time")
+        fields.append(f"{name.lower()}_end_time")
+    fields.append("exit_time")
+    return fields
+
+
+class CarStore:
+    """
+    Completed cars stored as one structured NumPy array (one column per timestamp).
+
+    Each car costs 8 bytes per column instead of a full Python object, and
+    derived metrics are computed over whole columns at once. The array
+    doubles in size whenever it fills up.
+    """
+
+    def __init__(self, station_names, capacity=1024):
+        """
+        Initialize an empty store.
+
+        Args:
+            station_names (list): Station names in processing order
+            capacity (int): Initial number of rows to allocate
+        """
+        self.station_names = list(station_names)
+        self.fields = car_record_fields(self.station_names)
+        self.dtype = np.dtype([("car_id", np.int64)] + [(name, np.float64) for name in self.fields[1:]])
+        self._data = np.zeros(max(1, capacity), dtype=self.dtype)
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def _grow(self, min_capacity):
+        """Reallocate to at least min_capacity rows"""
+        capacity = len(self._data)
+        while capacity < min_capacity:
+            capacity *= 2
+        data = np.zeros(capacity, dtype=self.dtype)
+        data[:self._size] = self._data[:self._size]
+        self._data = data
+
+    def append(self, car):
+        """Copy a finished Car's timestamps into the next row"""
+        if self._size == len(self._data):
+            self._grow(self._size + 1)
+        row = [car.car_id, car.arrival_time]
+        for start, end in zip(car.start_times, car.end_times):
+            row.append(start)
+            row.append(end)
+        row.append(car.exit_time)
+        self._data[self._size] = tuple(row)
+        self._size += 1
+
+    def append_columns(self, columns):
+        """
+        Append many cars at once.
+
+        Args:
+            columns (dict): Field name -> array, all of the same length
+        """
+        count = len(columns["car_id"])
+        if self._size + count > len(self._data):
+            self._grow(self._size + count)
+        rows = self._data[self._size:self._size + count]
+        for name in self.fields:
+            rows[name] = columns[name]
+        self._size += count
+
+    @property
+    def records(self):
+        """Structured array of all stored cars (a view, not a copy)"""
+        return self._data[:self._size]
+
+    def column(self, name):
+        """Return one column as an array view"""
+        return self._data[name][:self._size]
+
+    def system_times(self):
+        """Total time in the system for every car"""
+        return self.column("exit_time") - self.column("arrival_time")
+
+    def wait_times(self, station_name):
+        """
+        Time each car waited before starting service at a station.
+
+        Args:
+            station_name (str): Station name (e.g. "Primer")
+        """
+        index = self.station_names.index(station_name)
+        if index == 0:
+            ready = self.column("arrival_time")
+        else:
+            ready = self.column(f"{self.station_names[index - 1].lower()}_end_time")
+        return self.column(f"{station_name.lower()}_start_time") - ready
+
+    def processing_times(self, station_name):
+        """Time each car spent being processed at a station"""
+        prefix = station_name.lower()
+        return self.column(f"{prefix}_end_time") - self.column(f"{prefix}_start_time")
+
+    def to_npz(self, path):
+        """Save all columns to a compressed .npz file (one array per column)"""
+        np.savez_compressed(path, station_names=np.array(self.station_names),
+                            **{name: self.column(name) for name in self.fields})
+
+    def to_csv(self, path):
+        """Save all cars to a CSV file with a header row"""
+        formats = ["%d"] + ["%.6f"] * (len(self.fields) - 1)
+        np.savetxt(path, self.records, delimiter=",", fmt=formats, header=",".join(self.fields), comments="")
+
+    def to_parquet(self, path):
+        """Save all cars to a Parquet file (requires pyarrow)"""
+        try:
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise ImportError("Parquet export requires pyarrow (pip install pyarrow)")
+
+        table = pa.table({name: self.column(name) for name in self.fields})
+        pq.write_table(table, path)
+
+    @classmethod
+    def from_npz(cls, path):
+        """Load a store saved with to_npz()"""
+        with np.load(path) as data:
+            store = cls(data["station_names"].tolist(), capacity=len(data["car_id"]))
+            store.append_columns({name: data[name] for name in store.fields})
+        return store
+
+    def __repr__(self):
+        return f"CarStore({self._size} cars)"
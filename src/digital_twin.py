@@ -0,0 +1,515 @@
+# digital_twin.py
+# Keeps the line model in step with live station events and forecasts the rest of the shift
+
+import asyncio
+import dataclasses
+import json
+import logging
+import math
+import os
+import pickle
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from src import event_log
+from src.bottleneck_detector import BottleneckDetector
+from src.car_store import CarStore
+from src.entities import Car, Station
+from src.output_analysis import mean_confidence_interval
+from src.scenario import resolve_scenario
+from src.snapshot import CarState, SimulationSnapshot, restore
+from src.streaming_stats import RunningStats, QuantileSketch
+from src.variates import make_sampler
+
+# Event names accepted from the line controller
+ARRIVED = "ARRIVED"  # A car entered the line (joins the first station's queue)
+STARTED = "STARTED"  # A car started processing at a station
+FINISHED = "FINISHED"  # A car finished at a station (joins the next queue, or leaves the line)
+EVENT_TYPES = (ARRIVED, STARTED, FINISHED)
+
+logger = logging.getLogger(__name__)
+
+
+def parse_event(line):
+    """
+    Parse one controller event, a JSON object per line.
+
+    Example: {"time": 125.3, "event": "STARTED", "car": "B-1042", "station": "Primer"}
+    ("time" is minutes since the shift started; "station" is not needed for ARRIVED)
+
+    Returns:
+        dict: 'time', 'event', 'car' and 'station' (None if absent)
+
+    Raises:
+        ValueError: If the line is not a well-formed event
+    """
+    try:
+        data = json.loads(line)
+        event = str(data["event"]).upper()
+        parsed = {'time': float(data["time"]), 'event': event, 'car': data["car"], 'station': data.get("station")}
+        hash(parsed['car'])
+    except KeyError as error:
+        raise ValueError(f"Event without {error.args[0]!r}: {line.strip()!r}") from None
+    except (TypeError, ValueError) as error:
+        raise ValueError(f"Malformed event ({error}): {line.strip()!r}") from None
+    if event not in EVENT_TYPES:
+        raise ValueError(f"Unknown event {event!r} (expected one of {', '.join(EVENT_TYPES)})")
+    return parsed
+
+
+class LiveLineState:
+    """
+    State of the real line, rebuilt incrementally from controller events.
+
+    Keeps the same accumulators as PaintShopSimulation (Station statistics,
+    bottleneck detector, system-time statistics, completed cars), so the
+    live state can be turned into a SimulationSnapshot and continued by the
+    simulation at any moment. Controller car IDs (any hashable) are mapped
+    to the simulation's sequential IDs in arrival order.
+    """
+
+    def __init__(self, scenario=None):
+        """
+        Args:
+            scenario (Scenario): Line being mirrored (default: Scenario.from_config())
+        """
+        self.scenario = scenario = resolve_scenario(scenario)
+        self.stage_of = {name: stage for stage, name in enumerate(scenario.station_names)}
+        self.stations = [Station(spec.name, spec.machines) for spec in scenario.stations]
+        self.bottleneck_detector = BottleneckDetector(scenario.bottleneck_threshold,
+                                                      scenario.bottleneck_clear_threshold)
+        self.alert_count = 0
+        self.system_time_stats = RunningStats()
+        self.system_time_sketch = QuantileSketch()
+        self.cars_completed = CarStore(scenario.station_names)
+
+        self.car_ids = {}  # Controller car ID -> Car in the line
+        self.waiting = [{} for _ in scenario.stations]  # Per stage: cars waiting, in arrival order
+        self.in_service = [{} for _ in scenario.stations]  # Per stage: cars being processed
+        self.car_counter = 0
+        self.last_arrival_time = 0.0
+        self.now = 0.0  # Time of the latest event
+        self.events_applied = 0
+        self.events_rejected = 0  # Counted by DigitalTwin.ingest()
+
+    @property
+    def cars_in_system(self):
+        """Cars in the line now"""
+        return len(self.car_ids)
+
+    def _join(self, car, stage, time):
+        """A car becomes ready for a stage and waits for a machine"""
+        waiting = self.waiting[stage]
+        waiting[car.car_id] = car
+        self._queue_changed(stage, len(waiting), time)
+
+    def _queue_changed(self, stage, queue_length, time):
+        station = self.stations[stage]
+        station.update_queue(queue_length, time)
+        if self.bottleneck_detector.check_bottleneck(station.name, queue_length, time):
+            self.alert_count += 1
+
+    def _stage(self, event):
+        try:
+            return self.stage_of[event['station']]
+        except KeyError:
+            raise ValueError(f"Unknown station {event['station']!r} in {event['event']} event")
+
+    def apply(self, event):
+        """
+        Update the state with one event (from parse_event()).
+
+        Events must arrive in time order. An event that does not fit the
+        state (out of order, or for an unknown car or station) raises
+        ValueError and leaves the state unchanged.
+        """
+        time = event['time']
+        if time < self.now:
+            raise ValueError(f"Event at {time} is earlier than the last one ({self.now})")
+        kind = event['event']
+
+        if kind == ARRIVED:
+            if event['car'] in self.car_ids:
+                raise ValueError(f"Car {event['car']!r} arrived while already in the line")
+            self.now = time
+            self.events_applied += 1
+            self.car_counter += 1
+            car = Car(self.car_counter, time)
+            self.car_ids[event['car']] = car
+            self.last_arrival_time = time
+            self._join(car, 0, time)
+            return
+
+        car = self.car_ids.get(event['car'])
+        if car is None:
+            raise ValueError(f"{kind} event for car {event['car']!r}, which is not in the line")
+        stage = self._stage(event)
+        station = self.stations[stage]
+
+        if kind == STARTED:
+            waiting = self.waiting[stage]
+            if waiting.pop(car.car_id, None) is None:
+                raise ValueError(f"Car {event['car']!r} started {station.name} without waiting for it")
+            self.now = time
+            self.events_applied += 1
+            self._queue_changed(stage, len(waiting), time)
+            car.start_times.append(time)
+            station.add_wait_time(time - (car.end_times[-1] if stage else car.arrival_time))
+            self.in_service[stage][car.car_id] = car
+            return
+
+        if self.in_service[stage].pop(car.car_id, None) is None:
+            raise ValueError(f"Car {event['car']!r} finished {station.name} without starting it")
+        self.now = time
+        self.events_applied += 1
+        car.end_times.append(time)
+        service_time = time - car.start_times[-1]
+        station.add_processing_time(service_time)
+        station.total_busy_time += service_time
+
+        if stage + 1 < len(self.stations):
+            self._join(car, stage + 1, time)
+            return
+
+        # Last station: the car leaves the line
+        del self.car_ids[event['car']]
+        car.exit_time = time
+        system_time = time - car.arrival_time
+        self.system_time_stats.add(system_time)
+        self.system_time_sketch.add(system_time)
+        self.cars_completed.append(car)
+
+    def snapshot(self):
+        """
+        Capture the live state as a SimulationSnapshot template.
+
+        Processing times of cars in service are not known yet: their
+        CarState.service_time holds the time already spent, and each
+        forecast replication draws the rest (see forecast_replication()).
+        Likewise next_arrival_time holds the last arrival time, or None once
+        acceptance has closed.
+        """
+        def state(car, elapsed=None):
+            return CarState(car.car_id, car.arrival_time, tuple(car.start_times), tuple(car.end_times), elapsed)
+
+        stages = tuple(
+            (tuple(state(car, self.now - car.start_times[-1]) for car in in_service.values()),
+             tuple(state(car) for car in waiting.values()))
+            for in_service, waiting in zip(self.in_service, self.waiting)
+        )
+        accumulators = {
+            'stations': self.stations,
+            'detector': self.bottleneck_detector,
+            'alert_count': self.alert_count,
+            'system_time_stats': self.system_time_stats,
+            'system_time_sketch': self.system_time_sketch,
+            'cars_completed': self.cars_completed
+        }
+        return SimulationSnapshot(
+            time=self.now,
+            scenario=self.scenario,
+            seed=None,
+            antithetic=False,
+            arrivals_drawn=0,
+            next_arrival_time=self.last_arrival_time if self.now < self.scenario.acceptance_time else None,
+            car_counter=self.car_counter,
+            stages=stages,
+            accumulators=pickle.dumps(accumulators, protocol=pickle.HIGHEST_PROTOCOL)
+        )
+
+
+def residual_draw(sampler, generator, elapsed, attempts=64):
+    """
+    Draw a duration given that it has already lasted elapsed minutes.
+
+    Rejection sampling from the distribution; if no draw in a batch exceeds
+    elapsed (the activity is overdue), it is taken to end now.
+    """
+    draws = sampler(generator, attempts)
+    longer = draws[draws > elapsed]
+    return float(longer[0]) if len(longer) else elapsed
+
+
+def forecast_replication(seed, template, shift_end):
+    """
+    Continue the live state once to the end of the line's work.
+
+    Module-level so it can be sent to worker processes.
+
+    Args:
+        seed (numpy.random.SeedSequence): Seed of this replication
+        template (SimulationSnapshot): From LiveLineState.snapshot()
+        shift_end (float): Exits are counted up to this time
+
+    Returns:
+        dict: 'exits_by_shift_end', 'end_time' (when the line empties) and
+            'queue_clear_time' (station -> first time its queue is empty, None if never)
+    """
+    generator = np.random.default_rng(seed)
+    scenario = template.scenario
+    now = template.time
+
+    # Remaining processing of the cars in service, and the next arrival
+    stages = []
+    for spec, (in_service, waiting) in zip(scenario.stations, template.stages):
+        sampler = make_sampler(spec.distribution)
+        in_service = tuple(car._replace(service_time=residual_draw(sampler, generator, car.service_time))
+                           for car in in_service)
+        stages.append((in_service, waiting))
+    next_arrival_time = template.next_arrival_time
+    if next_arrival_time is not None:
+        elapsed = now - next_arrival_time
+        next_arrival_time += residual_draw(make_sampler(scenario.arrival_distribution), generator, elapsed)
+
+    snapshot = dataclasses.replace(template, seed=seed, stages=tuple(stages), next_arrival_time=next_arrival_time)
+    sim = restore(snapshot)
+    queue_lengths = [station.current_queue_length for station in sim.stations]
+    for station in sim.stations:
+        station.keep_history = True
+        station.queue_length_history = []
+    results = sim.run()
+
+    exit_times = results['cars_completed'].column("exit_time")
+    queue_clear_time = {}
+    for station, queue_length in zip(sim.stations, queue_lengths):
+        if queue_length == 0:
+            queue_clear_time[station.name] = now
+        else:
+            queue_clear_time[station.name] = next(
+                (time for time, length in station.queue_length_history if length == 0), None)
+    return {
+        'exits_by_shift_end': int((exit_times <= shift_end).sum()),
+        'end_time': results['end_time'],
+        'queue_clear_time': queue_clear_time
+    }
+
+
+class DigitalTwin:
+    """
+    Live mirror of the line that forecasts the rest of the shift on demand.
+
+    Events update a LiveLineState as they arrive; forecast() captures it
+    and runs many replications of the remaining shift from it in a process
+    pool kept open between forecasts. run() drives both from an asyncio
+    event source.
+    """
+
+    def __init__(self, scenario=None, shift_end=None, replications=64, workers=None, base_seed=None):
+        """
+        Args:
+            scenario (Scenario): Line being mirrored (default: Scenario.from_config())
+            shift_end (float): Time exits are counted up to (default: the scenario's simulation_time)
+            replications (int): Replications per forecast
+            workers (int): Worker processes (None = CPU count, 1 = run in this process)
+            base_seed (int): Root seed of the forecasts (None = fresh entropy)
+        """
+        self.state = LiveLineState(scenario)
+        self.scenario = self.state.scenario
+        self.shift_end = self.scenario.simulation_time if shift_end is None else shift_end
+        self.replications = replications
+        self.workers = workers or os.cpu_count() or 1
+        self.seeds = np.random.SeedSequence(base_seed)
+        self._pool = None
+
+    def apply(self, event):
+        """Update the live state with one event (a dict from parse_event())"""
+        self.state.apply(event)
+
+    def ingest(self, line):
+        """
+        Parse and apply one controller event, rejecting it if it is bad.
+
+        A malformed line, or an event that does not fit the live state, is
+        logged and counted in state.events_rejected instead of raised, so
+        one bad message does not end a session.
+
+        Args:
+            line (str or dict): JSON event line, or an event from parse_event()
+
+        Returns:
+            bool: Whether the event was applied
+        """
+        try:
+            self.apply(parse_event(line) if isinstance(line, (str, bytes)) else line)
+        except ValueError as error:
+            self.state.events_rejected += 1
+            logger.warning("Rejected event %d: %s", self.state.events_rejected, error)
+            return False
+        return True
+
+    def forecast(self, confidence=None, template=None):
+        """
+        Forecast the rest of the shift from the current state.
+
+        Args:
+            confidence (float): Confidence level (default: the scenario's confidence_level)
+            template (SimulationSnapshot): State to start from (default:
+                self.state.snapshot(), taken now)
+
+        Returns:
+            dict: 'time', 'cars_in_system', 'cars_exited', 'exits_by_shift_end'
+                (interval plus p10/p90), 'end_time' (interval),
+                'queue_clear_time' (station -> mean, p10, p90 and the share
+                of replications in which the queue never clears),
+                'events_rejected' and 'latency' (seconds)
+        """
+        start = time.perf_counter()
+        if confidence is None:
+            confidence = self.scenario.confidence_level
+        if template is None:
+            template = self.state.snapshot()
+        seeds = self.seeds.spawn(self.replications)
+        run = partial(forecast_replication, template=template, shift_end=self.shift_end)
+        if self.workers == 1:
+            outcomes = [run(seed) for seed in seeds]
+        else:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(max_workers=self.workers)
+            chunksize = math.ceil(len(seeds) / self.workers)
+            outcomes = list(self._pool.map(run, seeds, chunksize=chunksize))
+
+        exits = np.array([outcome['exits_by_shift_end'] for outcome in outcomes])
+        queue_clear_time = {}
+        for name in self.scenario.station_names:
+            times = np.array([outcome['queue_clear_time'][name] for outcome in outcomes
+                              if outcome['queue_clear_time'][name] is not None])
+            queue_clear_time[name] = {
+                'mean': float(times.mean()) if len(times) else None,
+                'p10': float(np.percentile(times, 10)) if len(times) else None,
+                'p90': float(np.percentile(times, 90)) if len(times) else None,
+                'never': 1 - len(times) / len(outcomes)
+            }
+        return {
+            'time': template.time,
+            'cars_in_system': template.cars_in_system,
+            'cars_exited': template.car_counter - template.cars_in_system,
+            'shift_end': self.shift_end,
+            'replications': len(outcomes),
+            'exits_by_shift_end': dict(mean_confidence_interval(exits.tolist(), confidence),
+                                       p10=float(np.percentile(exits, 10)), p90=float(np.percentile(exits, 90))),
+            'end_time': mean_confidence_interval([outcome['end_time'] for outcome in outcomes], confidence),
+            'queue_clear_time': queue_clear_time,
+            'events_rejected': self.state.events_rejected,
+            'latency': time.perf_counter() - start
+        }
+
+    def close(self):
+        """Shut down the worker pool"""
+        if self._pool is not None:
+            self._pool.shutdown()
+            self._pool = None
+
+    async def run(self, events, interval=5.0, on_forecast=print):
+        """
+        Ingest events and forecast every interval seconds until the source ends.
+
+        The state is captured on the event loop, then the forecast runs in a
+        worker thread (which feeds the process pool), so ingestion carries
+        on while it is computed. A last forecast is made when the source ends.
+        Bad events are rejected one by one (see ingest()).
+
+        Args:
+            events: Async iterator of JSON event lines or event dicts
+                (e.g. tail_events(), socket_events())
+            interval (float): Wall-clock seconds between forecasts
+            on_forecast (callable): Called with each forecast dict
+        """
+        loop = asyncio.get_running_loop()
+
+        async def forecast_now():
+            forecast = partial(self.forecast, template=self.state.snapshot())
+            on_forecast(await loop.run_in_executor(None, forecast))
+
+        async def forecast_periodically():
+            while True:
+                await asyncio.sleep(interval)
+                if self.state.events_applied:
+                    await forecast_now()
+
+        forecaster = asyncio.create_task(forecast_periodically())
+        try:
+            async for event in events:
+                self.ingest(event)
+        finally:
+            forecaster.cancel()
+            try:
+                await forecaster
+            except asyncio.CancelledError:
+                pass
+        if self.state.events_applied:
+            await forecast_now()
+
+
+async def tail_events(path, poll_interval=0.2, idle_timeout=None):
+    """
+    Yield event lines from a JSON-lines file as the controller appends to it.
+
+    Lines are passed on unparsed (see parse_event()), so the consumer
+    decides what to do with a malformed one.
+
+    Args:
+        path (str): Event file
+        poll_interval (float): Seconds between checks for new lines
+        idle_timeout (float): Stop after this many seconds without a new line
+            (None = follow the file forever)
+    """
+    with open(path) as f:
+        buffer = ""
+        idle = 0.0
+        while True:
+            chunk = f.readline()
+            if chunk:
+                idle = 0.0
+                buffer += chunk
+                if buffer.endswith("\n"):
+                    if buffer.strip():
+                        yield buffer
+                    buffer = ""
+                continue
+            if idle_timeout is not None and idle >= idle_timeout:
+                return
+            await asyncio.sleep(poll_interval)
+            idle += poll_interval
+
+
+async def socket_events(host="127.0.0.1", port=9000):
+    """
+    Yield event lines sent by controllers connecting over TCP.
+
+    Runs a server on host:port for as long as the iteration goes on. Lines
+    are passed on unparsed, as in tail_events().
+    """
+    queue = asyncio.Queue()
+
+    async def handle(reader, writer):
+        while line := await reader.readline():
+            if line.strip():
+                await queue.put(line.decode())
+        writer.close()
+
+    server = await asyncio.start_server(handle, host, port)
+    async with server:
+        while True:
+            yield await queue.get()
+
+
+def write_feed(trace, path):
+    """
+    Write a recorded run (an EventTrace) as a controller event feed.
+
+    Gives a realistic JSON-lines feed to try the twin with.
+
+    Args:
+        trace (EventTrace): Recorded run (see src/event_trace.py)
+        path (str): Output file
+    """
+    names = {event_log.CAR_ARRIVED: ARRIVED, event_log.SERVICE_STARTED: STARTED,
+             event_log.SERVICE_FINISHED: FINISHED}
+    with open(path, "w") as f:
+        for time_, car_id, station_id, code in trace.records.tolist():
+            if code in names:
+                event = {'time': time_, 'event': names[code], 'car': car_id}
+                if code != event_log.CAR_ARRIVED:
+                    event['station'] = trace.station_names[station_id]
+                f.write(json.dumps(event) + "\n")
@@ -1,3 +1,18 @@
+from collections import namedtuple
+from src.streaming_stats import RunningStats, QuantileSketch
+
+
+class StationSpec(namedtuple("StationSpec", ["name", "machines", "distribution"])):
+    """
+    Immutable description of one station in the line.
+    
+    Fields:
+        name (str): Station name (also names its random stream)
+        machines (int): Number of parallel machines
+        distribution (tuple): Processing time distribution spec (see src/variates.py)
+    """
+    __slots__ = ()
+
 
 class Car:
     """
@@ -5,6 +20,9 @@ class Car:
     Tracks all timestamps as the car moves through stations.
     """
     
+    # No per-instance __dict__: cars in flight stay small
+    __slots__ = ("car_id", "arrival_time", "start_times", "end_times", "exit_time")
+    
     def __init__(self, car_id, arrival_time):
         """
         Initialize a new car.
@@ -16,15 +34,9 @@ class Car:
         self.car_id = car_id
         self.arrival_time = arrival_time
         
-        # Timestamps for each station
-        self.cleaning_start_time = None
-        self.cleaning_end_time = None
-        
-        self.primer_start_time = None
-        self.primer_end_time = None
-        
-        self.painting_start_time = None
-        self.painting_end_time = None
+        # Service start/end time at each station, in processing order
+        self.start_times = []
+        self.end_times = []
         
         # System exit time
         self.exit_time = None
@@ -35,23 +47,17 @@ class Car:
             return None
         return self.exit_time - self.arrival_time
     
-    def get_cleaning_wait_time(self):
-        """Calculate wait time before cleaning"""
-        if self.cleaning_start_time is None:
-            return None
-        return self.cleaning_start_time - self.arrival_time
-    
-    def get_primer_wait_time(self):
-        """Calculate wait time before primer"""
-        if self.primer_start_time is None:
-            return None
-        return self.primer_start_time - self.cleaning_end_time
-    
-    def get_painting_wait_time(self):
-        """Calculate wait time before painting"""
-        if self.painting_start_time is None:
+    def get_wait_time(self, stage):
+        """
+        Calculate wait time before a station.
+        
+        Args:
+            stage (int): Station position in the line (0 = first station)
+        """
+        if stage >= len(self.start_times):
             return None
-        return self.painting_start_time - self.primer_end_time
+        ready_time = self.arrival_time if stage == 0 else self.end_times[stage - 1]
+        return self.start_times[stage] - ready_time
     
     def __repr__(self):
         return f"Car_{self.car_id}"
@@ -60,59 +66,101 @@ class Car:
 class Station:
     """
     Represents a work station with metrics tracking.
+    
+    Statistics are kept as running accumulators, so memory stays constant
+    however long the run. Raw per-car lists (wait_times, processing_times,
+    queue_length_history) are only filled when keep_history is True.
     """
     
-    def __init__(self, name, num_machines):
+    def __init__(self, name, num_machines, keep_history=False):
         """
         Initialize a station.
         
         Args:
             name (str): Station name (e.g., "Cleaning", "Primer", "Painting")
             num_machines (int): Number of machines at this station
+            keep_history (bool): Also keep every wait, processing time and queue change
         """
         self.name = name
         self.num_machines = num_machines
+        self.keep_history = keep_history
         self.num_busy = 0  # Current number of busy machines
         self.total_busy_time = 0  # Cumulative busy time
         self.current_queue_length = 0  # Current cars waiting
         self.max_queue_length = 0  # Peak queue length ever seen
         
-        # For calculating average queue length
-        self.queue_length_history = []  # List of (time, queue_length) tuples
+        # For calculating time-weighted average queue length
+        self.queue_area = 0.0  # Integral of queue length over time
         self.last_queue_change_time = 0
         
-        # Wait times for all cars at this station
-        self.wait_times = []
+        # Running statistics for wait and processing times
+        self.wait_stats = RunningStats()
+        self.processing_stats = RunningStats()
+        self.wait_sketch = QuantileSketch()  # For wait time percentiles
         
-        # Processing times for all cars at this station
+        # Raw history (only filled when keep_history is True)
+        self.queue_length_history = []  # List of (time, queue_length) tuples
+        self.wait_times = []
         self.processing_times = []
     
     def add_wait_time(self, wait_time):
         """Record a car's wait time at this station"""
-        self.wait_times.append(wait_time)
+        self.wait_stats.add(wait_time)
+        self.wait_sketch.add(wait_time)
+        if self.keep_history:
+            self.wait_times.append(wait_time)
     
     def add_processing_time(self, processing_time):
         """Record a car's processing time at this station"""
-        self.processing_times.append(processing_time)
+        self.processing_stats.add(processing_time)
+        if self.keep_history:
+            self.processing_times.append(processing_time)
     
     def update_queue(self, new_length, current_time):
-        """Update queue length and track history"""
+        """Update queue length and its time-weighted integral"""
+        self.queue_area += self.current_queue_length * (current_time - self.last_queue_change_time)
+        self.last_queue_change_time = current_time
         self.current_queue_length = new_length
         if new_length > self.max_queue_length:
             self.max_queue_length = new_length
-        self.queue_length_history.append((current_time, new_length))
+        if self.keep_history:
+            self.queue_length_history.append((current_time, new_length))
     
     def get_avg_wait_time(self):
         """Calculate average wait time at this station"""
-        if len(self.wait_times) == 0:
-            return 0
-        return sum(self.wait_times) / len(self.wait_times)
+        return self.wait_stats.mean
     
     def get_avg_processing_time(self):
         """Calculate average processing time at this station"""
-        if len(self.processing_times) == 0:
+        return self.processing_stats.mean
+    
+    def get_wait_percentile(self, percentile):
+        """
+        Estimate a wait time percentile (within 1%).
+        
+        Args:
+            percentile (float): Percentile between 0 and 100 (e.g. 95)
+        """
+        return self.wait_sketch.get_quantile(percentile / 100)
+    
+    def get_processed_count(self):
+        """Number of cars that finished processing at this station"""
+        return self.processing_stats.count
+    
+    def get_avg_queue_length(self, end_time):
+        """
+        Calculate the time-weighted average queue length.
+        
+        Args:
+            end_time (float): Time up to which to average (usually the end of the run)
+        """
+        if end_time <= 0:
             return 0
-        return sum(self.processing_times) / len(self.processing_times)
+        return self.get_queue_area(end_time) / end_time
+    
+    def get_queue_area(self, current_time):
+        """Integral of queue length over time from 0 up to current_time"""
+        return self.queue_area + self.current_queue_length * (current_time - self.last_queue_change_time)
     
     def get_utilization(self, total_simulation_time):
         """
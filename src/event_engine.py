@@ -0,0 +1,327 @@
+# event_engine.py
+# Discrete-event engine on a plain heapq calendar (no SimPy processes, requests or timeouts)
+
+import heapq
+from collections import deque
+import numpy as np
+from src import event_log
+from src.entities import Station
+from src.car_store import CarStore
+from src.bottleneck_detector import BottleneckDetector
+from src.event_log import EventLogger
+from src.fast_engine import draw_line_inputs
+from src.streaming_stats import RunningStats, QuantileSketch
+from src.scenario import resolve_scenario
+from src.simulation import PaintShopSimulation
+from src.variates import VariateSupply
+
+# Calendar event kinds
+ARRIVAL = 0  # A car reaches the line (or the arrival that closes acceptance)
+DEPARTURE = 1  # A car finishes processing at a station
+
+
+class EventLineSimulation:
+    """
+    Event-by-event engine for the serial FIFO line, with PaintShopSimulation's interface.
+
+    The calendar is a binary heap of (time, sequence, kind, car, stage)
+    tuples; the sequence number keeps events at equal times in scheduling
+    order. Cars are integer indices into preallocated lists, and each
+    station is a FIFO deque of waiting cars plus a count of free machines.
+    Every queue change still goes through the same Station accumulators and
+    BottleneckDetector as the SimPy engine, so results agree with it car
+    for car on the same seed (see validate_event_engine()).
+    """
+
+    def __init__(self, scenario=None, seed=None, log_level=None, log_path=None, verbose=None, keep_history=None,
+                 stations=None, keep_cars=True, antithetic=False, inputs=None):
+        """
+        Initialize the engine.
+
+        Args:
+            scenario (Scenario): Scenario to run (default: Scenario.from_config())
+            seed (int or numpy.random.SeedSequence): Seed for this run's random streams
+            log_level (str): Log level override ("DETAILED", "SUMMARY", "MINIMAL" or "OFF")
+            log_path (str): Log file path override
+            verbose (bool): Echo logged lines to the console
+            keep_history (bool): Keep raw per-car lists in each Station
+            stations (list): Line layout override as (name, machines, distribution) specs
+            keep_cars (bool): Store every completed car in 'cars_completed'
+            antithetic (bool): Use the antithetic twin of the seed's random streams
+            inputs (tuple): Pre-drawn (interarrival_times, service_times), as
+                fast_engine.draw_line_inputs() returns; drawn from the seed when not given
+        """
+        self.scenario = scenario = resolve_scenario(
+            scenario, log_level=log_level, log_file_path=log_path, verbose=verbose,
+            keep_station_history=keep_history, stations=stations
+        )
+        self.station_specs = list(scenario.stations)
+        self.acceptance_time = scenario.acceptance_time
+        self.variates = VariateSupply(seed, scenario=scenario, antithetic=antithetic)
+        self.inputs = inputs
+        self.keep_cars = keep_cars
+
+        self.stations = [Station(spec.name, spec.machines, scenario.keep_station_history)
+                         for spec in self.station_specs]
+        self.cars_completed = CarStore([spec.name for spec in self.station_specs])
+        self.system_time_stats = RunningStats()
+        self.system_time_sketch = QuantileSketch()
+        self.cars_truncated = 0
+        self.end_time = 0.0
+        self.events_processed = 0  # Calendar events handled by the last run()
+
+        self.logger = EventLogger(scenario.log_file_path, scenario.log_level,
+                                  buffer_size=scenario.log_buffer_size, echo=scenario.verbose)
+        self.bottleneck_detector = BottleneckDetector(scenario.bottleneck_threshold,
+                                                      scenario.bottleneck_clear_threshold)
+        self.alert_count = 0
+
+    def queue_changed(self, stage, queue_length, now):
+        """Record a station's new queue length and check it for a bottleneck"""
+        station = self.stations[stage]
+        station.update_queue(queue_length, now)
+        if self.bottleneck_detector.check_bottleneck(station.name, queue_length, now):
+            self.alert_count += 1
+            self.logger.event(event_log.BOTTLENECK_ALERT, now, station=station.name, value=queue_length)
+
+    def run(self):
+        """
+        Run the shift until the line is empty after acceptance closes (or the safety cap).
+        """
+        if self.inputs is None:
+            self.inputs = draw_line_inputs(self.variates, [spec.name for spec in self.station_specs],
+                                           self.acceptance_time)
+        interarrival_times, service_times = self.inputs
+        arrival_times = np.cumsum(interarrival_times).tolist()
+        num_cars = len(arrival_times) - 1  # The last arrival only closes acceptance
+        num_stages = len(self.stations)
+        names = [station.name for station in self.stations]
+        services = [service_times[name].tolist() for name in names]
+
+        # Per-car state, indexed by car (car ID - 1)
+        ready = arrival_times[:num_cars]  # When each car became ready for its current stage
+        start_times = [[0.0] * num_cars for _ in range(num_stages)]
+        end_times = [[0.0] * num_cars for _ in range(num_stages)]
+        exited = []  # Cars in exit order
+
+        # Per-station state
+        free = [spec.machines for spec in self.station_specs]
+        queues = [deque() for _ in range(num_stages)]
+        waits = [[] for _ in range(num_stages)]
+        processed = [[] for _ in range(num_stages)]
+
+        logger = self.logger
+        logging = logger.level > event_log.OFF
+        log = logger.event
+        queue_changed = self.queue_changed
+        heappush, heappop = heapq.heappush, heapq.heappop
+
+        cap_time = self.acceptance_time + self.scenario.max_drain_time
+        calendar = [(arrival_times[0], 0, ARRIVAL, 0, 0)]
+        sequence = 1
+        cars_in_system = 0
+        accepting = True
+        events = 0
+        now = 0.0
+
+        if logging:
+            log(event_log.SEPARATOR, now)
+            log(event_log.SIMULATION_STARTED, now)
+            log(event_log.SEPARATOR, now)
+
+        while calendar:
+            if calendar[0][0] >= cap_time:
+                now = cap_time
+                break
+            now, _, kind, car, stage = heappop(calendar)
+            events += 1
+
+            if kind == ARRIVAL:
+                if now >= self.acceptance_time:
+                    if logging:
+                        log(event_log.STOP_ACCEPTING, now, value=self.acceptance_time)
+                    accepting = False
+                    if cars_in_system == 0:
+                        break
+                    continue
+                if logging:
+                    log(event_log.CAR_ARRIVED, now, car + 1)
+                cars_in_system += 1
+                heappush(calendar, (arrival_times[car + 1], sequence, ARRIVAL, car + 1, 0))
+                sequence += 1
+            else:
+                # Service finished: record it and free the machine
+                service = services[stage][car]
+                end_times[stage][car] = now
+                processed[stage].append(service)
+                if logging:
+                    log(event_log.SERVICE_FINISHED, now, car + 1, names[stage])
+
+                queue = queues[stage]
+                if queue:
+                    # The first waiting car takes the machine
+                    waiting = queue.popleft()
+                    queue_changed(stage, len(queue), now)
+                    start_times[stage][waiting] = now
+                    waits[stage].append(now - ready[waiting])
+                    if logging:
+                        log(event_log.SERVICE_STARTED, now, waiting + 1, names[stage])
+                    heappush(calendar, (now + services[stage][waiting], sequence, DEPARTURE, waiting, stage))
+                    sequence += 1
+                else:
+                    free[stage] += 1
+
+                ready[car] = now
+                stage += 1
+                if stage == num_stages:
+                    # Car exits the line
+                    exited.append(car)
+                    cars_in_system -= 1
+                    if logging:
+                        log(event_log.CAR_EXITED, now, car + 1, value=now - arrival_times[car])
+                    if cars_in_system == 0 and not accepting:
+                        break
+                    continue
+
+            # The car joins the next station: straight to a free machine, or to the queue
+            if logging:
+                log(event_log.QUEUE_ENTERED, now, car + 1, names[stage])
+            if free[stage]:
+                free[stage] -= 1
+                start_times[stage][car] = now
+                waits[stage].append(0.0)
+                if logging:
+                    log(event_log.SERVICE_STARTED, now, car + 1, names[stage])
+                heappush(calendar, (now + services[stage][car], sequence, DEPARTURE, car, stage))
+                sequence += 1
+            else:
+                queue = queues[stage]
+                queue.append(car)
+                queue_changed(stage, len(queue), now)
+
+        self.events_processed = events
+        self.end_time = now
+        self.cars_truncated = cars_in_system
+        if cars_in_system and logging:
+            log(event_log.SAFETY_CAP_REACHED, now, value=cars_in_system)
+
+        # Fill the accumulators in bulk
+        for station, station_waits, station_services in zip(self.stations, waits, processed):
+            station.wait_stats.add_many(station_waits)
+            station.wait_sketch.add_many(station_waits)
+            station.processing_stats.add_many(station_services)
+            station.total_busy_time = float(sum(station_services))
+            if station.keep_history:
+                station.wait_times = station_waits
+                station.processing_times = station_services
+
+        exited = np.array(exited, dtype=np.int64)
+        arrivals = np.array(arrival_times[:num_cars])
+        exit_times = np.array(end_times[-1])[exited] if num_stages else arrivals[exited]
+        system_times = exit_times - arrivals[exited]
+        self.system_time_stats.add_many(system_times)
+        self.system_time_sketch.add_many(system_times)
+
+        if self.keep_cars:
+            columns = {"car_id": exited + 1, "arrival_time": arrivals[exited], "exit_time": exit_times}
+            for name, starts, ends in zip(names, start_times, end_times):
+                columns[f"{name.lower()}_start_time"] = np.array(starts)[exited]
+                columns[f"{name.lower()}_end_time"] = np.array(ends)[exited]
+            self.cars_completed.append_columns(columns)
+
+        if logging:
+            log(event_log.SEPARATOR, now)
+            log(event_log.SIMULATION_COMPLETE, now)
+            log(event_log.SEPARATOR, now)
+        logger.close()
+
+        return self.get_results()
+
+    def get_results(self):
+        """
+        Return metrics in the same shape as PaintShopSimulation.get_results().
+        """
+        results = {
+            'total_cars': self.system_time_stats.count,
+            'avg_system_time': self.system_time_stats.mean,
+            'system_time_sketch': self.system_time_sketch,
+            'stations': self.stations,
+            'alert_count': self.alert_count,
+            'cars_completed': self.cars_completed,
+            'simulation_time': self.scenario.simulation_time,
+            'end_time': self.end_time,
+            'cars_truncated': self.cars_truncated,
+            'bottlenecks': self.bottleneck_detector.get_report(self.end_time, [station.name for station in self.stations]),
+            'scenario': self.scenario
+        }
+        for station in self.stations:
+            results[f"{station.name.lower()}_station"] = station
+        return results
+
+
+def validate_event_engine(seed=None, tolerance=1e-9, stations=None, scenario=None):
+    """
+    Run the heap engine and the SimPy engine on the same seed and compare them.
+
+    The conformance check for EventLineSimulation: both engines take each
+    car's arrival and processing times from the same named streams, so
+    every per-car time, queue statistic and bottleneck alert should agree.
+
+    Args:
+        seed (int or numpy.random.SeedSequence): Seed for both runs
+        tolerance (float): Allowed absolute difference between times
+        stations (list): Line layout override
+        scenario (Scenario): Scenario for both runs (default: Scenario.from_config())
+
+    Returns:
+        dict: Largest differences found and an overall 'match' flag
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    heap_results = EventLineSimulation(scenario, seed=seed, log_level="OFF", verbose=False, keep_history=True,
+                                       stations=stations).run()
+    simpy_results = PaintShopSimulation(scenario, seed=seed, log_level="OFF", verbose=False, keep_history=True,
+                                        stations=stations).run()
+
+    heap_cars = heap_results['cars_completed'].records
+    simpy_cars = simpy_results['cars_completed'].records
+    same_cars = len(heap_cars) == len(simpy_cars) and np.array_equal(heap_cars['car_id'], simpy_cars['car_id'])
+    report = {
+        'total_cars': (simpy_results['total_cars'], heap_results['total_cars']),
+        'cars_truncated': (simpy_results['cars_truncated'], heap_results['cars_truncated']),
+        'alert_count': (simpy_results['alert_count'], heap_results['alert_count']),
+        'car_times_diff': max((float(np.abs(simpy_cars[name] - heap_cars[name]).max(initial=0))
+                               for name in simpy_cars.dtype.names), default=0) if same_cars else float("inf"),
+        'end_time_diff': abs(simpy_results['end_time'] - heap_results['end_time']),
+        'bottlenecks_match': simpy_results['bottlenecks'].keys() == heap_results['bottlenecks'].keys() and all(
+            simpy_report['alerts'] == heap_report['alerts']
+            and simpy_report['peak_queue'] == heap_report['peak_queue']
+            and len(simpy_report['intervals']) == len(heap_report['intervals'])
+            and np.allclose(simpy_report['intervals'], heap_report['intervals'], rtol=0, atol=tolerance)
+            for simpy_report, heap_report in zip(simpy_results['bottlenecks'].values(),
+                                                 heap_results['bottlenecks'].values())
+        )
+    }
+
+    for simpy_station, heap_station in zip(simpy_results['stations'], heap_results['stations']):
+        end_time = simpy_results['end_time']
+        report[f"{simpy_station.name}.busy_time_diff"] = abs(simpy_station.total_busy_time
+                                                             - heap_station.total_busy_time)
+        report[f"{simpy_station.name}.avg_queue_diff"] = abs(simpy_station.get_avg_queue_length(end_time)
+                                                             - heap_station.get_avg_queue_length(end_time))
+        report[f"{simpy_station.name}.count_match"] = (
+            len(simpy_station.wait_times) == len(heap_station.wait_times)
+            and len(simpy_station.processing_times) == len(heap_station.processing_times)
+            and simpy_station.max_queue_length == heap_station.max_queue_length
+        )
+
+    report['match'] = (
+        report['total_cars'][0] == report['total_cars'][1]
+        and report['cars_truncated'][0] == report['cars_truncated'][1]
+        and report['alert_count'][0] == report['alert_count'][1]
+        and report['bottlenecks_match']
+        and all(value <= tolerance for name, value in report.items() if name.endswith("_diff"))
+        and all(value for name, value in report.items() if name.endswith("count_match"))
+    )
+    return report
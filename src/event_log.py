@@ -0,0 +1,169 @@
+# event_log.py
+# Level-gated, buffered event logger for the simulation
+
+# ============================================================================
+# LOG LEVELS (higher = more detail)
+# ============================================================================
+OFF = 0
+MINIMAL = 1  # Alerts and shift-end notices only
+SUMMARY = 2  # Also arrivals, exits and start/complete banners
+DETAILED = 3  # Every queue entry, service start and service finish
+
+LEVELS = {
+    "OFF": OFF,
+    "MINIMAL": MINIMAL,
+    "SUMMARY": SUMMARY,
+    "DETAILED": DETAILED,
+}
+
+# ============================================================================
+# EVENT CODES
+# ============================================================================
+SEPARATOR = 0
+SIMULATION_STARTED = 1
+SIMULATION_COMPLETE = 2
+STOP_ACCEPTING = 3
+CAR_ARRIVED = 4
+QUEUE_ENTERED = 5
+SERVICE_STARTED = 6
+SERVICE_FINISHED = 7
+CAR_EXITED = 8
+BOTTLENECK_ALERT = 9
+SHIFT_ENDED = 10
+SAFETY_CAP_REACHED = 11
+
+# Short name of each event code, for counters and reports (indexed by code)
+EVENT_NAMES = (
+    "separator",
+    "simulation_started",
+    "simulation_complete",
+    "stop_accepting",
+    "car_arrived",
+    "queue_entered",
+    "service_started",
+    "service_finished",
+    "car_exited",
+    "bottleneck_alert",
+    "shift_ended",
+    "safety_cap_reached",
+)
+
+# Lowest log level at which each event code is written (indexed by code)
+EVENT_LEVELS = (
+    SUMMARY,   # SEPARATOR
+    SUMMARY,   # SIMULATION_STARTED
+    SUMMARY,   # SIMULATION_COMPLETE
+    MINIMAL,   # STOP_ACCEPTING
+    SUMMARY,   # CAR_ARRIVED
+    DETAILED,  # QUEUE_ENTERED
+    DETAILED,  # SERVICE_STARTED
+    DETAILED,  # SERVICE_FINISHED
+    SUMMARY,   # CAR_EXITED
+    MINIMAL,   # BOTTLENECK_ALERT
+    SUMMARY,   # SHIFT_ENDED
+    MINIMAL,   # SAFETY_CAP_REACHED
+)
+
+# Message template for each event code (indexed by code)
+EVENT_TEMPLATES = (
+    "=" * 80,
+    "PAINT SHOP CONVEYOR SYSTEM SIMULATION STARTED",
+    "SIMULATION COMPLETE",
+    "STOP accepting new cars (shift end at {value} min)",
+    "Car {car} ARRIVED",
+    "Car {car} entering {station} queue",
+    "Car {car} STARTED {station}",
+    "Car {car} FINISHED {station}",
+    "Car {car} EXITED SYSTEM (Total time: {value:.1f} min)",
+    "ALERT: Queue at {station} has {value} cars waiting",
+    "SHIFT {value} ENDED",
+    "SAFETY CAP reached: {value} cars still in system were truncated",
+)
+
+
+def parse_level(level):
+    """
+    Convert a level name (e.g. "SUMMARY") or number to a numeric log level.
+
+    Args:
+        level (str or int): Level name from LEVELS, or a numeric level
+
+    Returns:
+        int: Numeric log level
+    """
+    if isinstance(level, str):
+        try:
+            return LEVELS[level.upper()]
+        except KeyError:
+            raise ValueError(f"Unknown log level: {level!r} (expected one of {sorted(LEVELS)})")
+    return int(level)
+
+
+class EventLogger:
+    """
+    Writes simulation events to a log file.
+
+    The level check happens before any string formatting, so suppressed
+    events cost one tuple lookup. Lines that pass are collected in a
+    buffer and written in a single call once the buffer is full.
+    At level OFF no file is opened at all.
+    """
+
+    def __init__(self, path, level="SUMMARY", buffer_size=256, echo=False):
+        """
+        Initialize the logger.
+
+        Args:
+            path (str): Log file path (ignored when level is OFF)
+            level (str or int): Log level name or number
+            buffer_size (int): Number of lines held before writing to disk
+            echo (bool): Also print written lines to the console
+        """
+        self.level = parse_level(level)
+        self.buffer_size = max(1, buffer_size)
+        self.echo = echo
+        self.events_offered = 0  # Events passed to event(), written or not
+        self.events_written = 0
+
+        # Per-code on/off switches, precomputed so event() does no comparisons
+        self.enabled = tuple(event_level <= self.level for event_level in EVENT_LEVELS)
+
+        self._buffer = []
+        self._file = open(path, "w") if self.level > OFF else None
+
+    def event(self, code, time, car_id=None, station=None, value=None):
+        """
+        Record one event.
+
+        Args:
+            code (int): Event code (e.g. CAR_ARRIVED)
+            time (float): Simulation time of the event
+            car_id (int): Car involved, if any
+            station (str): Station name involved, if any
+            value: Extra value used by the message template, if any
+        """
+        self.events_offered += 1
+        if not self.enabled[code]:
+            return
+
+        line = f"[{time:.1f}] " + EVENT_TEMPLATES[code].format(car=car_id, station=station, value=value)
+        if self.echo:
+            print(line)
+
+        self._buffer.append(line)
+        if len(self._buffer) >= self.buffer_size:
+            self.flush()
+
+    def flush(self):
+        """Write all buffered lines to the log file"""
+        if self._buffer:
+            self._file.write("\n".join(self._buffer) + "\n")
+            self.events_written += len(self._buffer)
+            self._buffer = []
+
+    def close(self):
+        """Flush remaining lines and close the log file"""
+        if self._file is not None:
+            self.flush()
+            self._file.close()
+            self._file = None
@@ -0,0 +1,322 @@
+# event_trace.py
+# Compact binary event trace of a run, and a replay reader that recomputes its metrics
+
+import json
+import mmap
+import struct
+import numpy as np
+from src import event_log
+from src.entities import Station
+from src.car_store import CarStore
+from src.bottleneck_detector import alert_intervals
+from src.scenario import Scenario
+from src.streaming_stats import QuantileSketch
+
+MAGIC = b"PSTRACE\0"
+VERSION = 1
+
+# File layout: header, JSON metadata padded to a 16-byte boundary, then fixed-width records
+HEADER = struct.Struct("<8sIIQ")  # Magic, version, metadata length, record count
+RECORD = struct.Struct("<dihh")  # time, car_id, station_id, event_code
+RECORD_DTYPE = np.dtype([("time", "<f8"), ("car_id", "<i4"), ("station_id", "<i2"), ("event_code", "<i2")])
+NO_CAR = 0  # car_id of events without a car (car IDs start at 1)
+NO_STATION = -1  # station_id of events without a station
+
+
+def _data_offset(metadata_length):
+    """Start of the records: after the header and metadata, aligned to a record"""
+    end = HEADER.size + metadata_length
+    return -(-end // RECORD.size) * RECORD.size
+
+
+class TraceWriter:
+    """
+    Appends (time, car_id, station_id, event_code) records to a memory-mapped file.
+
+    Each record is 16 bytes written in place with struct.pack_into, so
+    recording costs no string formatting and no write call per event. The
+    file grows by chunk_records at a time; close() trims it to the records
+    written and stores their count in the header.
+    """
+
+    def __init__(self, path, scenario, chunk_records=65536):
+        """
+        Create the trace file.
+
+        Args:
+            path (str): Trace file path (overwritten)
+            scenario (Scenario): Scenario of the run (stored in the header for replay)
+            chunk_records (int): Records added to the file each time it fills up
+        """
+        self.path = path
+        self.chunk_records = max(1, chunk_records)
+        self.station_ids = {name: index for index, name in enumerate(scenario.station_names)}
+        self.count = 0
+        self.capacity = 0
+
+        metadata = json.dumps({'scenario': scenario.to_dict()}).encode()
+        self.metadata_length = len(metadata)
+        self.data_offset = _data_offset(len(metadata))
+        self._file = open(path, "w+b")
+        self._file.write(HEADER.pack(MAGIC, VERSION, len(metadata), 0) + metadata)
+        self._map = None
+        self._grow()
+
+    def _grow(self):
+        """Extend the file by one chunk and map it again"""
+        if self._map is not None:
+            self._map.close()
+        self.capacity += self.chunk_records
+        self._file.truncate(self.data_offset + self.capacity * RECORD.size)
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+    def record(self, code, time, car_id=None, station=None):
+        """
+        Append one event.
+
+        Args:
+            code (int): Event code (see src/event_log.py)
+            time (float): Simulation time of the event
+            car_id (int): Car involved, if any
+            station (str): Station name involved, if any
+        """
+        if self.count == self.capacity:
+            self._grow()
+        RECORD.pack_into(self._map, self.data_offset + self.count * RECORD.size, time,
+                         car_id or NO_CAR, self.station_ids.get(station, NO_STATION), code)
+        self.count += 1
+
+    def flush(self):
+        """Store the record count in the header and write the mapped pages to disk"""
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.metadata_length, self.count)
+        self._map.flush()
+
+    def close(self):
+        """Flush and trim the file to the records written"""
+        if self._file is None:
+            return
+        self.flush()
+        self._map.close()
+        self._file.truncate(self.data_offset + self.count * RECORD.size)
+        self._file.close()
+        self._map = self._file = None
+
+
+class EventTrace:
+    """
+    Read-only view of a trace written by TraceWriter.
+
+    The file is memory-mapped and 'records' is a structured NumPy array over
+    the mapping, so opening a trace copies nothing; per-station selections
+    copy only the events they keep. Everything the run reported can be
+    recomputed from the records (see get_results()), as can new metrics
+    over past runs, without simulating again.
+
+    Queue lengths are rebuilt from queue entries and service starts: a car
+    that started at the moment it joined the queue counts as never queued,
+    which is how the simulation counts it unless a machine was released at
+    that exact instant.
+    """
+
+    def __init__(self, path):
+        """
+        Open a trace.
+
+        Args:
+            path (str): Trace file path
+        """
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, metadata_length, count = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an event trace")
+        if version != VERSION:
+            raise ValueError(f"Unsupported trace version {version} (expected {VERSION})")
+        self.metadata = json.loads(self._map[HEADER.size:HEADER.size + metadata_length])
+        self.scenario = Scenario.from_dict(self.metadata['scenario'])
+        self.station_names = self.scenario.station_names
+
+        self.records = np.frombuffer(self._map, RECORD_DTYPE, count, _data_offset(metadata_length))
+        # Column views into the mapping
+        self.times = self.records["time"]
+        self.car_ids = self.records["car_id"]
+        self.station_ids = self.records["station_id"]
+        self.event_codes = self.records["event_code"]
+
+    def __len__(self):
+        return len(self.records)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        """Release the mapping (arrays taken from the trace must not be used afterwards)"""
+        self.records = self.times = self.car_ids = self.station_ids = self.event_codes = None
+        self._map.close()
+        self._file.close()
+
+    def events(self, code, stage=None):
+        """
+        Select the records of one event code, in the order they happened.
+
+        Args:
+            code (int): Event code (e.g. event_log.SERVICE_STARTED)
+            stage (int): Only records at this station position
+
+        Returns:
+            numpy.ndarray: Structured records
+        """
+        mask = self.event_codes == code
+        if stage is not None:
+            mask &= self.station_ids == stage
+        return self.records[mask]
+
+    def end_time(self):
+        """End of the run: the completion event, or the last record of an unfinished run"""
+        complete = self.events(event_log.SIMULATION_COMPLETE)
+        if len(complete):
+            return float(complete["time"][-1])
+        return float(self.times[-1]) if len(self.times) else 0.0
+
+    def _car_times(self, code, stage=None):
+        """Times of one event code indexed by car ID (NaN for cars without that event)"""
+        events = self.events(code, stage)
+        times = np.full(int(self.car_ids.max()) + 1 if len(self.car_ids) else 1, np.nan)
+        times[events["car_id"]] = events["time"]
+        return times
+
+    def queue_series(self, stage):
+        """
+        Queue-length step function at one station.
+
+        Args:
+            stage (int): Station position in the line
+
+        Returns:
+            tuple: (change_times, queue_lengths) arrays, in event order
+        """
+        entered = self._car_times(event_log.QUEUE_ENTERED, stage)
+        started = self._car_times(event_log.SERVICE_STARTED, stage)
+        # A car queued if it did not start when it arrived (still queued if it never started)
+        queued = ~(started <= entered)
+
+        mask = (self.station_ids == stage) & ((self.event_codes == event_log.QUEUE_ENTERED) |
+                                              (self.event_codes == event_log.SERVICE_STARTED))
+        events = self.records[mask]
+        events = events[queued[events["car_id"]]]
+        changes = np.where(events["event_code"] == event_log.QUEUE_ENTERED, 1, -1)
+        return events["time"], np.cumsum(changes)
+
+    def stations(self):
+        """
+        Rebuild each station's statistics from the trace.
+
+        Returns:
+            list: Station objects in processing order, as after the run
+        """
+        stations = []
+        for stage, spec in enumerate(self.scenario.stations):
+            station = Station(spec.name, spec.machines, self.scenario.keep_station_history)
+            entered = self._car_times(event_log.QUEUE_ENTERED, stage)
+            started_events = self.events(event_log.SERVICE_STARTED, stage)
+            starts = self._car_times(event_log.SERVICE_STARTED, stage)
+            finished_events = self.events(event_log.SERVICE_FINISHED, stage)
+
+            waits = started_events["time"] - entered[started_events["car_id"]]
+            services = finished_events["time"] - starts[finished_events["car_id"]]
+            station.wait_stats.add_many(waits)
+            station.wait_sketch.add_many(waits)
+            station.processing_stats.add_many(services)
+            station.total_busy_time = float(services.sum())
+
+            change_times, queue_lengths = self.queue_series(stage)
+            if len(queue_lengths):
+                station.queue_area = float((queue_lengths[:-1] * np.diff(change_times)).sum())
+                station.max_queue_length = int(queue_lengths.max())
+                station.current_queue_length = int(queue_lengths[-1])
+                station.last_queue_change_time = float(change_times[-1])
+
+            if station.keep_history:
+                station.wait_times = waits.tolist()
+                station.processing_times = services.tolist()
+                station.queue_length_history = list(zip(change_times.tolist(), queue_lengths.tolist()))
+            stations.append(station)
+        return stations
+
+    def bottlenecks(self, threshold=None, clear_threshold=None):
+        """
+        Alert intervals per station, with the detector's hysteresis rule.
+
+        Args:
+            threshold (int): Alert threshold (default: the run's)
+            clear_threshold (int): Clear threshold (default: the run's)
+
+        Returns:
+            dict: Station name -> same fields as BottleneckDetector.get_report()
+        """
+        threshold = self.scenario.bottleneck_threshold if threshold is None else threshold
+        if clear_threshold is None:
+            clear_threshold = min(self.scenario.bottleneck_clear_threshold, threshold)
+        end_time = self.end_time()
+        return {
+            name: alert_intervals(*self.queue_series(stage), threshold, clear_threshold, end_time)
+            for stage, name in enumerate(self.station_names)
+        }
+
+    def cars(self):
+        """
+        Completed cars in exit order.
+
+        Returns:
+            CarStore: One row per car that left the line
+        """
+        exits = self.events(event_log.CAR_EXITED)
+        completed = exits["car_id"]
+        columns = {
+            "car_id": completed,
+            "arrival_time": self._car_times(event_log.CAR_ARRIVED)[completed],
+            "exit_time": exits["time"]
+        }
+        for stage, name in enumerate(self.station_names):
+            columns[f"{name.lower()}_start_time"] = self._car_times(event_log.SERVICE_STARTED, stage)[completed]
+            columns[f"{name.lower()}_end_time"] = self._car_times(event_log.SERVICE_FINISHED, stage)[completed]
+        store = CarStore(self.station_names, capacity=max(1, len(completed)))
+        store.append_columns(columns)
+        return store
+
+    def get_results(self):
+        """
+        Recompute the run's results from the trace.
+
+        Returns:
+            dict: Same shape as PaintShopSimulation.get_results()
+        """
+        exits = self.events(event_log.CAR_EXITED)
+        arrivals = self._car_times(event_log.CAR_ARRIVED)
+        system_times = exits["time"] - arrivals[exits["car_id"]]
+        system_time_sketch = QuantileSketch()
+        system_time_sketch.add_many(system_times)
+
+        stations = self.stations()
+        bottlenecks = self.bottlenecks()
+        results = {
+            'total_cars': len(exits),
+            'avg_system_time': float(system_times.mean()) if len(exits) else 0,
+            'system_time_sketch': system_time_sketch,
+            'stations': stations,
+            'alert_count': sum(report['alerts'] for report in bottlenecks.values()),
+            'cars_completed': self.cars(),
+            'simulation_time': self.scenario.simulation_time,
+            'end_time': self.end_time(),
+            'cars_truncated': len(self.events(event_log.CAR_ARRIVED)) - len(exits),
+            'bottlenecks': bottlenecks,
+            'scenario': self.scenario
+        }
+        for station in stations:
+            results[f"{station.name.lower()}_station"] = station
+        return results
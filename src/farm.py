@@ -0,0 +1,407 @@
+# farm.py
+# Spreads the replications of many scenarios over worker processes on any number of machines
+
+import asyncio
+import json
+import multiprocessing
+import os
+import socket
+import time
+from collections import deque
+import numpy as np
+from src.capacity_sweep import ENGINES, run_configuration
+from src.replication import spawn_seeds, aggregate_replications
+from src.scenario import Scenario, resolve_scenario
+from src.streaming_stats import RunningStats
+
+DEFAULT_PORT = 8765
+PROTOCOL_VERSION = 1
+MESSAGE_LIMIT = 2 ** 24  # Longest message line accepted by the coordinator (bytes)
+
+# Messages, one JSON object per line. Worker -> coordinator: hello, request, result, error.
+# Coordinator -> worker: chunk, wait (nothing to hand out yet), done.
+HELLO, REQUEST, RESULT, ERROR = "hello", "request", "result", "error"
+CHUNK, WAIT, DONE = "chunk", "wait", "done"
+
+
+def encode_seed(seed):
+    """Return a SeedSequence as JSON-serializable data"""
+    return {'entropy': seed.entropy, 'spawn_key': list(seed.spawn_key)}
+
+
+def decode_seed(data):
+    """Rebuild a SeedSequence from encode_seed() data"""
+    return np.random.SeedSequence(data['entropy'], spawn_key=tuple(data['spawn_key']))
+
+
+class FarmChunk:
+    """Consecutive replications of one scenario, handed to one worker at a time"""
+
+    __slots__ = ("chunk_id", "job", "start", "seeds", "worker", "issued_at", "issues", "done")
+
+    def __init__(self, chunk_id, job, start, seeds):
+        self.chunk_id = chunk_id
+        self.job = job  # Scenario index
+        self.start = start  # Index of the first replication
+        self.seeds = seeds
+        self.worker = None  # Connection holding the lease
+        self.issued_at = None
+        self.issues = 0
+        self.done = False
+
+
+class FarmCoordinator:
+    """
+    Hands out chunks of (scenario, seeds) over TCP and merges the summaries sent back.
+
+    Workers (run_worker()) connect, ask for a chunk, run it and send one
+    summary per replication; summaries are merged as they arrive, so
+    progress and running means are always current. Messages are JSON lines:
+    scenarios travel as Scenario.to_dict(), seeds as their entropy and
+    spawn key, and nothing received is ever unpickled or executed.
+
+    A chunk is leased to one worker at a time. When a worker disconnects
+    (crash, kill, lost machine) its unfinished chunks go back to the front
+    of the queue; a chunk held longer than lease_timeout is issued again
+    too, and whichever copy finishes first is kept. Replication i of a
+    scenario always uses seed i of spawn_seeds(replications, base_seed), so
+    the merged summaries are exactly those of run_replications() on one
+    machine, whichever worker ran them.
+    """
+
+    def __init__(self, scenarios, replications, base_seed=None, chunk_size=16, engine="simpy",
+                 host="127.0.0.1", port=DEFAULT_PORT, lease_timeout=300.0, confidence=None,
+                 on_progress=None, progress_interval=2.0):
+        """
+        Args:
+            scenarios (list): Scenarios to run (None entries = Scenario.from_config())
+            replications (int): Replications per scenario
+            base_seed (int): Root seed (None = fresh entropy, shared by all scenarios)
+            chunk_size (int): Replications per chunk
+            engine (str): Engine the workers run: "simpy", "fast" or "heap" (see capacity_sweep.ENGINES)
+            host (str): Interface to listen on ("0.0.0.0" to accept other machines)
+            port (int): TCP port (0 = any free port, see self.port once serving)
+            lease_timeout (float): Seconds before an unfinished chunk is issued again
+            confidence (float): Confidence level of the intervals (default: the first scenario's)
+            on_progress (callable): Called with progress() every progress_interval seconds
+            progress_interval (float): Seconds between progress reports
+        """
+        if engine not in ENGINES:
+            raise ValueError(f"Unknown engine: {engine!r}")
+        self.scenarios = [resolve_scenario(scenario) for scenario in scenarios]
+        self.scenario_data = [scenario.to_dict() for scenario in self.scenarios]
+        self.replications = replications
+        self.engine = engine
+        self.host = host
+        self.port = port
+        self.lease_timeout = lease_timeout
+        self.confidence = self.scenarios[0].confidence_level if confidence is None else confidence
+        self.on_progress = on_progress
+        self.progress_interval = progress_interval
+
+        seeds = [encode_seed(seed) for seed in spawn_seeds(replications, base_seed)]
+        chunk_size = max(1, chunk_size)
+        self.chunks = []
+        for job in range(len(self.scenarios)):
+            for start in range(0, replications, chunk_size):
+                self.chunks.append(FarmChunk(len(self.chunks), job, start, seeds[start:start + chunk_size]))
+        self.pending = deque(self.chunks)
+        self.summaries = [[None] * replications for _ in self.scenarios]
+        self.running = [{} for _ in self.scenarios]  # Metric -> RunningStats, merged as results arrive
+
+        self.chunks_done = 0
+        self.replications_done = 0
+        self.reissued = 0
+        self.duplicates = 0  # Results of chunks another worker had already finished
+        self.workers = {}  # Connection ID -> worker name, while connected
+        self.workers_seen = set()
+        self.error = None
+        self.started_at = None
+        self.finished = None
+        self._connections = 0
+        self._writers = set()
+        self._handlers = set()
+
+    def progress(self):
+        """
+        Current state of the farm.
+
+        Returns:
+            dict: elapsed, replications_done/_total, chunks_done/_total,
+                workers (connected), reissued, throughput (replications per
+                second) and eta (seconds, None until the first result)
+        """
+        elapsed = time.perf_counter() - self.started_at if self.started_at else 0.0
+        total = self.replications * len(self.scenarios)
+        throughput = self.replications_done / elapsed if elapsed > 0 else 0.0
+        return {
+            'elapsed': elapsed,
+            'replications_done': self.replications_done,
+            'replications_total': total,
+            'chunks_done': self.chunks_done,
+            'chunks_total': len(self.chunks),
+            'workers': len(self.workers),
+            'reissued': self.reissued,
+            'throughput': throughput,
+            'eta': (total - self.replications_done) / throughput if throughput else None
+        }
+
+    def running_mean(self, job, metric):
+        """Mean of a metric over the replications of one scenario merged so far"""
+        stats = self.running[job].get(metric)
+        return stats.mean if stats is not None else None
+
+    def _next_chunk(self, connection):
+        """Lease the next chunk to a connection (None if every chunk is done or leased)"""
+        while self.pending:
+            chunk = self.pending.popleft()
+            if chunk.done:
+                continue
+            if chunk.issues:
+                self.reissued += 1
+            chunk.worker = connection
+            chunk.issued_at = time.perf_counter()
+            chunk.issues += 1
+            return chunk
+        return None
+
+    def _release(self, connection):
+        """Return a lost connection's unfinished chunks to the front of the queue"""
+        for chunk in self.chunks:
+            if chunk.worker == connection and not chunk.done:
+                chunk.worker = None
+                self.pending.appendleft(chunk)
+
+    def _expire_leases(self):
+        """Queue again the chunks held longer than lease_timeout"""
+        now = time.perf_counter()
+        for chunk in self.chunks:
+            if not chunk.done and chunk.worker is not None and now - chunk.issued_at > self.lease_timeout:
+                chunk.worker = None
+                self.pending.append(chunk)
+
+    def _merge(self, chunk_id, summaries):
+        """Store the summaries of a finished chunk"""
+        chunk = self.chunks[chunk_id]
+        if chunk.done:
+            self.duplicates += 1
+            return
+        if len(summaries) != len(chunk.seeds):
+            raise ValueError(f"Chunk {chunk_id}: expected {len(chunk.seeds)} summaries, got {len(summaries)}")
+        chunk.done = True
+        chunk.worker = None
+        self.summaries[chunk.job][chunk.start:chunk.start + len(summaries)] = summaries
+        running = self.running[chunk.job]
+        for summary in summaries:
+            for name, value in summary.items():
+                running.setdefault(name, RunningStats()).add(value)
+        self.chunks_done += 1
+        self.replications_done += len(summaries)
+        if self.chunks_done == len(self.chunks):
+            self.finished.set()
+
+    async def _handle(self, reader, writer):
+        """Serve one worker connection until it leaves or the farm is done"""
+        self._connections += 1
+        connection = self._connections
+        sent_scenarios = set()
+        self._writers.add(writer)
+        self._handlers.add(asyncio.current_task())
+
+        async def send(message):
+            writer.write(json.dumps(message).encode() + b"\n")
+            await writer.drain()
+
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                message = json.loads(line)
+                kind = message.get('type')
+
+                if kind == HELLO:
+                    if message.get('version') != PROTOCOL_VERSION:
+                        await send({'type': DONE, 'reason': f"protocol version {PROTOCOL_VERSION} required"})
+                        break
+                    name = message.get('worker') or f"worker-{connection}"
+                    self.workers[connection] = name
+                    self.workers_seen.add(name)
+                elif kind == RESULT:
+                    self._merge(message['chunk'], message['summaries'])
+                elif kind == ERROR:
+                    self.error = (f"Chunk {message['chunk']} failed on {self.workers.get(connection)}: "
+                                  f"{message['message']}")
+                    self.finished.set()
+                    break
+
+                if kind in (HELLO, RESULT, REQUEST):
+                    if self.finished.is_set():
+                        await send({'type': DONE})
+                        break
+                    chunk = self._next_chunk(connection)
+                    if chunk is None:
+                        # Everything is leased: ask again in case a worker drops out
+                        await send({'type': WAIT, 'seconds': min(1.0, self.lease_timeout)})
+                        continue
+                    reply = {'type': CHUNK, 'chunk': chunk.chunk_id, 'job': chunk.job, 'engine': self.engine,
+                             'seeds': chunk.seeds}
+                    if chunk.job not in sent_scenarios:
+                        reply['scenario'] = self.scenario_data[chunk.job]
+                        sent_scenarios.add(chunk.job)
+                    await send(reply)
+        except (ConnectionError, json.JSONDecodeError, KeyError, ValueError):
+            pass
+        finally:
+            self.workers.pop(connection, None)
+            self._release(connection)
+            self._writers.discard(writer)
+            self._handlers.discard(asyncio.current_task())
+            writer.close()
+
+    async def _report(self):
+        """Expire old leases and report progress until the farm is done"""
+        while not self.finished.is_set():
+            try:
+                await asyncio.wait_for(self.finished.wait(), self.progress_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._expire_leases()
+            if self.on_progress is not None:
+                self.on_progress(self.progress())
+
+    async def serve(self, ready=None):
+        """
+        Serve chunks until every replication of every scenario is merged.
+
+        Args:
+            ready (callable): Called with the listening port once workers can connect
+
+        Returns:
+            dict: Output of get_results()
+        """
+        self.finished = asyncio.Event()
+        if not self.chunks:
+            self.finished.set()
+        server = await asyncio.start_server(self._handle, self.host, self.port, limit=MESSAGE_LIMIT)
+        self.port = server.sockets[0].getsockname()[1]
+        self.started_at = time.perf_counter()
+        if ready is not None:
+            ready(self.port)
+        async with server:
+            await self._report()
+            # Workers still running a re-issued copy of a chunk see the connection close
+            for writer in list(self._writers):
+                writer.close()
+            if self._handlers:
+                await asyncio.wait(list(self._handlers), timeout=5)
+        if self.error is not None:
+            raise RuntimeError(self.error)
+        return self.get_results()
+
+    def run(self, ready=None):
+        """Run serve() in a new event loop (see serve())"""
+        return asyncio.run(self.serve(ready))
+
+    def get_results(self):
+        """
+        Summaries and intervals per scenario.
+
+        Returns:
+            dict: 'scenarios' (one dict per scenario with 'scenario',
+                'summaries' and 'aggregate', as replication.aggregate_replications()),
+                plus 'replications', 'elapsed', 'throughput', 'workers_seen',
+                'reissued' and 'duplicates'
+        """
+        progress = self.progress()
+        return {
+            'scenarios': [{
+                'scenario': scenario,
+                'summaries': summaries,
+                'aggregate': aggregate_replications([summary for summary in summaries if summary is not None],
+                                                    self.confidence)
+            } for scenario, summaries in zip(self.scenarios, self.summaries)],
+            'replications': self.replications,
+            'elapsed': progress['elapsed'],
+            'throughput': progress['throughput'],
+            'workers_seen': sorted(self.workers_seen),
+            'reissued': self.reissued,
+            'duplicates': self.duplicates
+        }
+
+
+def run_worker(host="127.0.0.1", port=DEFAULT_PORT, name=None, connect_timeout=30.0):
+    """
+    Pull chunks from a coordinator and run them until it says the farm is done.
+
+    Args:
+        host (str): Coordinator host
+        port (int): Coordinator port
+        name (str): Worker name in reports (default: host name and process ID)
+        connect_timeout (float): Seconds to keep retrying while the coordinator is not up yet
+
+    Returns:
+        int: Replications this worker ran
+    """
+    name = name or f"{socket.gethostname()}:{os.getpid()}"
+    deadline = time.monotonic() + connect_timeout
+    while True:
+        try:
+            sock = socket.create_connection((host, port))
+            break
+        except (ConnectionRefusedError, OSError):
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.2)
+
+    scenarios = {}  # Job index -> Scenario
+    replications = 0
+    with sock, sock.makefile("rb") as reader:
+        def send(message):
+            sock.sendall(json.dumps(message).encode() + b"\n")
+
+        send({'type': HELLO, 'worker': name, 'version': PROTOCOL_VERSION})
+        while True:
+            line = reader.readline()
+            if not line:
+                break  # Coordinator finished or went away
+            message = json.loads(line)
+            if message['type'] == DONE:
+                break
+            if message['type'] == WAIT:
+                time.sleep(message['seconds'])
+                send({'type': REQUEST})
+                continue
+
+            job = message['job']
+            if 'scenario' in message:
+                scenarios[job] = Scenario.from_dict(message['scenario'])
+            seeds = [decode_seed(seed) for seed in message['seeds']]
+            try:
+                summaries = run_configuration(scenarios[job], seeds, engine=message['engine'])
+            except Exception as error:
+                send({'type': ERROR, 'chunk': message['chunk'], 'message': repr(error)})
+                break
+            replications += len(summaries)
+            send({'type': RESULT, 'chunk': message['chunk'], 'summaries': summaries})
+    return replications
+
+
+def start_local_workers(count, host="127.0.0.1", port=DEFAULT_PORT):
+    """
+    Start worker processes on this machine.
+
+    Args:
+        count (int): Number of workers
+        host (str): Coordinator host
+        port (int): Coordinator port
+
+    Returns:
+        list: The started multiprocessing.Process objects
+    """
+    processes = []
+    for index in range(count):
+        process = multiprocessing.Process(target=run_worker, args=(host, port, f"local-{index + 1}"), daemon=True)
+        process.start()
+        processes.append(process)
+    return processes
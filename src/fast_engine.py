@@ -0,0 +1,351 @@
+# fast_engine.py
+# Vectorized NumPy engine for the serial FIFO line (no SimPy processes or events)
+
+import heapq
+import numpy as np
+from src.entities import Station
+from src.bottleneck_detector import alert_intervals
+from src.car_store import CarStore
+from src.streaming_stats import QuantileSketch
+from src.simulation import PaintShopSimulation
+from src.scenario import resolve_scenario
+from src.variates import VariateSupply
+
+
+def draw_line_inputs(variates, station_names, acceptance_time):
+    """
+    Draw all random inputs for one run as arrays.
+
+    Arrival intervals are taken a block at a time until the acceptance window
+    is covered. Each station then gets one processing time per arriving car,
+    indexed by car (car ID - 1). The values are exactly those
+    PaintShopSimulation draws from the same streams.
+
+    Args:
+        variates (VariateSupply): Random streams to draw from
+        station_names (list): Station names in processing order
+        acceptance_time (float): Stop accepting cars at this time
+
+    Returns:
+        tuple: (interarrival_times, service_times) where service_times maps
+            station name -> array
+    """
+    # Take arrival intervals until one arrival lands past the acceptance time
+    arrival_stream = variates.stream("arrival")
+    blocks = []
+    elapsed = 0.0
+    while elapsed < acceptance_time:
+        block = arrival_stream.take(variates.block_size)
+        blocks.append(block)
+        elapsed += block.sum()
+    intervals = np.concatenate(blocks)
+
+    # Keep the accepted arrivals plus the one that closes the window
+    num_cars = int(np.searchsorted(np.cumsum(intervals), acceptance_time, side="left"))
+    interarrival_times = intervals[:num_cars + 1]
+
+    service_times = {
+        name: variates.stream(name).take(num_cars)
+        for name in station_names
+    }
+    return interarrival_times, service_times
+
+
+def fifo_departures(arrivals, services, num_machines):
+    """
+    Compute service start and end times at a FIFO station.
+
+    Args:
+        arrivals (numpy.ndarray): Arrival times at the station, in arrival order
+        services (numpy.ndarray): Processing times, in the same order
+        num_machines (int): Number of parallel machines
+
+    Returns:
+        tuple: (start_times, end_times) arrays in arrival order
+    """
+    if num_machines == 1:
+        # Single server: end_n = max over k <= n of (arrival_k + services_k..n),
+        # which is a running maximum over a cumulative sum
+        cumulative = np.cumsum(services)
+        ends = cumulative + np.maximum.accumulate(arrivals - cumulative + services)
+        return ends - services, ends
+
+    # Multiple servers: each car takes the machine that frees up first
+    starts = []
+    free_at = [0.0] * num_machines
+    heapreplace = heapq.heapreplace
+    for arrival, service in zip(arrivals.tolist(), services.tolist()):
+        start = arrival if arrival > free_at[0] else free_at[0]
+        heapreplace(free_at, start + service)
+        starts.append(start)
+    starts = np.array(starts)
+    return starts, starts + services
+
+
+def queue_profile(arrivals, starts):
+    """
+    Build the queue-length step function at a station.
+
+    Only cars that had to wait pass through the queue: each adds one at its
+    arrival and removes one when its service starts.
+
+    Args:
+        arrivals (numpy.ndarray): Arrival times at the station
+        starts (numpy.ndarray): Service start times at the station
+
+    Returns:
+        tuple: (change_times, queue_lengths) arrays, sorted by time
+    """
+    waited = starts > arrivals
+    times = np.concatenate((arrivals[waited], starts[waited]))
+    changes = np.concatenate((np.ones(waited.sum(), dtype=np.int64), -np.ones(waited.sum(), dtype=np.int64)))
+
+    # At equal times, process departures from the queue before new arrivals
+    order = np.lexsort((changes, times))
+    return times[order], np.cumsum(changes[order])
+
+
+class FastLineSimulation:
+    """
+    Array-based engine for a serial line of FIFO stations.
+
+    Because the line is a pure tandem of FIFO stations, every car's start and
+    end time can be computed station by station from arrays of arrival and
+    processing times. The results match PaintShopSimulation when both engines
+    are given the same draws (see validate_against_simpy()).
+    """
+
+    def __init__(self, scenario=None, seed=None, acceptance_time=None, until=None, keep_cars=True, inputs=None,
+                 distributions=None, keep_history=None, stations=None, antithetic=False):
+        """
+        Initialize the engine.
+
+        Args:
+            scenario (Scenario): Scenario to run (default: Scenario.from_config())
+            seed (int or numpy.random.SeedSequence): Seed for this run's random streams
+            acceptance_time (float): Stop accepting cars at this time (default: from the scenario)
+            until (float): Safety cap; work not finished by then is not counted
+                (default: acceptance_time + the scenario's max_drain_time, as
+                PaintShopSimulation; math.inf always runs the line to empty)
+            keep_cars (bool): Store completed cars in 'cars_completed'
+                (turn off when per-car records are not needed)
+            inputs (tuple): Pre-drawn (interarrival_times, service_times); drawn from
+                the seed when not given
+            distributions (dict): Stream name -> distribution spec, overriding the scenario
+            keep_history (bool): Keep raw per-car lists in each Station (override)
+            stations (list): Line layout override as (name, machines, distribution) specs
+            antithetic (bool): Use the antithetic twin of the seed's random streams
+        """
+        self.scenario = scenario = resolve_scenario(
+            scenario, acceptance_time=acceptance_time, keep_station_history=keep_history, stations=stations
+        )
+        self.acceptance_time = scenario.acceptance_time
+        self.until = until if until is not None else self.acceptance_time + scenario.max_drain_time
+        self.keep_cars = keep_cars
+        self.station_specs = list(scenario.stations)
+        self.variates = VariateSupply(seed, distributions, scenario=scenario, antithetic=antithetic)
+        self.inputs = inputs
+
+        self.stations = [Station(spec.name, spec.machines, scenario.keep_station_history)
+                         for spec in self.station_specs]
+        self.cars_completed = CarStore([station.name for station in self.stations])
+        self.alert_count = 0
+        self.bottlenecks = {}
+
+        # Per-station start/end times indexed by car (filled by run())
+        self.arrival_times = None
+        self.start_times = {}
+        self.end_times = {}
+
+    def run(self):
+        """
+        Compute the whole run and return the results.
+        """
+        if self.inputs is None:
+            self.inputs = draw_line_inputs(self.variates, [station.name for station in self.stations],
+                                           self.acceptance_time)
+        interarrival_times, service_times = self.inputs
+
+        # Accepted cars arrive strictly before the acceptance time
+        arrival_times = np.cumsum(interarrival_times)
+        arrival_times = arrival_times[arrival_times < self.acceptance_time]
+        num_cars = len(arrival_times)
+        self.arrival_times = arrival_times
+
+        # Cars enter the first station in arrival order
+        order = np.arange(num_cars)
+        ready_times = arrival_times
+
+        for station in self.stations:
+            # Processing times belong to cars, taken here in arrival order at the station
+            services = service_times[station.name][order]
+            starts, ends = fifo_departures(ready_times, services, station.num_machines)
+            self._record_station(station, ready_times, starts, ends, services)
+
+            # Map back from arrival order at this station to car index
+            car_starts = np.empty(num_cars)
+            car_ends = np.empty(num_cars)
+            car_starts[order] = starts
+            car_ends[order] = ends
+            self.start_times[station.name] = car_starts
+            self.end_times[station.name] = car_ends
+
+            # Cars reach the next station in the order they finish here
+            finish_order = np.argsort(ends, kind="stable")
+            order = order[finish_order]
+            ready_times = ends[finish_order]
+
+        if self.keep_cars:
+            self._build_cars()
+
+        return self.get_results()
+
+    def _record_station(self, station, arrivals, starts, ends, services):
+        """Fill a Station's metrics from its arrays, counting only work before 'until'"""
+        started = starts < self.until
+        finished = ends < self.until
+
+        waits = starts[started] - arrivals[started]
+        station.wait_stats.add_many(waits)
+        station.wait_sketch.add_many(waits)
+        station.processing_stats.add_many(services[finished])
+        station.total_busy_time = float(services[finished].sum())
+
+        change_times, queue_lengths = queue_profile(arrivals, starts)
+        in_horizon = change_times < self.until
+        change_times = change_times[in_horizon]
+        queue_lengths = queue_lengths[in_horizon]
+
+        self.bottlenecks[station.name] = (change_times, queue_lengths)
+
+        if len(queue_lengths):
+            station.queue_area = float((queue_lengths[:-1] * np.diff(change_times)).sum())
+            station.max_queue_length = int(queue_lengths.max())
+            station.current_queue_length = int(queue_lengths[-1])
+            station.last_queue_change_time = float(change_times[-1])
+
+        if station.keep_history:
+            station.wait_times = waits.tolist()
+            station.processing_times = services[finished].tolist()
+            station.queue_length_history = list(zip(change_times.tolist(), queue_lengths.tolist()))
+
+    def _build_cars(self):
+        """Store the cars that left the line before 'until', in exit order"""
+        exit_times = self.end_times[self.stations[-1].name]
+        completed = np.flatnonzero(exit_times < self.until)
+        completed = completed[np.argsort(exit_times[completed], kind="stable")]
+
+        columns = {
+            "car_id": completed + 1,
+            "arrival_time": self.arrival_times[completed],
+            "exit_time": exit_times[completed]
+        }
+        for station in self.stations:
+            columns[f"{station.name.lower()}_start_time"] = self.start_times[station.name][completed]
+            columns[f"{station.name.lower()}_end_time"] = self.end_times[station.name][completed]
+        self.cars_completed.append_columns(columns)
+
+    def get_results(self):
+        """
+        Return metrics in the same shape as PaintShopSimulation.get_results().
+        """
+        exit_times = self.end_times[self.stations[-1].name]
+        finished = exit_times < self.until
+        system_times = exit_times[finished] - self.arrival_times[finished]
+        total_cars = int(finished.sum())
+
+        # Like PaintShopSimulation: the run ends when the last car leaves,
+        # or at the safety cap if cars are still in the system
+        cars_truncated = len(exit_times) - total_cars
+        if cars_truncated:
+            end_time = self.until
+        else:
+            end_time = float(exit_times.max()) if len(exit_times) else self.acceptance_time
+
+        system_time_sketch = QuantileSketch()
+        system_time_sketch.add_many(system_times)
+
+        # Alerts with the same hysteresis rule as BottleneckDetector
+        bottlenecks = {
+            name: alert_intervals(change_times, queue_lengths, self.scenario.bottleneck_threshold,
+                                  self.scenario.bottleneck_clear_threshold, end_time)
+            for name, (change_times, queue_lengths) in self.bottlenecks.items()
+        }
+        self.alert_count = sum(report['alerts'] for report in bottlenecks.values())
+
+        results = {
+            'total_cars': total_cars,
+            'avg_system_time': float(system_times.mean()) if total_cars else 0,
+            'system_time_sketch': system_time_sketch,
+            'stations': self.stations,
+            'alert_count': self.alert_count,
+            'cars_completed': self.cars_completed,
+            'simulation_time': self.scenario.simulation_time,
+            'end_time': end_time,
+            'cars_truncated': cars_truncated,
+            'bottlenecks': bottlenecks,
+            'scenario': self.scenario
+        }
+
+        for station in self.stations:
+            results[f"{station.name.lower()}_station"] = station
+
+        return results
+
+
+def validate_against_simpy(seed=None, tolerance=1e-9, stations=None, scenario=None):
+    """
+    Run both engines with the same seed and compare their results.
+
+    Both engines draw each quantity from its own named stream, so the same
+    seed gives them identical random draws car by car.
+
+    Both engines see every queue change, so queue statistics and bottleneck
+    alerts are compared as well.
+
+    Args:
+        seed (int): Seed for both runs
+        stations (list): Line layout override
+        scenario (Scenario): Scenario for both runs (default: Scenario.from_config())
+        tolerance (float): Allowed absolute difference between times
+
+    Returns:
+        dict: Largest differences found and an overall 'match' flag
+    """
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    fast_results = FastLineSimulation(scenario, seed=seed, keep_history=True, stations=stations).run()
+    simpy_results = PaintShopSimulation(scenario, seed=seed, log_level="OFF", verbose=False, keep_history=True,
+                                        stations=stations).run()
+
+    report = {
+        'total_cars': (simpy_results['total_cars'], fast_results['total_cars']),
+        'avg_system_time_diff': abs(simpy_results['avg_system_time'] - fast_results['avg_system_time']),
+        'end_time_diff': abs(simpy_results['end_time'] - fast_results['end_time']),
+        'alert_count': (simpy_results['alert_count'], fast_results['alert_count'])
+    }
+
+    for simpy_station, fast_station in zip(simpy_results['stations'], fast_results['stations']):
+        report[f"{simpy_station.name}.busy_time_diff"] = abs(simpy_station.total_busy_time - fast_station.total_busy_time)
+        report[f"{simpy_station.name}.wait_time_diff"] = max(
+            (abs(a - b) for a, b in zip(sorted(simpy_station.wait_times), sorted(fast_station.wait_times))),
+            default=0
+        )
+        report[f"{simpy_station.name}.avg_queue_diff"] = abs(
+            simpy_station.get_avg_queue_length(simpy_results['end_time'])
+            - fast_station.get_avg_queue_length(fast_results['end_time'])
+        )
+        report[f"{simpy_station.name}.count_match"] = (
+            len(simpy_station.wait_times) == len(fast_station.wait_times)
+            and len(simpy_station.processing_times) == len(fast_station.processing_times)
+            and simpy_station.max_queue_length == fast_station.max_queue_length
+        )
+
+    report['match'] = (
+        report['total_cars'][0] == report['total_cars'][1]
+        and report['alert_count'][0] == report['alert_count'][1]
+        and all(value <= tolerance for name, value in report.items() if name.endswith("_diff"))
+        and all(value for name, value in report.items() if name.endswith("count_match"))
+    )
+    return report
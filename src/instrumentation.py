@@ -0,0 +1,247 @@
+# instrumentation.py
+# Opt-in counters, timers and profiling for a simulation run
+
+import cProfile
+import io
+import json
+import pstats
+import time
+from contextlib import contextmanager
+from src import event_log
+
+
+class Instrumentation:
+    """
+    Counts events and times the hot paths of one PaintShopSimulation.
+
+    Attaching wraps the simulation's methods on that instance only (the
+    class is untouched), so a simulation created without instrumentation
+    runs exactly the same code as before and pays nothing.
+
+    Wall time is exclusive: time spent in a nested timed call (e.g. a log
+    call made from a car's journey) is charged to the inner category only,
+    so the categories add up to the total time spent stepping SimPy.
+    """
+
+    def __init__(self, sim):
+        """
+        Attach to a simulation before it runs.
+
+        Args:
+            sim (PaintShopSimulation): Simulation to instrument
+        """
+        self.sim = sim
+        self.event_counts = [0] * len(event_log.EVENT_NAMES)  # Indexed by event code
+        self.simpy_events = 0  # Events processed by the SimPy kernel
+        self.wall_time = {}  # Category -> seconds (exclusive)
+        self.peak_event_queue = 0
+        self.live_processes = 0
+        self.peak_live_processes = 0
+        self._child_time = 0.0  # Time spent in nested timed calls of the current call
+
+        self._attach()
+
+    def _charge(self, category, elapsed):
+        """Add elapsed (minus nested timed calls) to a category"""
+        self.wall_time[category] = self.wall_time.get(category, 0.0) + elapsed - self._child_time
+
+    def _timed(self, category, func):
+        """Wrap func so its exclusive wall time is charged to category"""
+        perf_counter = time.perf_counter
+
+        def wrapper(*args, **kwargs):
+            outer = self._child_time
+            self._child_time = 0.0
+            start = perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                elapsed = perf_counter() - start
+                self._charge(category, elapsed)
+                self._child_time = outer + elapsed
+
+        return wrapper
+
+    def _timed_process(self, generator, category_of):
+        """
+        Drive a SimPy process generator, timing each step it runs.
+
+        Args:
+            generator: Process generator to wrap
+            category_of (callable): Maps the event that resumed the step
+                (None for the first step) to a wall time category
+        """
+        perf_counter = time.perf_counter
+        category = category_of(None)
+        send, pending_error = None, None
+
+        while True:
+            outer = self._child_time
+            self._child_time = 0.0
+            start = perf_counter()
+            try:
+                if pending_error is None:
+                    event = generator.send(send)
+                else:
+                    event = generator.throw(pending_error)
+            except StopIteration:
+                return
+            finally:
+                elapsed = perf_counter() - start
+                self._charge(category, elapsed)
+                self._child_time = outer + elapsed
+
+            category = category_of(event)
+            send, pending_error = None, None
+            try:
+                send = yield event
+            except BaseException as error:
+                pending_error = error
+
+    def _attach(self):
+        """Install the wrappers on the simulation instance"""
+        sim = self.sim
+        env = sim.env
+
+        # Event counters (every event goes through log(), whatever the log level)
+        log = sim.log
+
+        def counted_log(code, *args, **kwargs):
+            self.event_counts[code] += 1
+            return log(code, *args, **kwargs)
+
+        sim.log = self._timed("log", counted_log)
+
+        # Queue tracking and bottleneck detection
+        sim.queue_changed = self._timed("queue", sim.queue_changed)
+
+        # Statistics updates
+        for station in sim.stations:
+            station.add_wait_time = self._timed("metrics", station.add_wait_time)
+            station.add_processing_time = self._timed("metrics", station.add_processing_time)
+            station.update_queue = self._timed("metrics", station.update_queue)
+        sim.system_time_stats.add = self._timed("metrics", sim.system_time_stats.add)
+        sim.system_time_sketch.add = self._timed("metrics", sim.system_time_sketch.add)
+        sim.cars_completed.append = self._timed("metrics", sim.cars_completed.append)
+        sim.get_results = self._timed("metrics", sim.get_results)
+
+        # Process steps: journey time is charged to the stage whose event resumed it
+        stage_categories = {id(resource): f"journey.{station.name}"
+                            for resource, station in zip(sim.resources, sim.stations)}
+        # Category of a journey's first step, by the stage it starts at
+        start_categories = [f"journey.{station.name}" for station in sim.stations] + ["journey"]
+        car_journey, car_generator = sim.car_journey, sim.car_generator
+
+        def timed_journey(car, first_stage=0):
+            current = [start_categories[first_stage]]
+
+            def category_of(event):
+                if event is not None:
+                    current[0] = stage_categories.get(id(getattr(event, "resource", None)), current[0])
+                return current[0]
+
+            return self._timed_process(car_journey(car, first_stage), category_of)
+
+        sim.car_journey = timed_journey
+        sim.car_generator = lambda *args: self._timed_process(car_generator(*args), lambda event: "arrivals")
+
+        # SimPy kernel: events processed, event queue size and live processes
+        step = env.step
+        perf_counter = time.perf_counter
+
+        def counted_step():
+            queue_size = len(env._queue)
+            if queue_size > self.peak_event_queue:
+                self.peak_event_queue = queue_size
+            self.simpy_events += 1
+            self._child_time = 0.0
+            start = perf_counter()
+            try:
+                step()
+            finally:
+                self._charge("simpy", perf_counter() - start)
+                self._child_time = 0.0
+
+        def process_finished(_):
+            self.live_processes -= 1
+
+        process = env.process
+
+        def counted_process(generator):
+            started = process(generator)
+            self.live_processes += 1
+            if self.live_processes > self.peak_live_processes:
+                self.peak_live_processes = self.live_processes
+            started.callbacks.append(process_finished)
+            return started
+
+        env.step = counted_step
+        env.process = counted_process
+
+    def summary(self):
+        """
+        Return everything measured so far as a JSON-serializable dict.
+
+        Returns:
+            dict: event_counts (by event name), simpy_events, wall_time
+                (category -> seconds), total_wall_time, peak_event_queue
+                and peak_live_processes
+        """
+        return {
+            'event_counts': {name: count for name, count in zip(event_log.EVENT_NAMES, self.event_counts) if count},
+            'simpy_events': self.simpy_events,
+            'wall_time': dict(sorted(self.wall_time.items(), key=lambda item: -item[1])),
+            'total_wall_time': sum(self.wall_time.values()),
+            'peak_event_queue': self.peak_event_queue,
+            'peak_live_processes': self.peak_live_processes
+        }
+
+
+@contextmanager
+def profiled(path_prefix, instrumentation=None, top=30):
+    """
+    Profile the enclosed code with cProfile and write the reports on exit.
+
+    Writes <path_prefix>.prof (raw stats, loadable with pstats or snakeviz),
+    <path_prefix>.txt (functions sorted by cumulative time) and
+    <path_prefix>.json (top functions plus the instrumentation summary).
+
+    Args:
+        path_prefix (str): Output path without extension (e.g. "output/profile")
+        instrumentation (Instrumentation): Include its summary in the JSON file
+        top (int): Number of functions listed in the text and JSON reports
+
+    Yields:
+        cProfile.Profile: The running profiler
+    """
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield profiler
+    finally:
+        profiler.disable()
+        profiler.dump_stats(f"{path_prefix}.prof")
+
+        text = io.StringIO()
+        stats = pstats.Stats(profiler, stream=text)
+        stats.sort_stats("cumulative").print_stats(top)
+        with open(f"{path_prefix}.txt", "w") as f:
+            f.write(text.getvalue())
+
+        functions = []
+        for (filename, line, name), (_, calls, own_time, cumulative_time, _) in stats.stats.items():
+            functions.append({
+                'function': f"{filename}:{line}({name})",
+                'calls': calls,
+                'tottime': own_time,
+                'cumtime': cumulative_time
+            })
+        functions.sort(key=lambda row: -row['cumtime'])
+
+        summary = {
+            'total_time': stats.total_tt,
+            'functions': functions[:top],
+            'instrumentation': instrumentation.summary() if instrumentation is not None else None
+        }
+        with open(f"{path_prefix}.json", "w") as f:
+            json.dump(summary, f, indent=2)
@@ -1,21 +1,30 @@
 # metrics.py
 # Calculates and formats metrics from simulation results
 
-def print_results(results):
+from src.results import as_results
+
+
+def ordinal(number):
+    """Return a number as an English ordinal (1st, 2nd, 3rd, 4th, ...)"""
+    if 10 <= number % 100 <= 20:
+        suffix = "th"
+    else:
+        suffix = {1: "st", 2: "nd", 3: "rd"}.get(number % 10, "th")
+    return f"{number}{suffix}"
+
+
+def format_results(results):
     """
-    Print simulation results in a formatted way.
+    Format simulation results as the text report printed after a run.
     
     Args:
-        results (dict): Dictionary containing simulation results
-    """
+        results (dict or SimulationResults): Results of a run
     
-    total_cars = results['total_cars']
-    avg_system_time = results['avg_system_time']
-    cleaning_station = results['cleaning_station']
-    primer_station = results['primer_station']
-    painting_station = results['painting_station']
-    alert_count = results['alert_count']
-    simulation_time = results['simulation_time']
+    Returns:
+        str: Report text
+    """
+    results = as_results(results)
+    simulation_time = results.simulation_time
     
     # Build output string
     output = []
@@ -23,72 +32,72 @@ def print_results(results):
     output.append("PAINT SHOP CONVEYOR SYSTEM SIMULATION - RESULTS")
     output.append("=" * 80)
     
-    output.append(f"\nSimulation Duration: {simulation_time} minutes (8 hours)")
-    output.append(f"Total Cars Completed: {total_cars}")
+    output.append(f"\nSimulation Duration: {simulation_time} minutes ({simulation_time / 60:g} hours)")
+    output.append(f"Total Cars Completed: {results.total_cars}")
+    if results.cars_truncated:
+        output.append(f"Cars Still in System at Safety Cap: {results.cars_truncated} (not counted)")
     
-    if total_cars > 0:
-        output.append(f"Average System Time per Car: {avg_system_time:.2f} minutes")
+    if results.total_cars > 0:
+        output.append(f"Average System Time per Car: {results.avg_system_time:.2f} minutes")
     else:
         output.append("Average System Time per Car: N/A (No cars completed)")
     
-    # STATION 1: CLEANING
-    output.append("\n" + "-" * 80)
-    output.append("STATION 1: CLEANING")
-    output.append("-" * 80)
-    output.append(f"Number of Machines: {cleaning_station.num_machines}")
-    output.append(f"Utilization: {cleaning_station.get_utilization(simulation_time):.2f}%")
-    output.append(f"Max Queue Length: {cleaning_station.max_queue_length} cars")
-    output.append(f"Average Wait Time: {cleaning_station.get_avg_wait_time():.2f} minutes")
-    output.append(f"Average Processing Time: {cleaning_station.get_avg_processing_time():.2f} minutes")
-    output.append(f"Total Cars Processed: {len(cleaning_station.processing_times)}")
-    
-    # STATION 2: PRIMER
-    output.append("\n" + "-" * 80)
-    output.append("STATION 2: PRIMER APPLICATION")
-    output.append("-" * 80)
-    output.append(f"Number of Machines: {primer_station.num_machines}")
-    output.append(f"Utilization: {primer_station.get_utilization(simulation_time):.2f}%")
-    output.append(f"Max Queue Length: {primer_station.max_queue_length} cars")
-    output.append(f"Average Wait Time: {primer_station.get_avg_wait_time():.2f} minutes")
-    output.append(f"Average Processing Time: {primer_station.get_avg_processing_time():.2f} minutes")
-    output.append(f"Total Cars Processed: {len(primer_station.processing_times)}")
-    
-    # STATION 3: PAINTING
-    output.append("\n" + "-" * 80)
-    output.append("STATION 3: PAINTING")
-    output.append("-" * 80)
-    output.append(f"Number of Machines: {painting_station.num_machines}")
-    output.append(f"Utilization: {painting_station.get_utilization(simulation_time):.2f}%")
-    output.append(f"Max Queue Length: {painting_station.max_queue_length} cars")
-    output.append(f"Average Wait Time: {painting_station.get_avg_wait_time():.2f} minutes")
-    output.append(f"Average Processing Time: {painting_station.get_avg_processing_time():.2f} minutes")
-    output.append(f"Total Cars Processed: {len(painting_station.processing_times)}")
+    # One section per station, in processing order
+    for number, station in enumerate(results.stations, 1):
+        p50, p95, p99 = (station.wait_percentiles[percentile] for percentile in (50, 95, 99))
+        
+        output.append("\n" + "-" * 80)
+        output.append(f"STATION {number}: {station.name.upper()}")
+        output.append("-" * 80)
+        output.append(f"Number of Machines: {station.machines}")
+        output.append(f"Utilization: {station.utilization:.2f}%")
+        output.append(f"Max Queue Length: {station.max_queue} cars")
+        output.append(f"Average Wait Time: {station.avg_wait:.2f} minutes")
+        output.append(f"Average Queue Length: {station.avg_queue:.2f} cars")
+        output.append(f"Wait Time P50/P95/P99: {p50:.2f} / {p95:.2f} / {p99:.2f} minutes")
+        output.append(f"Average Processing Time: {station.avg_processing_time:.2f} minutes")
+        output.append(f"Total Cars Processed: {station.processed}")
     
     # BOTTLENECK ANALYSIS
     output.append("\n" + "-" * 80)
     output.append("BOTTLENECK ANALYSIS")
     output.append("-" * 80)
-    output.append(f"Total Alerts Triggered: {alert_count}")
+    output.append(f"Total Alerts Triggered: {results.alert_count}")
+    for station in results.stations:
+        output.append(f"  {station.name}: {station.alerts} alert(s), {station.bottleneck_time:.1f} min as bottleneck, "
+                      f"peak queue {station.peak_queue}, avg onset latency {station.avg_onset_latency:.1f} min")
     
     # Identify bottleneck station
-    utilizations = {
-        "Cleaning": cleaning_station.get_utilization(simulation_time),
-        "Primer": primer_station.get_utilization(simulation_time),
-        "Painting": painting_station.get_utilization(simulation_time)
-    }
-    
-    most_utilized = max(utilizations, key=utilizations.get)
-    output.append(f"Most Utilized Station: {most_utilized} ({utilizations[most_utilized]:.2f}%)")
+    most_utilized = results.most_utilized
+    output.append(f"Most Utilized Station: {most_utilized.name} ({most_utilized.utilization:.2f}%)")
     
     output.append("\n" + "=" * 80)
+    return "\n".join(output)
+
+
+def print_results(results, scenario=None, save=True):
+    """
+    Print simulation results in a formatted way.
+    
+    Args:
+        results (dict or SimulationResults): Results of a run
+        scenario (Scenario): Scenario that was run, for the results file path
+            (default: the results' scenario)
+        save (bool): Also write the report to the scenario's results file
     
-    # Print to console and file
-    full_output = "\n".join(output)
+    Returns:
+        str: Report text
+    """
+    results = as_results(results)
+    full_output = format_results(results)
     print(full_output)
     
     # Save to file
-    with open(config.RESULTS_FILE_PATH, "w") as f:
-        f.write(full_output)
+    if save:
+        if scenario is None:
+            scenario = results.scenario
+        with open(scenario.results_file_path, "w") as f:
+            f.write(full_output)
     
     return full_output
 
@@ -98,16 +107,12 @@ def get_bottleneck_recommendations(results):
     Analyze simulation results and provide optimization recommendations.
     
     Args:
-        results (dict): Dictionary containing simulation results
+        results (dict or SimulationResults): Results of a run
     
     Returns:
         str: Recommendations for bottleneck mitigation
     """
-    
-    cleaning_station = results['cleaning_station']
-    primer_station = results['primer_station']
-    painting_station = results['painting_station']
-    simulation_time = results['simulation_time']
+    results = as_results(results)
     
     recommendations = []
     recommendations.append("\n" + "=" * 80)
@@ -115,39 +120,477 @@ def get_bottleneck_recommendations(results):
     recommendations.append("=" * 80)
     
     # Check each station's utilization
-    cleaning_util = cleaning_station.get_utilization(simulation_time)
-    primer_util = primer_station.get_utilization(simulation_time)
-    painting_util = painting_station.get_utilization(simulation_time)
-    
-    # High utilization (>80%) means the station is a bottleneck
-    if cleaning_util > 80:
-        recommendations.append(f"\n❌ BOTTLENECK: Cleaning Station (Utilization: {cleaning_util:.2f}%)")
-        recommendations.append("   → Consider adding a 2nd cleaning machine")
-        recommendations.append(f"   → Current max queue: {cleaning_station.max_queue_length} cars")
-        recommendations.append(f"   → Current avg wait: {cleaning_station.get_avg_wait_time():.2f} min")
-    else:
-        recommendations.append(f"\n✓ Cleaning Station is OK (Utilization: {cleaning_util:.2f}%)")
+    for station in results.stations:
+        utilization = station.utilization
+        
+        # High utilization (>80%) means the station is a bottleneck
+        if utilization > 80:
+            recommendations.append(f"\n❌ BOTTLENECK: {station.name} Station (Utilization: {utilization:.2f}%)")
+            recommendations.append(f"   → Consider adding a {ordinal(station.machines + 1)} {station.name.lower()} machine")
+            recommendations.append(f"   → Current max queue: {station.max_queue} cars")
+            recommendations.append(f"   → Current avg wait: {station.avg_wait:.2f} min")
+        else:
+            recommendations.append(f"\n✓ {station.name} Station is OK (Utilization: {utilization:.2f}%)")
+    
+    recommendations.append("\nTo check these suggestions, measure the alternatives with a capacity sweep:")
+    recommendations.append("   python main.py --sweep 4")
+    
+    recommendations.append("\n" + "=" * 80)
+    
+    return "\n".join(recommendations)
+
+
+def summarize_results(results):
+    """
+    Reduce simulation results to a flat dict of numbers.
+    
+    The summary holds no Station or Car objects, so it is small and cheap to
+    pickle between processes. Per-station values use "<Station>.<metric>" keys
+    (see SimulationResults.summary).
+    
+    Args:
+        results (dict or SimulationResults): Results of a run
+    
+    Returns:
+        dict: Summary metrics for one replication
+    """
+    return dict(as_results(results).summary)
+
+
+def format_replication_report(aggregate, num_replications, confidence):
+    """
+    Format aggregated replication results as a text table.
+    
+    Args:
+        aggregate (dict): Output of replication.aggregate_replications()
+        num_replications (int): Number of replications aggregated
+        confidence (float): Confidence level of the intervals
+    
+    Returns:
+        str: Report text
+    """
+    output = []
+    output.append("\n" + "=" * 80)
+    output.append(f"REPLICATION RESULTS ({num_replications} replications, {confidence:.0%} confidence)")
+    output.append("=" * 80)
+    output.append(f"{'Metric':<30}{'Mean':>14}{'± Half-width':>16}{'Std Dev':>14}")
+    output.append("-" * 80)
+    
+    for name, stats in aggregate.items():
+        output.append(f"{name:<30}{stats['mean']:>14.2f}{stats['half_width']:>16.2f}{stats['std']:>14.2f}")
+    
+    output.append("=" * 80)
+    return "\n".join(output)
+
+
+def format_shift_summary(summary):
+    """
+    Format one per-shift summary from PaintShopSimulation.run_shifts() as a text line.
+    
+    Args:
+        summary (dict): Shift summary
+    
+    Returns:
+        str: One line per shift, plus one indented line per station
+    """
+    lines = [
+        f"Shift {summary['shift']:>3} [{summary['start']:>8.0f} - {summary['end']:>8.0f} min]: "
+        f"arrived {summary['cars_arrived']:>4}, exited {summary['cars_exited']:>4}, "
+        f"avg system time {summary['avg_system_time']:>8.1f} min, WIP at end {summary['wip_at_end']:>4}"
+    ]
+    
+    station_names = [key[:-len(".utilization")] for key in summary if key.endswith(".utilization")]
+    for name in station_names:
+        lines.append(
+            f"    {name:<12} utilization {summary[name + '.utilization']:>6.1f}%, "
+            f"avg queue {summary[name + '.avg_queue']:>6.1f}, queue at end {summary[name + '.queue_at_end']:>4}"
+        )
+    
+    return "\n".join(lines)
+
+
+def format_instrumentation_report(summary):
+    """
+    Format an Instrumentation summary as text.
+    
+    Args:
+        summary (dict): Output of Instrumentation.summary()
+    
+    Returns:
+        str: Report text
+    """
+    total = summary['total_wall_time']
+    lines = [
+        "\n" + "=" * 80,
+        "INSTRUMENTATION",
+        "=" * 80,
+        f"SimPy events processed: {summary['simpy_events']}",
+        f"Peak event queue: {summary['peak_event_queue']}, peak live processes: {summary['peak_live_processes']}",
+        "\nEvent counts:"
+    ]
+    for name, count in summary['event_counts'].items():
+        lines.append(f"  {name:<22}{count:>10}")
+    
+    lines.append("\nWall time by category (exclusive):")
+    for category, seconds in summary['wall_time'].items():
+        share = seconds / total * 100 if total else 0
+        lines.append(f"  {category:<22}{seconds * 1000:>10.2f} ms {share:>6.1f}%")
+    lines.append(f"  {'total':<22}{total * 1000:>10.2f} ms")
+    lines.append("=" * 80)
+    
+    return "\n".join(lines)
+
+
+def format_capacity_report(sweep):
+    """
+    Format a capacity sweep as a text report.
+    
+    Args:
+        sweep (dict): Output of capacity_sweep.capacity_sweep()
+    
+    Returns:
+        str: Report text with both Pareto fronts per arrival rate
+    """
+    objective = sweep['objective']
+    lines = [
+        "\n" + "=" * 80,
+        "CAPACITY PLAN",
+        "=" * 80,
+        f"Configurations: {len(sweep['rows'])} "
+        f"({sweep['evaluated']} simulated x {sweep['replications']} replications, "
+        f"{sweep['infeasible']} infeasible, {sweep['dominated']} dominated, "
+        f"{sweep['screened']} screened) in {sweep['wall_time']:.1f} s",
+        f"Objective: {objective}"
+    ]
+    
+    def describe(row):
+        machines = ", ".join(f"{name} {count}" for name, count in row['machines'].items())
+        return (f"  [{machines}] total {row['total_machines']:>2}: {row['objective']:>7.2f} "
+                f"± {row['objective_half_width']:.2f}, avg system time {row['avg_system_time']:>7.1f} min")
+    
+    for rate, fronts in sweep['fronts'].items():
+        lines.append(f"\nArrival rate x{rate:g}")
+        if not fronts['objective']:
+            lines.append("  No feasible configuration in the sweep range")
+            continue
+        
+        lines.append(f"Pareto front, {objective} vs total machines:")
+        lines.extend(describe(row) for row in fronts['objective'])
+        lines.append("Pareto front, average system time vs total machines:")
+        lines.extend(describe(row) for row in fronts['system_time'])
+        
+        # Cheapest configuration within 2% of the best measured value
+        best = fronts['objective'][-1]['objective']
+        plan = next(row for row in fronts['objective'] if row['objective'] >= 0.98 * best)
+        lines.append("Recommended (fewest machines within 2% of the best):")
+        lines.append(describe(plan))
+    
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+def format_precision_report(result, confidence):
+    """
+    Format the outcome of replication.run_until_precision() as text.
+    
+    Args:
+        result (dict): Output of run_until_precision()
+        confidence (float): Confidence level of the intervals
+    
+    Returns:
+        str: One status line followed by the replication report
+    """
+    interval = result['interval']
+    achieved = interval['half_width'] / abs(interval['mean']) * 100 if interval['mean'] else 0
+    status = "target met" if result['target_met'] else "BUDGET EXHAUSTED before target"
+    lines = [
+        f"\n{result['metric']}: {interval['mean']:.2f} ± {interval['half_width']:.2f} "
+        f"(±{achieved:.2f}%, target ±{result['relative_precision'] * 100:g}%) - {status}",
+        f"Used {result['replications']} replications in {result['batches']} batch(es)",
+        format_replication_report(result['aggregate'], result['replications'], confidence)
+    ]
+    return "\n".join(lines)
+
+
+def format_batch_means_report(interval, confidence):
+    """
+    Format a steady-state batch-means estimate as text.
+    
+    Args:
+        interval (dict): Output of replication.run_batch_means()
+        confidence (float): Confidence level of the interval
+    
+    Returns:
+        str: Report text
+    """
+    lines = [
+        "\n" + "=" * 80,
+        "STEADY-STATE AVERAGE SYSTEM TIME (BATCH MEANS)",
+        "=" * 80,
+        f"Cars observed: {interval['cars']}, warm-up removed (MSER-5): {interval['truncated']} cars",
+        f"Batches: {interval['n']} of {interval['batch_size']} cars",
+        f"Average system time: {interval['mean']:.2f} min, "
+        f"{confidence * 100:g}% CI [{interval['low']:.2f}, {interval['high']:.2f}]"
+    ]
+    if interval['warmup_at_limit']:
+        lines.append("WARNING: warm-up reached half the run; system times may still be growing (no steady state)")
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+def format_optimization_report(result):
+    """
+    Format the outcome of optimizer.select_best() as text.
+    
+    Args:
+        result (dict): Output of select_best()
+    
+    Returns:
+        str: Report text with the chosen configuration and every candidate
+    """
+    direction = "maximize" if result['maximize'] else "minimize"
+    lines = [
+        "\n" + "=" * 80,
+        "CONFIGURATION SELECTION (RANKING AND SELECTION)",
+        "=" * 80,
+        f"Objective: {direction} {result['objective']}",
+        f"Constraints: {', '.join(f'{metric} {op} {bound:g}' for metric, op, bound in result['constraints']) or 'none'}",
+        f"Compute spent: {result['replications']} of {result['budget']} replications "
+        f"in {result['rounds']} round(s), {result['wall_time']:.1f} s"
+    ]
+    
+    def describe(row):
+        machines = ", ".join(f"{name} {count}" for name, count in row['machines'].items())
+        text = (f"  [{machines}] accept {row['acceptance_time']:g} min, a car every {row['interarrival_time']:.1f} min, "
+                f"cost {row['machine_cost']:g}")
+        if row['replications']:
+            text += f": {row['mean']:.3f} ± {row['half_width']:.3f} (n={row['replications']})"
+        return text
     
-    if primer_util > 80:
-        recommendations.append(f"\n❌ BOTTLENECK: Primer Station (Utilization: {primer_util:.2f}%)")
-        recommendations.append("   → Consider adding a 3rd primer machine")
-        recommendations.append(f"   → Current max queue: {primer_station.max_queue_length} cars")
-        recommendations.append(f"   → Current avg wait: {primer_station.get_avg_wait_time():.2f} min")
+    best = next((row for row in result['rows'] if row['index'] == result['best_index']), None)
+    if best is None:
+        lines.append("\nNo candidate satisfies the constraints")
+        unsure = sum(1 for row in result['rows'] if row['status'] == "contending")
+        if unsure:
+            lines.append(f"  {unsure} candidate(s) may still meet them: raise the budget to decide")
     else:
-        recommendations.append(f"\n✓ Primer Station is OK (Utilization: {primer_util:.2f}%)")
+        lines.append("\nSelected configuration:")
+        lines.append(describe(best))
+        lines.append(f"Probability of correct selection: {result['pcs'] * 100:.1f}% "
+                     f"(target {result['target_pcs'] * 100:g}%, "
+                     f"indifference zone {result['indifference_zone']:.3g})")
+    
+    lines.append("\nCandidates by replications spent:")
+    for row in sorted(result['rows'], key=lambda row: -row['replications']):
+        lines.append(f"{describe(row)} - {row['status']}")
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+def format_comparison_report(result, confidence):
+    """
+    Format a two-scenario comparison (variance_reduction.compare_scenarios()) as text.
     
-    if painting_util > 80:
-        recommendations.append(f"\n❌ BOTTLENECK: Painting Station (Utilization: {painting_util:.2f}%)")
-        recommendations.append("   → Consider adding a 2nd painting machine")
-        recommendations.append(f"   → Current max queue: {painting_station.max_queue_length} cars")
-        recommendations.append(f"   → Current avg wait: {painting_station.get_avg_wait_time():.2f} min")
+    Args:
+        result (dict): Output of compare_scenarios()
+        confidence (float): Confidence level of the intervals
+    
+    Returns:
+        str: Report text
+    """
+    method = result['method'] + (" + control variates" if result['control_variates'] else "")
+    difference = result['difference']
+    lines = [
+        "\n" + "=" * 80,
+        f"SCENARIO COMPARISON: {result['metric']}",
+        "=" * 80,
+        f"Method: {method}, {result['replications']} replications ({result['runs']} runs, "
+        f"{result['engine']} engine) in {result['wall_time']:.1f} s",
+        f"Baseline:    {result['baseline']['mean']:>10.2f} ± {result['baseline']['half_width']:.2f}",
+        f"Alternative: {result['alternative']['mean']:>10.2f} ± {result['alternative']['half_width']:.2f}",
+        f"Difference (alternative - baseline): {difference['mean']:.2f}, "
+        f"{confidence * 100:g}% CI [{difference['low']:.2f}, {difference['high']:.2f}]",
+        f"Variance reduction factor: {result['variance_reduction_factor']:.1f}x "
+        f"(independent runs would need about {result['equivalent_independent_runs']:.0f} runs)"
+    ]
+    if difference['low'] > 0 or difference['high'] < 0:
+        lines.append("The difference is statistically significant")
     else:
-        recommendations.append(f"\n✓ Painting Station is OK (Utilization: {painting_util:.2f}%)")
+        lines.append("No significant difference at this confidence level")
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+def format_branch_report(snapshot_time, cars_in_system, branches):
+    """
+    Format what-if branches forked from one snapshot as a table.
     
-    recommendations.append("\n" + "=" * 80)
+    Args:
+        snapshot_time (float): Simulation time of the snapshot
+        cars_in_system (int): Cars in the line at the snapshot
+        branches (list): (label, summary) pairs, the unchanged branch first
     
-    return "\n".join(recommendations)
+    Returns:
+        str: Report text
+    """
+    lines = [
+        "\n" + "=" * 80,
+        f"WHAT-IF FROM MINUTE {snapshot_time:g} ({cars_in_system} cars in the line)",
+        "=" * 80,
+        f"{'Branch':<28} {'Cars':>6} {'Avg system time':>16} {'P95':>8} {'Cars/hour':>10} {'Alerts':>7}"
+    ]
+    for label, summary in branches:
+        lines.append(f"{label:<28} {summary['total_cars']:>6} {summary['avg_system_time']:>16.1f} "
+                     f"{summary['p95_system_time']:>8.1f} {summary['drain_throughput_per_hour']:>10.2f} "
+                     f"{summary['alert_count']:>7}")
+    lines.append("=" * 80)
+    return "\n".join(lines)
 
 
-# Import config at the end to avoid circular imports
-import config
\ No newline at end of file
+def format_analytic_validation(report):
+    """
+    Format analytic estimates against simulation (analytic.validate_analytic()) as text.
+    
+    Args:
+        report (list): Output of validate_analytic()
+    
+    Returns:
+        str: One table per scenario
+    """
+    lines = [
+        "\n" + "=" * 80,
+        "ANALYTIC ESTIMATE VS SIMULATION",
+        "=" * 80
+    ]
+    for entry in report:
+        machines = ", ".join(f"{name} {count}" for name, count in entry['machines'].items())
+        unstable = ", ".join(entry['unstable_stations']) or "none"
+        lines.append(f"\n[{machines}] unstable stations: {unstable}")
+        lines.append(f"Analytic {entry['analytic_time'] * 1e6:.0f} us, "
+                     f"simulation {entry['simulation_time'] * 1e3:.0f} ms ({entry['replications']} replications)")
+        lines.append(f"  {'Metric':<28} {'Analytic':>10} {'Simulated':>18} {'Error':>8}")
+        for name, values in entry['metrics'].items():
+            error = f"{values['error'] * 100:+.0f}%" if values['error'] is not None else "-"
+            lines.append(f"  {name:<28} {values['analytic']:>10.2f} "
+                         f"{values['simulated']:>9.2f} ± {values['half_width']:<6.2f} {error:>8}")
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+def format_sensitivity_report(estimate, confidence):
+    """
+    Format IPA gradients (sensitivity.estimate_sensitivities()) as text.
+    
+    Elasticity is the % change of the metric for a 1% change of the parameter.
+    
+    Args:
+        estimate (dict): Output of estimate_sensitivities()
+        confidence (float): Confidence level of the intervals
+    
+    Returns:
+        str: Report text
+    """
+    lines = [
+        "\n" + "=" * 80,
+        f"SENSITIVITIES (IPA, {estimate['replications']} replications, {confidence * 100:g}% CI)",
+        "=" * 80
+    ]
+    for metric, gradients in estimate['gradients'].items():
+        value = estimate['metrics'][metric]['mean']
+        lines.append(f"\n{metric} = {value:.2f}")
+        lines.append(f"  {'Parameter':<28} {'Derivative':>22} {'Elasticity':>11}")
+        for name, interval in gradients.items():
+            elasticity = interval['mean'] * estimate['values'][name] / value if value else 0
+            lines.append(f"  {name:<28} {interval['mean']:>12.4f} ± {interval['half_width']:<7.4f} "
+                         f"{elasticity:>11.3f}")
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+def format_forecast(forecast):
+    """
+    Format a digital-twin forecast (digital_twin.DigitalTwin.forecast()) as text.
+    
+    Args:
+        forecast (dict): Output of DigitalTwin.forecast()
+    
+    Returns:
+        str: Report text
+    """
+    exits = forecast['exits_by_shift_end']
+    lines = [
+        "\n" + "=" * 80,
+        f"FORECAST AT MINUTE {forecast['time']:.1f} ({forecast['replications']} replications, "
+        f"{forecast['latency'] * 1000:.0f} ms)",
+        "=" * 80,
+        f"Cars in the line: {forecast['cars_in_system']}, exited so far: {forecast['cars_exited']}",
+        f"Exits by minute {forecast['shift_end']:g}: {exits['mean']:.1f} ± {exits['half_width']:.1f} "
+        f"(80% of replications between {exits['p10']:.0f} and {exits['p90']:.0f})",
+        f"Line empty at: minute {forecast['end_time']['mean']:.1f} ± {forecast['end_time']['half_width']:.1f}"
+    ]
+    if forecast.get('events_rejected'):
+        lines.append(f"Events rejected so far: {forecast['events_rejected']} (see the log)")
+    for name, clear in forecast['queue_clear_time'].items():
+        if clear['mean'] is None:
+            lines.append(f"{name} queue: does not clear")
+            continue
+        line = f"{name} queue clears at: minute {clear['mean']:.1f} (p10 {clear['p10']:.1f}, p90 {clear['p90']:.1f})"
+        if clear['never']:
+            line += f", not at all in {clear['never'] * 100:.0f}% of replications"
+        lines.append(line)
+    lines.append("=" * 80)
+    return "\n".join(lines)
+
+
+def format_farm_progress(progress):
+    """
+    Format a replication farm's progress (farm.FarmCoordinator.progress()) as one line.
+    
+    Args:
+        progress (dict): Output of FarmCoordinator.progress()
+    
+    Returns:
+        str: Progress line
+    """
+    eta = f"{progress['eta']:.0f} s" if progress['eta'] is not None else "unknown"
+    line = (f"  {progress['replications_done']}/{progress['replications_total']} replications "
+            f"({progress['chunks_done']}/{progress['chunks_total']} chunks), {progress['workers']} worker(s), "
+            f"{progress['throughput']:.1f} replications/s, ETA {eta}")
+    if progress['reissued']:
+        line += f", {progress['reissued']} chunk(s) re-issued"
+    return line
+
+
+def format_farm_report(result, confidence):
+    """
+    Format the merged results of a replication farm as a text table.
+    
+    Args:
+        result (dict): Output of farm.FarmCoordinator.run()
+        confidence (float): Confidence level of the intervals
+    
+    Returns:
+        str: Report text
+    """
+    output = []
+    output.append("\n" + "=" * 80)
+    output.append(f"REPLICATION FARM ({len(result['scenarios'])} scenario(s) x {result['replications']} replications, "
+                  f"{confidence:.0%} confidence)")
+    output.append("=" * 80)
+    output.append(f"{'Scenario':<10}{'Machines':<14}{'Cars':>8}{'Avg System Time':>22}{'P95 System':>14}"
+                  f"{'Cars/h':>12}")
+    output.append("-" * 80)
+    
+    for number, job in enumerate(result['scenarios'], 1):
+        aggregate = job['aggregate']
+        machines = "/".join(str(spec.machines) for spec in job['scenario'].stations)
+        system_time = aggregate['avg_system_time']
+        output.append(f"{number:<10}{machines:<14}{aggregate['total_cars']['mean']:>8.1f}"
+                      f"{system_time['mean']:>13.1f} ± {system_time['half_width']:<6.1f}"
+                      f"{aggregate['p95_system_time']['mean']:>14.1f}{aggregate['drain_throughput_per_hour']['mean']:>12.2f}")
+    
+    output.append("-" * 80)
+    output.append(f"{result['throughput']:.1f} replications/s over {result['elapsed']:.1f} s on "
+                  f"{len(result['workers_seen'])} worker(s); {result['reissued']} chunk(s) re-issued")
+    output.append("=" * 80)
+    return "\n".join(output)
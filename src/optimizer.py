@@ -0,0 +1,400 @@
+# optimizer.py
+# Picks the best configuration by ranking and selection (KN screening, OCBA allocation)
+
+import itertools
+import math
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from statistics import NormalDist
+import numpy as np
+from src.analytic import station_loads
+from src.capacity_sweep import configure, run_configuration
+from src.output_analysis import mean_confidence_interval
+from src.variates import distribution_mean
+
+# Known objectives -> True if larger is better
+OBJECTIVES = {
+    "throughput_per_machine_cost": True,
+    "drain_throughput_per_hour": True,
+    "total_cars": True,
+    "p95_system_time": False,
+    "avg_system_time": False,
+}
+
+CONSTRAINT_OPERATORS = ("<=", ">=")
+
+# Statuses of a candidate
+CONTENDING = "contending"
+SELECTED = "selected"
+ELIMINATED = "eliminated"  # Screened out as worse than another candidate
+INFEASIBLE = "infeasible"  # Load above max_utilization (if set), or a constraint's whole interval is violated
+
+
+def machine_cost(scenario, machine_costs=None):
+    """
+    Total cost of a scenario's machines.
+
+    Args:
+        scenario (Scenario): Configuration
+        machine_costs (dict): Station name -> cost of one machine (default 1 each)
+    """
+    machine_costs = machine_costs or {}
+    return sum(spec.machines * machine_costs.get(spec.name, 1.0) for spec in scenario.stations)
+
+
+def metric_value(name, summary, scenario, machine_costs=None):
+    """
+    Value of a metric in one replication.
+
+    Any summarize_results() key, plus 'machine_cost' and
+    'throughput_per_machine_cost' (drain throughput per hour / machine cost).
+
+    Args:
+        name (str): Metric name
+        summary (dict): Output of metrics.summarize_results()
+        scenario (Scenario): Configuration the summary came from
+        machine_costs (dict): Station name -> cost of one machine
+    """
+    if name == "machine_cost":
+        return machine_cost(scenario, machine_costs)
+    if name == "throughput_per_machine_cost":
+        return summary['drain_throughput_per_hour'] / machine_cost(scenario, machine_costs)
+    return summary[name]
+
+
+def parse_constraint(text):
+    """Parse 'metric<=bound' or 'metric>=bound' into a (metric, operator, bound) tuple"""
+    for op in CONSTRAINT_OPERATORS:
+        if op in text:
+            metric, bound = text.split(op, 1)
+            return metric.strip(), op, float(bound)
+    raise ValueError(f"Constraint must look like metric<=bound or metric>=bound: {text!r}")
+
+
+def candidate_grid(scenario, machine_ranges=None, acceptance_times=None, arrival_rates=(1.0,)):
+    """
+    Every combination of machine counts, shift lengths and arrival rates.
+
+    Args:
+        scenario (Scenario): Base scenario
+        machine_ranges (dict): Station name -> machine counts to try (missing = keep)
+        acceptance_times (list): Minutes the line takes new cars (default: keep)
+        arrival_rates (list): Multipliers on the base arrival rate
+
+    Returns:
+        list: One Scenario per combination
+    """
+    machine_ranges = machine_ranges or {}
+    ranges = [sorted(machine_ranges.get(spec.name, [spec.machines])) for spec in scenario.stations]
+    acceptance_times = acceptance_times or [scenario.acceptance_time]
+    return [
+        configure(scenario, machines, rate).replace(acceptance_time=acceptance)
+        for machines in itertools.product(*ranges)
+        for acceptance in acceptance_times
+        for rate in arrival_rates
+    ]
+
+
+def approximate_pcs(means, variances, counts, best, indifference_zone=0.0):
+    """
+    Approximate probability that `best` really has the largest mean.
+
+    Bonferroni bound over pairwise normal comparisons (the APCS-B of OCBA).
+    With an indifference zone, a candidate better than `best` by less than
+    the zone does not count as an error, so near-ties do not hold PCS down.
+
+    Args:
+        means, variances, counts (dict): Candidate -> sample mean, variance, replications
+        best: Candidate with the largest sample mean
+        indifference_zone (float): Difference not worth telling apart
+
+    Returns:
+        float: Lower bound on the probability of correct selection
+    """
+    phi = NormalDist().cdf
+    error = 0.0
+    for i in means:
+        if i == best:
+            continue
+        gap = means[best] - means[i] + indifference_zone
+        se = math.sqrt(variances[best] / counts[best] + variances[i] / counts[i])
+        error += phi(-gap / se) if se > 0 else float(gap <= 0)
+    return max(0.0, 1.0 - error)
+
+
+def ocba_allocation(means, stds, counts, increment, best, min_gap):
+    """
+    Split extra replications with the OCBA rule (Chen et al.).
+
+    Non-best candidates get replications in proportion to (std / gap)^2, so
+    close contenders get more than clearly worse ones, and the best gets
+    std_best * sqrt(sum(n_i^2 / std_i^2)).
+
+    Args:
+        means, stds, counts (dict): Candidate -> sample mean, std, replications
+        increment (int): Replications to hand out
+        best: Candidate with the largest sample mean
+        min_gap (float): Gaps smaller than this count as this (indifference zone)
+
+    Returns:
+        dict: Candidate -> extra replications (summing to increment)
+    """
+    ratios = {}
+    for i in means:
+        if i != best:
+            gap = max(means[best] - means[i], min_gap)
+            ratios[i] = (stds[i] / gap) ** 2
+    ratios[best] = stds[best] * math.sqrt(sum((ratios[i] / stds[i]) ** 2 for i in ratios if stds[i] > 0))
+    if sum(ratios.values()) == 0:
+        ratios = {i: 1.0 for i in means}
+
+    total = sum(counts.values()) + increment
+    scale = total / sum(ratios.values())
+    shortfall = {i: max(0.0, ratio * scale - counts[i]) for i, ratio in ratios.items()}
+    if sum(shortfall.values()) == 0:
+        shortfall = {best: 1.0}
+
+    # Largest remainder rounding so the shares add up to the increment
+    shares = {i: increment * value / sum(shortfall.values()) for i, value in shortfall.items()}
+    extra = {i: int(share) for i, share in shares.items()}
+    leftover = increment - sum(extra.values())
+    for i in sorted(shares, key=lambda i: extra[i] - shares[i])[:leftover]:
+        extra[i] += 1
+    return extra
+
+
+def select_best(candidates, objective="throughput_per_machine_cost", maximize=None, constraints=(),
+                machine_costs=None, initial_replications=10, budget=500, batch_size=None, target_pcs=0.95,
+                indifference_zone=None, base_seed=None, workers=None, engine="fast", max_utilization=None,
+                confidence=None):
+    """
+    Find the best candidate configuration while spending replications adaptively.
+
+    Every candidate first gets initial_replications. After that, rounds of
+    batch_size replications repeat until one candidate is left, the
+    probability of correct selection reaches target_pcs, or the budget is
+    spent. Each round:
+        - drops a candidate whose confidence interval for a constraint metric
+          lies entirely on the wrong side of its bound;
+        - screens out candidates that are worse than a feasible one by more
+          than the KN continuation region allows (Kim and Nelson, with error
+          1 - target_pcs and the indifference zone), compared on the
+          replications both have run; all candidates share seeds (common
+          random numbers), so the comparisons are paired;
+        - hands the next batch to the remaining candidates by OCBA, so clearly
+          bad candidates stop getting runs and close contenders get more.
+
+    Args:
+        candidates (list): Scenarios to choose from (e.g. from candidate_grid())
+        objective (str): Metric to optimize (see metric_value())
+        maximize (bool): Direction (default: from OBJECTIVES)
+        constraints (list): (metric, "<=" or ">=", bound) tuples on metric means
+        machine_costs (dict): Station name -> cost of one machine
+        initial_replications (int): Replications per candidate in the first stage (at least 2)
+        budget (int): Total replications allowed
+        batch_size (int): Replications per round (default: 4 per worker, at least 10)
+        target_pcs (float): Stop once the approximate PCS reaches this
+        indifference_zone (float): Objective difference not worth telling apart
+            (default: 1% of the best first-stage mean)
+        base_seed (int): Root seed shared by all candidates
+        workers (int): Worker processes (None = CPU count, 1 = run in this process)
+        engine (str): "fast", "heap" or "simpy" (see capacity_sweep.run_configuration())
+        max_utilization (float): Skip candidates where some station's load
+            (analytic.station_loads(), after upstream throttling) is at or
+            above this, without running them (None = run everything: every
+            run drains the line, so an overloaded candidate still has a
+            well-defined throughput and may well be the best)
+        confidence (float): Confidence level of constraint checks (default: the
+            first candidate's confidence_level)
+
+    Returns:
+        dict: 'best' (Scenario, or None if no candidate was shown to meet
+            the constraints within the budget), 'best_index',
+            'pcs', 'replications', 'rounds', 'wall_time' and 'rows' (one per
+            candidate with its replications, objective interval, constraint
+            means and status)
+    """
+    start = time.perf_counter()
+    if maximize is None:
+        if objective not in OBJECTIVES:
+            raise ValueError(f"Give maximize= for objective {objective!r}")
+        maximize = OBJECTIVES[objective]
+    for _, op, _ in constraints:
+        if op not in CONSTRAINT_OPERATORS:
+            raise ValueError(f"Unknown constraint operator: {op!r}")
+    initial_replications = max(2, initial_replications)
+    sign = 1 if maximize else -1
+    workers = workers or os.cpu_count() or 1
+    if batch_size is None:
+        batch_size = max(10, workers * 4)
+    if confidence is None:
+        confidence = candidates[0].confidence_level
+
+    # Station loads and machine cost are known without simulating
+    status = {}
+    for index, scenario in enumerate(candidates):
+        too_loaded = max_utilization is not None and max(station_loads(scenario).values()) >= max_utilization
+        cost = machine_cost(scenario, machine_costs)
+        too_costly = any(metric == "machine_cost" and (cost > bound if op == "<=" else cost < bound)
+                         for metric, op, bound in constraints)
+        status[index] = INFEASIBLE if too_loaded or too_costly else CONTENDING
+    runnable = [index for index in status if status[index] == CONTENDING]
+    if len(runnable) * initial_replications > budget:
+        raise ValueError(f"Budget of {budget} replications is below the first stage "
+                         f"({len(runnable)} candidates x {initial_replications})")
+
+    root = np.random.SeedSequence(base_seed)
+    seeds = []
+    values = {index: [] for index in runnable}  # Objective, signed so that larger is better
+    constraint_values = {index: [[] for _ in constraints] for index in runnable}
+
+    # KN continuation region constant for k candidates and first-stage size n0
+    alpha = 1 - target_pcs
+    if len(runnable) > 1:
+        h2 = (initial_replications - 1) * ((2 * alpha / (len(runnable) - 1)) ** (-2 / (initial_replications - 1)) - 1)
+    else:
+        h2 = 0.0
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+
+    def run(allocation):
+        tasks = []
+        for index, count in allocation.items():
+            first = len(values[index])
+            if first + count > len(seeds):
+                seeds.extend(root.spawn(first + count - len(seeds)))
+            chunk = max(1, math.ceil(count / workers))
+            for offset in range(first, first + count, chunk):
+                tasks.append((index, seeds[offset:min(offset + chunk, first + count)]))
+
+        if pool is None:
+            results = [run_configuration(candidates[index], task_seeds, engine) for index, task_seeds in tasks]
+        else:
+            futures = [pool.submit(run_configuration, candidates[index], task_seeds, engine)
+                       for index, task_seeds in tasks]
+            results = [future.result() for future in futures]
+
+        for (index, _), summaries in zip(tasks, results):
+            for summary in summaries:
+                values[index].append(sign * metric_value(objective, summary, candidates[index], machine_costs))
+                for series, (metric, _, _) in zip(constraint_values[index], constraints):
+                    series.append(metric_value(metric, summary, candidates[index], machine_costs))
+
+    def constraint_state(index):
+        """'violated', 'met' or 'unsure' from the constraint intervals"""
+        state = "met"
+        for series, (_, op, bound) in zip(constraint_values[index], constraints):
+            interval = mean_confidence_interval(series, confidence)
+            low, high = (interval['low'], interval['high']) if op == "<=" else (-interval['high'], -interval['low'])
+            bound = bound if op == "<=" else -bound
+            if low > bound:
+                return "violated"
+            if high > bound:
+                state = "unsure"
+        return state
+
+    rounds = 0
+    pcs = 0.0
+    leader = None
+    feasible = []
+    try:
+        run({index: initial_replications for index in runnable})
+        while True:
+            rounds += 1
+            contending = [index for index in runnable if status[index] == CONTENDING]
+            feasible = []
+            for index in contending:
+                state = constraint_state(index)
+                if state == "violated":
+                    status[index] = INFEASIBLE
+                elif state == "met":
+                    feasible.append(index)
+            contending = [index for index in contending if status[index] == CONTENDING]
+            if not contending:
+                leader = None
+                break
+
+            means = {index: float(np.mean(values[index])) for index in contending}
+            leader = max(feasible or contending, key=means.get)
+            if indifference_zone is None:
+                indifference_zone = 0.01 * abs(means[leader]) or 1e-9
+
+            # KN screening: only candidates known to be feasible may eliminate others
+            eliminated = set()
+            for i in contending:
+                if i == leader:
+                    continue
+                for l in feasible:
+                    if l == i:
+                        continue
+                    r = min(len(values[i]), len(values[l]))
+                    x_i, x_l = np.asarray(values[i][:r]), np.asarray(values[l][:r])
+                    s2 = float(np.var(x_i[:initial_replications] - x_l[:initial_replications], ddof=1))
+                    w = max(0.0, indifference_zone / (2 * r) * (h2 * s2 / indifference_zone ** 2 - r))
+                    if x_i.mean() < x_l.mean() - w:
+                        eliminated.add(i)
+                        break
+            for index in eliminated:
+                status[index] = ELIMINATED
+            contending = [index for index in contending if index not in eliminated]
+
+            counts = {index: len(values[index]) for index in contending}
+            variances = {index: float(np.var(values[index], ddof=1)) for index in contending}
+            means = {index: means[index] for index in contending}
+            pcs = approximate_pcs(means, variances, counts, leader, indifference_zone)
+
+            used = sum(len(series) for series in values.values())
+            if used >= budget or (leader in feasible and (len(contending) == 1 or pcs >= target_pcs)):
+                break
+
+            if len(contending) == 1:  # Only its constraints are left to settle
+                allocation = {leader: min(batch_size, budget - used)}
+            else:
+                stds = {index: math.sqrt(variances[index]) for index in contending}
+                allocation = ocba_allocation(means, stds, counts, min(batch_size, budget - used), leader,
+                                             indifference_zone)
+            run({index: count for index, count in allocation.items() if count})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    if leader not in feasible:
+        leader = None  # The constraints of every remaining candidate are still unsure
+    if leader is not None:
+        status[leader] = SELECTED
+
+    rows = []
+    for index, scenario in enumerate(candidates):
+        row = {
+            'index': index,
+            'machines': {spec.name: spec.machines for spec in scenario.stations},
+            'acceptance_time': scenario.acceptance_time,
+            'interarrival_time': distribution_mean(scenario.arrival_distribution),
+            'machine_cost': machine_cost(scenario, machine_costs),
+            'replications': len(values.get(index, ())),
+            'status': status[index]
+        }
+        if row['replications']:
+            interval = mean_confidence_interval([sign * value for value in values[index]], confidence)
+            row['mean'] = interval['mean']
+            row['half_width'] = interval['half_width']
+            row['constraints'] = {metric: float(np.mean(series))
+                                  for series, (metric, _, _) in zip(constraint_values[index], constraints)}
+        rows.append(row)
+
+    return {
+        'objective': objective,
+        'maximize': maximize,
+        'constraints': list(constraints),
+        'best': candidates[leader] if leader is not None else None,
+        'best_index': leader,
+        'pcs': pcs if leader is not None else 0.0,
+        'target_pcs': target_pcs,
+        'indifference_zone': indifference_zone,
+        'replications': sum(len(series) for series in values.values()),
+        'budget': budget,
+        'rounds': rounds,
+        'rows': rows,
+        'wall_time': time.perf_counter() - start
+    }
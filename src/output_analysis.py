@@ -0,0 +1,170 @@
+# output_analysis.py
+# Statistical analysis of simulation output (confidence intervals, warm-up, batch means)
+
+import math
+from statistics import NormalDist
+import numpy as np
+
+
+def t_critical(df, confidence=0.95):
+    """
+    Two-sided critical value of Student's t distribution.
+
+    Exact for 1 and 2 degrees of freedom, Cornish-Fisher expansion otherwise
+    (within 1% at 3 degrees of freedom, and much closer beyond that).
+
+    Args:
+        df (int): Degrees of freedom
+        confidence (float): Confidence level (e.g. 0.95)
+
+    Returns:
+        float: Critical value t such that P(|T| <= t) = confidence
+    """
+    p = 0.5 + confidence / 2
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+
+    z = NormalDist().inv_cdf(p)
+    g1 = (z ** 3 + z) / 4
+    g2 = (5 * z ** 5 + 16 * z ** 3 + 3 * z) / 96
+    g3 = (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / 384
+    g4 = (79 * z ** 9 + 776 * z ** 7 + 1482 * z ** 5 - 1920 * z ** 3 - 945 * z) / 92160
+    return z + g1 / df + g2 / df ** 2 + g3 / df ** 3 + g4 / df ** 4
+
+
+def mean_confidence_interval(values, confidence=0.95):
+    """
+    Sample mean with a t-based confidence interval.
+
+    Args:
+        values (list): Observations (one per replication)
+        confidence (float): Confidence level
+
+    Returns:
+        dict: mean, std, half_width, low, high and n
+    """
+    n = len(values)
+    if n == 0:
+        return {'mean': 0, 'std': 0, 'half_width': 0, 'low': 0, 'high': 0, 'n': 0}
+
+    mean = sum(values) / n
+    if n == 1:
+        std = 0
+        half_width = math.inf
+    else:
+        std = math.sqrt(sum((v - mean) ** 2 for v in values) / (n - 1))
+        half_width = t_critical(n - 1, confidence) * std / math.sqrt(n)
+
+    return {
+        'mean': mean,
+        'std': std,
+        'half_width': half_width,
+        'low': mean - half_width,
+        'high': mean + half_width,
+        'n': n
+    }
+
+
+def mean_confidence_intervals(values, confidence=0.95):
+    """
+    Column-wise mean_confidence_interval() of a table, in one vectorized pass.
+
+    Args:
+        values (numpy.ndarray): One row per replication, one column per metric
+        confidence (float): Confidence level
+
+    Returns:
+        dict: mean, std, half_width, low and high (arrays, one entry per
+            column) and n
+    """
+    values = np.asarray(values, dtype=float)
+    n, columns = values.shape
+    if n == 0:
+        zeros = np.zeros(columns)
+        return {'mean': zeros, 'std': zeros, 'half_width': zeros, 'low': zeros, 'high': zeros, 'n': 0}
+
+    mean = values.mean(axis=0)
+    if n == 1:
+        std = np.zeros(columns)
+        half_width = np.full(columns, math.inf)
+    else:
+        std = values.std(axis=0, ddof=1)
+        half_width = t_critical(n - 1, confidence) * std / math.sqrt(n)
+
+    return {
+        'mean': mean,
+        'std': std,
+        'half_width': half_width,
+        'low': mean - half_width,
+        'high': mean + half_width,
+        'n': n
+    }
+
+
+def mser_truncation(values, batch_size=5):
+    """
+    Find the warm-up length to delete with the MSER-5 rule.
+
+    Observations are averaged in batches of batch_size, and the number of
+    leading batches d that minimizes the marginal standard error
+    (variance of the kept batches / (kept count)^2) is chosen, searching
+    only the first half of the run.
+
+    Args:
+        values (list): Observations in time order (e.g. system time of each car by exit)
+        batch_size (int): Observations per MSER batch (5 for MSER-5)
+
+    Returns:
+        int: Number of leading observations to drop
+    """
+    num_batches = len(values) // batch_size
+    if num_batches < 4:
+        return 0
+
+    batches = np.asarray(values[:num_batches * batch_size], dtype=float).reshape(num_batches, batch_size).mean(axis=1)
+
+    # Mean and variance of batches d..end for every d, from suffix sums
+    suffix_sum = np.cumsum(batches[::-1])[::-1]
+    suffix_squares = np.cumsum((batches ** 2)[::-1])[::-1]
+    kept = np.arange(num_batches, 0, -1)
+    means = suffix_sum / kept
+    variances = suffix_squares / kept - means ** 2
+    statistic = variances / kept
+
+    candidates = num_batches // 2 + 1
+    return int(np.argmin(statistic[:candidates])) * batch_size
+
+
+def batch_means(values, num_batches=20, confidence=0.95, truncate=True):
+    """
+    Confidence interval for a steady-state mean from one long run.
+
+    The warm-up is removed with MSER-5 (unless truncate is False), then the
+    rest is split into num_batches equal batches whose means are treated as
+    independent observations.
+
+    Args:
+        values (list): Observations in time order
+        num_batches (int): Number of batches (10-30 is typical)
+        confidence (float): Confidence level
+        truncate (bool): Remove the MSER-5 warm-up first
+
+    Returns:
+        dict: Same fields as mean_confidence_interval(), plus 'truncated'
+            (observations dropped), 'batch_size' and 'warmup_at_limit' (MSER
+            wanted to drop half the run: likely no steady state)
+    """
+    truncated = mser_truncation(values) if truncate else 0
+    kept = np.asarray(values[truncated:], dtype=float)
+    batch_size = len(kept) // num_batches
+    if batch_size == 0:
+        raise ValueError(f"Need at least {num_batches} observations after warm-up, got {len(kept)}")
+
+    batch_values = kept[:batch_size * num_batches].reshape(num_batches, batch_size).mean(axis=1)
+    interval = mean_confidence_interval(batch_values.tolist(), confidence)
+    interval['truncated'] = truncated
+    interval['batch_size'] = batch_size
+    interval['warmup_at_limit'] = truncate and truncated > 0 and truncated == (len(values) // 5 // 2) * 5
+    return interval
@@ -0,0 +1,245 @@
+# replication.py
+# Runs independent, reproducible replications of the simulation in parallel
+
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from src.simulation import PaintShopSimulation
+from src.metrics import summarize_results
+from src.output_analysis import mean_confidence_interval, mean_confidence_intervals, batch_means
+from src.results import summary_table
+from src.scenario import resolve_scenario
+
+
+def spawn_seeds(num_replications, base_seed=None):
+    """
+    Create one independent seed per replication.
+
+    Seeds are spawned from a single numpy SeedSequence, which guarantees the
+    resulting random streams do not overlap. The same base_seed always gives
+    the same streams, so a replication set can be reproduced exactly.
+
+    Args:
+        num_replications (int): Number of seeds to create
+        base_seed (int): Root seed (None draws fresh entropy)
+
+    Returns:
+        list: numpy SeedSequence objects, one per replication
+    """
+    return np.random.SeedSequence(base_seed).spawn(num_replications)
+
+
+def run_replication(seed, scenario=None):
+    """
+    Run one silent replication and return its summary.
+
+    Module-level so it can be sent to worker processes.
+
+    Args:
+        seed (numpy.random.SeedSequence): Seed for this replication
+        scenario (Scenario): Scenario to run (default: Scenario.from_config())
+
+    Returns:
+        dict: Summary from metrics.summarize_results()
+    """
+    sim = PaintShopSimulation(scenario, seed=seed, log_level="OFF", verbose=False)
+    return summarize_results(sim.run())
+
+
+def run_seeds(seeds, scenario=None, workers=None, chunksize=None):
+    """
+    Run one replication per seed, across a process pool when worthwhile.
+
+    Args:
+        seeds (list): One seed per replication
+        scenario (Scenario): Scenario to run (default: Scenario.from_config())
+        workers (int): Worker processes (None = CPU count, 1 = run in this process)
+        chunksize (int): Replications sent to a worker at a time (None = automatic)
+
+    Returns:
+        list: One summary dict per seed, in seed order
+    """
+    workers = workers or os.cpu_count() or 1
+
+    if workers == 1 or len(seeds) <= 1:
+        return [run_replication(seed, scenario) for seed in seeds]
+
+    # Large chunks keep inter-process overhead small for 1000+ short replications
+    if chunksize is None:
+        chunksize = max(1, len(seeds) // (workers * 4))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(partial(run_replication, scenario=scenario), seeds, chunksize=chunksize))
+
+
+def run_replications(num_replications, base_seed=None, workers=None, chunksize=None, scenario=None, cache=None):
+    """
+    Run independent replications across a process pool.
+
+    Args:
+        num_replications (int): Number of replications
+        base_seed (int): Root seed for all replications (None = fresh entropy)
+        workers (int): Worker processes (None = CPU count, 1 = run in this process)
+        chunksize (int): Replications sent to a worker at a time (None = automatic)
+        scenario (Scenario): Scenario to run (default: Scenario.from_config())
+        cache (ResultCache): Reuse stored summaries and store new ones
+            (only used with a base_seed, since other runs cannot be repeated)
+
+    Returns:
+        list: One summary dict per replication, in seed order
+    """
+    seeds = spawn_seeds(num_replications, base_seed)
+    if cache is None or base_seed is None:
+        return run_seeds(seeds, scenario, workers, chunksize)
+    return _run_cached(seeds, resolve_scenario(scenario), cache,
+                       lambda missing: run_seeds(missing, scenario, workers, chunksize))
+
+
+def _run_cached(seeds, scenario, cache, run):
+    """Return summaries for seeds, calling run(missing_seeds) only for cache misses"""
+    summaries = cache.get_many(scenario, seeds)
+    missing = [index for index, summary in enumerate(summaries) if summary is None]
+    if missing:
+        computed = run([seeds[index] for index in missing])
+        for index, summary in zip(missing, computed):
+            summaries[index] = summary
+        cache.put_many(scenario, [(seeds[index], summaries[index]) for index in missing])
+    return summaries
+
+
+def run_until_precision(metric="avg_system_time", relative_precision=0.02, confidence=None, scenario=None,
+                        base_seed=None, workers=None, min_replications=10, max_replications=1000, cache=None):
+    """
+    Add replications in parallel batches until a confidence interval is narrow enough.
+
+    Stops once the half-width of the metric's interval is at most
+    relative_precision times its mean (e.g. 0.02 for +-2%), or when
+    max_replications have been run. After each batch the number still needed
+    is estimated from the current interval (half-width shrinks as 1/sqrt(n)),
+    so a noisy configuration gets large batches and a stable one stops early.
+    Seeds are spawned in order from base_seed, so with a base seed the first
+    n replications are the same as run_replications(n, base_seed).
+
+    Args:
+        metric (str): Summary metric to estimate (see metrics.summarize_results())
+        relative_precision (float): Target half-width as a fraction of the mean
+        confidence (float): Confidence level (default: the scenario's confidence_level)
+        scenario (Scenario): Scenario to run (default: Scenario.from_config())
+        base_seed (int): Root seed (None = fresh entropy)
+        workers (int): Worker processes (None = CPU count, 1 = run in this process)
+        min_replications (int): Replications in the first batch (at least 2)
+        max_replications (int): Budget; stop here even if the target is not met
+        cache (ResultCache): Reuse stored summaries and store new ones (needs base_seed)
+
+    Returns:
+        dict: 'summaries', 'aggregate' (as aggregate_replications()), 'interval'
+            (the metric's interval), 'replications', 'batches' and 'target_met'
+    """
+    scenario = resolve_scenario(scenario)
+    if confidence is None:
+        confidence = scenario.confidence_level
+    workers = workers or os.cpu_count() or 1
+    root = np.random.SeedSequence(base_seed)
+    use_cache = cache is not None and base_seed is not None
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    run_one = partial(run_replication, scenario=scenario)
+
+    def run(seeds):
+        if pool is None or len(seeds) == 1:
+            return [run_one(seed) for seed in seeds]
+        return list(pool.map(run_one, seeds, chunksize=max(1, len(seeds) // (workers * 4))))
+
+    summaries = []
+    batches = 0
+    next_batch = min(max(2, min_replications), max_replications)
+    try:
+        while next_batch > 0:
+            seeds = root.spawn(next_batch)
+            summaries.extend(_run_cached(seeds, scenario, cache, run) if use_cache else run(seeds))
+            batches += 1
+
+            interval = mean_confidence_interval([summary[metric] for summary in summaries], confidence)
+            target = relative_precision * abs(interval['mean'])
+            if interval['half_width'] <= target:
+                break
+
+            # Replications needed so that the half-width reaches the target
+            needed = math.ceil(len(summaries) * (interval['half_width'] / target) ** 2) if target else max_replications
+            next_batch = min(max(needed - len(summaries), workers), max_replications - len(summaries))
+    finally:
+        if pool is not None:
+            pool.shutdown()
+
+    return {
+        'metric': metric,
+        'summaries': summaries,
+        'aggregate': aggregate_replications(summaries, confidence),
+        'interval': interval,
+        'relative_precision': relative_precision,
+        'replications': len(summaries),
+        'batches': batches,
+        'target_met': interval['half_width'] <= target
+    }
+
+
+def run_batch_means(num_shifts, scenario=None, seed=None, num_batches=20, confidence=None):
+    """
+    Estimate the steady-state average system time from one long run.
+
+    Runs num_shifts shifts back to back, deletes the start-up transient with
+    MSER-5 and builds a batch-means interval from the remaining cars (in exit
+    order). Only meaningful for a stable line: on an overloaded one system
+    times keep growing and there is no steady state to estimate.
+
+    Args:
+        num_shifts (int): Length of the run in shifts
+        scenario (Scenario): Scenario to run (default: Scenario.from_config())
+        seed (int): Seed of the run
+        num_batches (int): Number of batches
+        confidence (float): Confidence level (default: the scenario's confidence_level)
+
+    Returns:
+        dict: Output of output_analysis.batch_means() plus 'cars'
+    """
+    scenario = resolve_scenario(scenario)
+    if confidence is None:
+        confidence = scenario.confidence_level
+
+    sim = PaintShopSimulation(scenario, seed=seed, log_level="OFF", verbose=False)
+    for _ in sim.run_shifts(num_shifts):
+        pass
+
+    system_times = sim.cars_completed.system_times()
+    interval = batch_means(system_times, num_batches, confidence)
+    interval['cars'] = len(system_times)
+    return interval
+
+
+def aggregate_replications(summaries, confidence=0.95):
+    """
+    Merge replication summaries into means with confidence intervals.
+
+    The summaries are stacked into one table and every metric's interval is
+    computed in a single vectorized pass, so thousands of replications
+    aggregate in about the time it takes to build the table.
+
+    Args:
+        summaries (list): Summary dicts from run_replications(), or SimulationResults
+        confidence (float): Confidence level of the intervals
+
+    Returns:
+        dict: Metric name -> dict with mean, std, half_width, low, high and n
+    """
+    if not summaries:
+        return {}
+
+    names, values = summary_table(summaries)
+    intervals = mean_confidence_intervals(values, confidence)
+    columns = {key: intervals[key].tolist() for key in ('mean', 'std', 'half_width', 'low', 'high')}
+    return {
+        name: {key: column[index] for key, column in columns.items()} | {'n': intervals['n']}
+        for index, name in enumerate(names)
+    }
@@ -0,0 +1,206 @@
+# result_cache.py
+# On-disk cache of replication summaries, keyed by scenario, seed and code version
+
+import functools
+import glob
+import hashlib
+import json
+import os
+import sqlite3
+import time
+import numpy as np
+
+SECONDS_PER_DAY = 86400
+QUERY_BATCH = 500  # Keys per IN (...) query, under SQLite's limit on bound parameters
+
+
+@functools.lru_cache(maxsize=None)
+def engine_version():
+    """
+    Hash of the simulation source code (every .py file in src/).
+
+    Any code change gives a new version, so results computed by older code
+    are never returned.
+
+    Returns:
+        str: Short hex digest
+    """
+    digest = hashlib.sha256()
+    for path in sorted(glob.glob(os.path.join(os.path.dirname(os.path.abspath(__file__)), "*.py"))):
+        digest.update(os.path.basename(path).encode())
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:16]
+
+
+def seed_key(seed):
+    """
+    Stable text form of a seed, or None if the run is not reproducible.
+
+    Args:
+        seed (int or numpy.random.SeedSequence): Seed of the run
+    """
+    if seed is None:
+        return None
+    if isinstance(seed, np.random.SeedSequence):
+        if seed.entropy is None:
+            return None
+        return f"{seed.entropy}:{','.join(map(str, seed.spawn_key))}"
+    return str(int(seed))
+
+
+class ResultCache:
+    """
+    SQLite store of replication summaries (summarize_results() dicts).
+
+    An entry is keyed by the scenario fingerprint, the seed, the engine and
+    the engine version, so changing any parameter or any source file misses
+    the cache instead of returning stale numbers. Entries older than
+    max_age_days are dropped, and once there are more than max_entries the
+    least recently used ones go first.
+    """
+
+    def __init__(self, path="output/result_cache.sqlite", max_entries=100000, max_age_days=30):
+        """
+        Open (or create) a cache file.
+
+        Args:
+            path (str): SQLite database file
+            max_entries (int): Keep at most this many entries (None = no limit)
+            max_age_days (float): Drop entries created longer ago than this (None = keep)
+        """
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.version = engine_version()
+        self.hits = 0
+        self.misses = 0
+
+        self._connection = sqlite3.connect(path)
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS results ("
+            " key TEXT PRIMARY KEY, scenario TEXT, seed TEXT, engine TEXT, version TEXT,"
+            " summary TEXT, created REAL, last_used REAL)"
+        )
+        # Entries from other code versions can never be hit again
+        self._connection.execute("DELETE FROM results WHERE version != ?", (self.version,))
+        self.evict()
+        self._connection.commit()
+
+    def key(self, scenario, seed, engine="simpy"):
+        """Cache key of one run, or None if the seed is not reproducible"""
+        return self._key(scenario.fingerprint(), seed, engine)
+
+    def _key(self, fingerprint, seed, engine):
+        """key() with the scenario fingerprint already computed"""
+        seed_text = seed_key(seed)
+        if seed_text is None:
+            return None
+        return hashlib.sha256(f"{fingerprint}|{seed_text}|{engine}|{self.version}".encode()).hexdigest()
+
+    def get(self, scenario, seed, engine="simpy"):
+        """
+        Look up a cached summary.
+
+        Args:
+            scenario (Scenario): Scenario that was run
+            seed (int or numpy.random.SeedSequence): Seed of the run
+            engine (str): Engine name ("simpy" or "fast")
+
+        Returns:
+            dict: Cached summary, or None on a miss
+        """
+        return self.get_many(scenario, [seed], engine)[0]
+
+    def get_many(self, scenario, seeds, engine="simpy"):
+        """
+        Look up the cached summaries of several seeds at once.
+
+        One SELECT per QUERY_BATCH keys, then a single UPDATE of last_used
+        and a single commit for all the hits, so a warm lookup of a whole
+        replication set costs a few queries rather than one transaction per
+        seed.
+
+        Args:
+            scenario (Scenario): Scenario that was run
+            seeds (list): Seeds of the runs
+            engine (str): Engine name ("simpy" or "fast")
+
+        Returns:
+            list: Cached summary or None per seed, in seed order
+        """
+        fingerprint = scenario.fingerprint()
+        keys = [self._key(fingerprint, seed, engine) for seed in seeds]
+        wanted = [key for key in keys if key is not None]
+        found = {}
+        for start in range(0, len(wanted), QUERY_BATCH):
+            batch = wanted[start:start + QUERY_BATCH]
+            found.update(self._connection.execute(
+                f"SELECT key, summary FROM results WHERE key IN ({','.join('?' * len(batch))})", batch
+            ).fetchall())
+
+        hits = list(found)
+        if hits:
+            now = time.time()
+            for start in range(0, len(hits), QUERY_BATCH):
+                batch = hits[start:start + QUERY_BATCH]
+                self._connection.execute(
+                    f"UPDATE results SET last_used = ? WHERE key IN ({','.join('?' * len(batch))})", [now] + batch
+                )
+            self._connection.commit()
+
+        summaries = [json.loads(found[key]) if key in found else None for key in keys]
+        self.hits += sum(summary is not None for summary in summaries)
+        self.misses += sum(summary is None for summary in summaries)
+        return summaries
+
+    def put(self, scenario, seed, summary, engine="simpy"):
+        """
+        Store a summary (ignored when the seed is not reproducible).
+
+        Args:
+            scenario (Scenario): Scenario that was run
+            seed (int or numpy.random.SeedSequence): Seed of the run
+            summary (dict): Output of metrics.summarize_results()
+            engine (str): Engine name ("simpy" or "fast")
+        """
+        self.put_many(scenario, [(seed, summary)], engine)
+
+    def put_many(self, scenario, entries, engine="simpy"):
+        """Store several (seed, summary) pairs in one transaction"""
+        now = time.time()
+        fingerprint = scenario.fingerprint()
+        rows = []
+        for seed, summary in entries:
+            key = self._key(fingerprint, seed, engine)
+            if key is not None:
+                rows.append((key, fingerprint, seed_key(seed), engine, self.version, json.dumps(summary), now, now))
+        self._connection.executemany("INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        self.evict()
+        self._connection.commit()
+
+    def evict(self):
+        """Drop entries past max_age_days, then the least recently used beyond max_entries"""
+        if self.max_age_days is not None:
+            cutoff = time.time() - self.max_age_days * SECONDS_PER_DAY
+            self._connection.execute("DELETE FROM results WHERE created < ?", (cutoff,))
+        if self.max_entries is not None:
+            self._connection.execute(
+                "DELETE FROM results WHERE key NOT IN "
+                "(SELECT key FROM results ORDER BY last_used DESC LIMIT ?)", (self.max_entries,)
+            )
+
+    def clear(self):
+        """Remove every entry"""
+        self._connection.execute("DELETE FROM results")
+        self._connection.commit()
+
+    def __len__(self):
+        return self._connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+
+    def close(self):
+        """Close the database file"""
+        self._connection.close()
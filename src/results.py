@@ -0,0 +1,341 @@
+# results.py
+# Immutable simulation results with memoized metrics, compact pickling and JSON/CSV/text emitters
+
+import copy
+import csv
+import dataclasses
+import json
+from functools import cached_property
+from operator import itemgetter
+import numpy as np
+
+REPORTED_PERCENTILES = (50, 95, 99)  # Wait time percentiles shown in reports
+
+
+class _Frozen:
+    """
+    Pickling for frozen dataclasses with cached_property metrics.
+
+    Only the fields are pickled: memoized metrics are recomputed on demand
+    after unpickling, so sending a result to another process costs its
+    inputs and nothing more.
+    """
+
+    def __getstate__(self):
+        return {field.name: getattr(self, field.name) for field in dataclasses.fields(self)}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+
+
+@dataclasses.dataclass(frozen=True)
+class StationResults(_Frozen):
+    """
+    Final statistics of one station, with derived metrics computed once on first use.
+
+    Holds numbers and the wait-time sketch only, never the live Station, so
+    it stays small whatever the length of the run.
+    """
+
+    name: str
+    machines: int
+    busy_time: float  # Total machine busy time
+    processed: int  # Cars that finished processing
+    avg_wait: float
+    avg_processing_time: float
+    max_queue: int
+    queue_area: float  # Integral of queue length up to end_time
+    simulation_time: float
+    end_time: float
+    alerts: int = 0
+    bottleneck_time: float = 0.0
+    peak_queue: int = 0
+    avg_onset_latency: float = 0.0
+    alert_intervals: tuple = ()  # (opened, closed, peak) per alert
+    wait_sketch: object = dataclasses.field(default=None, compare=False, repr=False)  # Has get_quantile(q)
+
+    @classmethod
+    def from_station(cls, station, simulation_time, end_time, report=None):
+        """
+        Take the final statistics of a station.
+
+        Args:
+            station (Station): Station after the run (or any object with its reporting methods)
+            simulation_time (float): Planned run length (the utilization base)
+            end_time (float): Actual end of the run (the queue-length base)
+            report (dict): The station's entry of BottleneckDetector.get_report()
+        """
+        report = report or {}
+        return cls(
+            name=station.name,
+            machines=station.num_machines,
+            busy_time=station.total_busy_time,
+            processed=station.get_processed_count(),
+            avg_wait=station.get_avg_wait_time(),
+            avg_processing_time=station.get_avg_processing_time(),
+            max_queue=station.max_queue_length,
+            queue_area=station.get_queue_area(end_time),
+            simulation_time=simulation_time,
+            end_time=end_time,
+            alerts=report.get('alerts', 0),
+            bottleneck_time=report.get('bottleneck_time', 0.0),
+            peak_queue=report.get('peak_queue', 0),
+            avg_onset_latency=report.get('avg_onset_latency', 0.0),
+            alert_intervals=tuple(tuple(interval) for interval in report.get('intervals', ())),
+            wait_sketch=copy.deepcopy(station.wait_sketch)  # The station's keeps growing if the run goes on
+        )
+
+    @cached_property
+    def utilization(self):
+        """Machine utilization percentage over the planned run length"""
+        if self.simulation_time == 0:
+            return 0
+        return self.busy_time / (self.machines * self.simulation_time) * 100
+
+    @cached_property
+    def avg_queue(self):
+        """Time-weighted average queue length over the run"""
+        return self.queue_area / self.end_time if self.end_time > 0 else 0
+
+    @cached_property
+    def wait_percentiles(self):
+        """Percentile (REPORTED_PERCENTILES) -> wait time"""
+        return {percentile: self.wait_percentile(percentile) for percentile in REPORTED_PERCENTILES}
+
+    def wait_percentile(self, percentile):
+        """
+        Estimate a wait time percentile.
+
+        Args:
+            percentile (float): Percentile between 0 and 100 (e.g. 95)
+        """
+        if self.wait_sketch is None:
+            return 0.0
+        return self.wait_sketch.get_quantile(percentile / 100)
+
+    @cached_property
+    def bottleneck_report(self):
+        """The station's entry in the shape of BottleneckDetector.get_report()"""
+        return {
+            'alerts': self.alerts,
+            'bottleneck_time': self.bottleneck_time,
+            'peak_queue': self.peak_queue,
+            'avg_onset_latency': self.avg_onset_latency,
+            'intervals': list(self.alert_intervals)
+        }
+
+    def to_dict(self):
+        """JSON-ready dict of the station's statistics and derived metrics"""
+        return {
+            'name': self.name,
+            'machines': self.machines,
+            'utilization': self.utilization,
+            'processed': self.processed,
+            'avg_wait': self.avg_wait,
+            **{f"p{percentile}_wait": value for percentile, value in self.wait_percentiles.items()},
+            'avg_processing_time': self.avg_processing_time,
+            'avg_queue': self.avg_queue,
+            'max_queue': self.max_queue,
+            'busy_time': self.busy_time,
+            'bottleneck': self.bottleneck_report
+        }
+
+
+@dataclasses.dataclass(frozen=True)
+class SimulationResults(_Frozen):
+    """
+    Results of one run, immutable and cheap to move between processes.
+
+    Build one with from_results() from the dict a simulation returns.
+    Derived metrics (throughputs, percentiles, the flat summary) are
+    computed on first use and memoized; reports, JSON and CSV rows all read
+    them, so nothing is computed twice. The per-car table and live Station
+    objects are left behind: a pickled result holds only the fields below.
+    """
+
+    total_cars: int
+    avg_system_time: float
+    alert_count: int
+    simulation_time: float
+    end_time: float
+    cars_truncated: int
+    stations: tuple  # StationResults per stage, in processing order
+    scenario: object = None  # Scenario of the run
+    system_time_sketch: object = dataclasses.field(default=None, compare=False, repr=False)
+    sensitivities: dict = dataclasses.field(default=None, compare=False, repr=False)  # IPA gradients, if computed
+
+    @classmethod
+    def from_results(cls, results):
+        """
+        Freeze the results of a run.
+
+        Args:
+            results (dict): Output of PaintShopSimulation.get_results() (or of
+                the other engines, a trace replay or analytic.analytic_results())
+
+        Returns:
+            SimulationResults: The run's results
+        """
+        simulation_time = results['simulation_time']
+        end_time = results.get('end_time', simulation_time)
+        bottlenecks = results.get('bottlenecks', {})
+        return cls(
+            total_cars=results['total_cars'],
+            avg_system_time=results['avg_system_time'],
+            alert_count=results['alert_count'],
+            simulation_time=simulation_time,
+            end_time=end_time,
+            cars_truncated=results.get('cars_truncated', 0),
+            stations=tuple(StationResults.from_station(station, simulation_time, end_time,
+                                                       bottlenecks.get(station.name))
+                           for station in results['stations']),
+            scenario=results.get('scenario'),
+            system_time_sketch=copy.deepcopy(results.get('system_time_sketch')),
+            sensitivities=results.get('sensitivities')
+        )
+
+    def station(self, name):
+        """Return a station's results by name"""
+        for station in self.stations:
+            if station.name == name:
+                return station
+        raise KeyError(name)
+
+    @cached_property
+    def throughput_per_hour(self):
+        """Cars completed per hour of the planned run length"""
+        return self.total_cars / (self.simulation_time / 60) if self.simulation_time else 0
+
+    @cached_property
+    def drain_throughput_per_hour(self):
+        """Cars completed per hour until the line was empty"""
+        return self.total_cars / (self.end_time / 60) if self.end_time else 0
+
+    @cached_property
+    def p95_system_time(self):
+        """95th percentile of the time in the system"""
+        return self.system_time_sketch.get_quantile(0.95) if self.system_time_sketch is not None else 0.0
+
+    @cached_property
+    def most_utilized(self):
+        """The station with the highest utilization"""
+        return max(self.stations, key=lambda station: station.utilization)
+
+    @cached_property
+    def bottlenecks(self):
+        """Station name -> alert report, as BottleneckDetector.get_report()"""
+        return {station.name: station.bottleneck_report for station in self.stations}
+
+    @cached_property
+    def summary(self):
+        """
+        Flat dict of numbers, with "<Station>.<metric>" keys for per-station values.
+
+        The same keys and values as metrics.summarize_results(), which is
+        what replications, caches and batch tables are built from.
+        """
+        summary = {
+            'total_cars': self.total_cars,
+            'throughput_per_hour': self.throughput_per_hour,
+            'drain_throughput_per_hour': self.drain_throughput_per_hour,
+            'avg_system_time': self.avg_system_time,
+            'p95_system_time': self.p95_system_time,
+            'alert_count': self.alert_count
+        }
+        for station in self.stations:
+            summary[f"{station.name}.utilization"] = station.utilization
+            summary[f"{station.name}.max_queue"] = station.max_queue
+            summary[f"{station.name}.avg_wait"] = station.avg_wait
+            summary[f"{station.name}.p95_wait"] = station.wait_percentiles[95]
+            summary[f"{station.name}.avg_queue"] = station.avg_queue
+        for station in self.stations:
+            summary[f"{station.name}.bottleneck_time"] = station.bottleneck_time
+        return summary
+
+    def to_dict(self):
+        """
+        JSON-ready dict of the results.
+
+        Returns:
+            dict: Run totals, derived metrics, one entry per station and the scenario
+        """
+        data = {
+            'total_cars': self.total_cars,
+            'avg_system_time': self.avg_system_time,
+            'p95_system_time': self.p95_system_time,
+            'throughput_per_hour': self.throughput_per_hour,
+            'drain_throughput_per_hour': self.drain_throughput_per_hour,
+            'alert_count': self.alert_count,
+            'simulation_time': self.simulation_time,
+            'end_time': self.end_time,
+            'cars_truncated': self.cars_truncated,
+            'stations': [station.to_dict() for station in self.stations]
+        }
+        if self.sensitivities is not None:
+            data['sensitivities'] = self.sensitivities
+        if self.scenario is not None:
+            data['scenario'] = self.scenario.to_dict()
+        return data
+
+    def to_json(self, **kwargs):
+        """Serialize to_dict() as JSON (keyword arguments go to json.dumps)"""
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def csv_header(self):
+        """Column names of to_csv_row(): the summary keys"""
+        return list(self.summary)
+
+    def to_csv_row(self):
+        """The summary values, in csv_header() order"""
+        return list(self.summary.values())
+
+    def to_text(self):
+        """The text report printed after a run (see metrics.print_results())"""
+        from src.metrics import format_results
+        return format_results(self)
+
+
+def as_results(results):
+    """Return results as a SimulationResults, freezing a results dict if needed"""
+    if isinstance(results, SimulationResults):
+        return results
+    return SimulationResults.from_results(results)
+
+
+def summary_table(batch):
+    """
+    Stack a batch of results into one table.
+
+    Args:
+        batch (list): SimulationResults or summary dicts (metrics.summarize_results()),
+            all with the same keys
+
+    Returns:
+        tuple: (column names, float array with one row per result)
+    """
+    summaries = [result.summary if isinstance(result, SimulationResults) else result for result in batch]
+    if not summaries:
+        return [], np.empty((0, 0))
+    names = list(summaries[0])
+    row = itemgetter(*names)
+    values = np.array([row(summary) for summary in summaries], dtype=float).reshape(len(summaries), len(names))
+    return names, values
+
+
+def write_csv(batch, file):
+    """
+    Write a batch of results as CSV, one row per result.
+
+    Args:
+        batch (list): SimulationResults or summary dicts with the same keys
+        file: Path or open text file
+    """
+    if isinstance(file, str):
+        with open(file, "w", newline="") as f:
+            return write_csv(batch, f)
+
+    writer = csv.writer(file)
+    summaries = [result.summary if isinstance(result, SimulationResults) else result for result in batch]
+    if summaries:
+        writer.writerow(list(summaries[0]))
+        writer.writerows([list(summary.values()) for summary in summaries])
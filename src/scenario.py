@@ -0,0 +1,207 @@
+# scenario.py
+# Immutable description of one simulation scenario
+
+import dataclasses
+import hashlib
+import json
+import os
+from src.entities import StationSpec
+
+# Scenario field -> config.py name it is loaded from
+CONFIG_NAMES = {
+    "stations": "LINE_STATIONS",
+    "arrival_distribution": "CAR_ARRIVAL_DISTRIBUTION",
+    "simulation_time": "SIMULATION_TIME",
+    "acceptance_time": "NEW_CAR_ACCEPTANCE_TIME",
+    "max_drain_time": "MAX_DRAIN_TIME",
+    "shift_length": "SHIFT_LENGTH",
+    "shifts_per_day": "SHIFTS_PER_DAY",
+    "shift_breaks": "SHIFT_BREAKS",
+    "variate_block_size": "VARIATE_BLOCK_SIZE",
+    "bottleneck_threshold": "BOTTLENECK_THRESHOLD",
+    "bottleneck_clear_threshold": "BOTTLENECK_CLEAR_THRESHOLD",
+    "keep_station_history": "KEEP_STATION_HISTORY",
+    "confidence_level": "CONFIDENCE_LEVEL",
+    "log_level": "LOG_DETAIL_LEVEL",
+    "log_buffer_size": "LOG_BUFFER_SIZE",
+    "log_file_path": "LOG_FILE_PATH",
+    "results_file_path": "RESULTS_FILE_PATH",
+    "verbose": "VERBOSE_LOGGING",
+}
+
+# Fields that change how a run is logged or reported but not what it simulates
+OUTPUT_FIELDS = frozenset({
+    "keep_station_history", "confidence_level", "log_level",
+    "log_buffer_size", "log_file_path", "results_file_path", "verbose",
+})
+
+
+def _freeze(value):
+    """Turn lists (e.g. from JSON or YAML) into tuples, recursively"""
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def _canonical(value):
+    """Make numerically equal values serialize the same (480 and 480.0)"""
+    if isinstance(value, (list, tuple)):
+        return [_canonical(item) for item in value]
+    if isinstance(value, dict):
+        return {key: _canonical(item) for key, item in value.items()}
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    return value
+
+
+def _station_spec(entry):
+    """Build a StationSpec from a (name, machines, distribution) sequence or a dict"""
+    if isinstance(entry, dict):
+        entry = (entry["name"], entry["machines"], entry["distribution"])
+    name, machines, distribution = entry
+    return StationSpec(str(name), int(machines), _freeze(distribution))
+
+
+@dataclasses.dataclass(frozen=True)
+class Scenario:
+    """
+    Every input of a run: line layout, distributions, timing, detection and
+    output settings.
+
+    Frozen and hashable, so the same object can be shared by many runs,
+    threads or processes and used as a dictionary key. Build one with
+    from_config(), from_dict() or from_file(), and derive what-if variants
+    with replace() instead of editing config.py.
+    """
+
+    stations: tuple  # StationSpec per stage, in processing order
+    arrival_distribution: tuple
+    simulation_time: float
+    acceptance_time: float
+    max_drain_time: float
+    shift_length: float
+    shifts_per_day: int
+    shift_breaks: tuple
+    variate_block_size: int
+    bottleneck_threshold: int
+    bottleneck_clear_threshold: int
+    keep_station_history: bool
+    confidence_level: float
+    log_level: str
+    log_buffer_size: int
+    log_file_path: str
+    results_file_path: str
+    verbose: bool
+
+    def __post_init__(self):
+        # Normalize nested values so the scenario is hashable whatever it was built from
+        object.__setattr__(self, "stations", tuple(_station_spec(entry) for entry in self.stations))
+        object.__setattr__(self, "arrival_distribution", _freeze(self.arrival_distribution))
+        object.__setattr__(self, "shift_breaks", _freeze(self.shift_breaks))
+
+    @property
+    def station_names(self):
+        """Station names in processing order"""
+        return [spec.name for spec in self.stations]
+
+    def replace(self, **changes):
+        """Return a copy with some fields changed (e.g. scenario.replace(acceptance_time=960))"""
+        return dataclasses.replace(self, **changes)
+
+    def with_machines(self, station_name, machines):
+        """Return a copy with a different machine count at one station"""
+        if station_name not in self.station_names:
+            raise ValueError(f"Unknown station: {station_name!r}")
+        return self.replace(stations=[spec._replace(machines=machines) if spec.name == station_name else spec
+                                      for spec in self.stations])
+
+    def to_dict(self):
+        """Return the scenario as plain lists, numbers and strings (JSON-serializable)"""
+        data = {field.name: getattr(self, field.name) for field in dataclasses.fields(self)}
+        data["stations"] = [[spec.name, spec.machines, list(spec.distribution)] for spec in self.stations]
+        data["arrival_distribution"] = list(self.arrival_distribution)
+        data["shift_breaks"] = [list(interval) for interval in self.shift_breaks]
+        return data
+
+    def fingerprint(self):
+        """
+        Stable hash of everything that affects simulated results.
+
+        Unlike hash(), it is the same in every process and Python version,
+        and it ignores OUTPUT_FIELDS (log and report settings).
+
+        Returns:
+            str: Hex SHA-256 digest
+        """
+        data = {name: _canonical(value) for name, value in self.to_dict().items() if name not in OUTPUT_FIELDS}
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    @classmethod
+    def from_config(cls, module=None):
+        """
+        Build a scenario from the settings in config.py.
+
+        Args:
+            module: Module (or any object) holding the config.py names (default: config)
+        """
+        if module is None:
+            import config as module
+        return cls(**{field: getattr(module, name) for field, name in CONFIG_NAMES.items()})
+
+    @classmethod
+    def from_dict(cls, data, base=None):
+        """
+        Build a scenario from a dict, keeping base values for missing keys.
+
+        Args:
+            data (dict): Scenario field -> value; stations may be given as
+                [name, machines, distribution] lists or as dicts with those keys
+            base (Scenario): Values for fields not in data (default: from_config())
+        """
+        unknown = set(data) - set(CONFIG_NAMES)
+        if unknown:
+            raise ValueError(f"Unknown scenario field(s): {sorted(unknown)}")
+        if base is None:
+            base = cls.from_config()
+        return base.replace(**data)
+
+    @classmethod
+    def from_json(cls, path, base=None):
+        """Load a scenario from a JSON file (see from_dict())"""
+        with open(path) as f:
+            return cls.from_dict(json.load(f), base)
+
+    @classmethod
+    def from_yaml(cls, path, base=None):
+        """Load a scenario from a YAML file (requires PyYAML; see from_dict())"""
+        try:
+            import yaml
+        except ImportError:
+            raise ImportError("YAML scenarios require PyYAML (pip install pyyaml)")
+
+        with open(path) as f:
+            return cls.from_dict(yaml.safe_load(f) or {}, base)
+
+    @classmethod
+    def from_file(cls, path, base=None):
+        """Load a scenario from a .json, .yaml or .yml file"""
+        extension = os.path.splitext(path)[1].lower()
+        if extension == ".json":
+            return cls.from_json(path, base)
+        if extension in (".yaml", ".yml"):
+            return cls.from_yaml(path, base)
+        raise ValueError(f"Unsupported scenario file type: {path!r} (expected .json, .yaml or .yml)")
+
+
+def resolve_scenario(scenario=None, **overrides):
+    """
+    Return the scenario to run, with per-run overrides applied.
+
+    Args:
+        scenario (Scenario): Scenario to start from (default: Scenario.from_config())
+        **overrides: Scenario fields to change; None values are ignored
+    """
+    if scenario is None:
+        scenario = Scenario.from_config()
+    changes = {name: value for name, value in overrides.items() if value is not None}
+    return scenario.replace(**changes) if changes else scenario
@@ -0,0 +1,232 @@
+# sensitivity.py
+# Single-run gradient estimates by infinitesimal perturbation analysis (IPA)
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from src.metrics import summarize_results
+from src.output_analysis import mean_confidence_interval
+from src.scenario import resolve_scenario
+from src.variates import distribution_mean, scale_distribution
+
+ARRIVAL_RATE = "arrival_rate"  # Parameter name of the arrival rate (cars per hour)
+SENSITIVITY_METRICS = ("avg_system_time", "drain_throughput_per_hour")
+
+
+def parameter_names(scenario):
+    """
+    Parameters IPA differentiates with respect to, in gradient order.
+
+    "<Station>.service_scale" multiplies every processing time at a station
+    (1 = as specified); "arrival_rate" is cars per hour.
+    """
+    return [f"{name}.service_scale" for name in scenario.station_names] + [ARRIVAL_RATE]
+
+
+class PathSensitivity:
+    """
+    Accumulates derivatives of event times along one PaintShopSimulation run.
+
+    In a FIFO line a car starts at a station either when it gets there (if a
+    machine is free) or when the car ahead of it releases a machine, and
+    finishes a processing time later. Each event time is therefore a sum of
+    arrival and processing times, and its derivative follows the same chain:
+    the start inherits the derivative of the ready time or of the releasing
+    departure, and the finish adds the processing time for the station's
+    scale (scaling a distribution scales each draw). An arrival time is a sum
+    of intervals proportional to 1 / arrival rate.
+
+    Gradients are plain lists, one entry per parameter (see parameter_names()).
+    The number of cars accepted is held fixed: IPA does not see cars added or
+    lost at the acceptance time when the arrival rate changes.
+    """
+
+    def __init__(self, scenario):
+        """
+        Args:
+            scenario (Scenario): Scenario of the run
+        """
+        self.parameters = parameter_names(scenario)
+        self.arrival_rate = 60 / distribution_mean(scenario.arrival_distribution)
+        self.system_time_total = [0.0] * len(self.parameters)  # Sum of system time gradients
+        self.last_exit = [0.0] * len(self.parameters)  # Gradient of the latest exit time
+        self.cars = 0
+
+    def arrived(self, arrival_time):
+        """Return the gradient of an arrival time"""
+        gradient = [0.0] * len(self.parameters)
+        gradient[-1] = -arrival_time / self.arrival_rate
+        return gradient
+
+    def finished(self, stage, gradient, service_time, resource):
+        """
+        Return the gradient of a service end, and pass it to the car the release lets in.
+
+        Call before the car releases its machine: the first queued request
+        is the one the release grants.
+
+        Args:
+            stage (int): Station position in the line
+            gradient (list): Gradient of the service start
+            service_time (float): Processing time
+            resource (simpy.Resource): The station's machines
+        """
+        gradient = list(gradient)
+        gradient[stage] += service_time
+        if resource.queue:
+            resource.queue[0].gradient = gradient
+        return gradient
+
+    def exited(self, arrival_gradient, gradient):
+        """Record a car leaving the line, given the gradients of its arrival and exit"""
+        total = self.system_time_total
+        for index, value in enumerate(gradient):
+            total[index] += value - arrival_gradient[index]
+        self.last_exit = gradient
+        self.cars += 1
+
+    def get_results(self, end_time, drained):
+        """
+        Derivatives of the run's metrics with respect to every parameter.
+
+        Args:
+            end_time (float): End of the run
+            drained (bool): Whether the run ended with the last exit (not at the safety cap)
+
+        Returns:
+            dict: Metric ('avg_system_time', 'drain_throughput_per_hour') ->
+                parameter name -> derivative
+        """
+        cars = self.cars
+        throughput = cars / (end_time / 60) if end_time else 0
+        # At the safety cap the run ends at a fixed time
+        end_gradient = self.last_exit if drained else [0.0] * len(self.parameters)
+        return {
+            'avg_system_time': {name: total / cars if cars else 0.0
+                                for name, total in zip(self.parameters, self.system_time_total)},
+            'drain_throughput_per_hour': {name: -throughput / end_time * value if end_time else 0.0
+                                          for name, value in zip(self.parameters, end_gradient)}
+        }
+
+
+def run_sensitivity(seed, scenario=None):
+    """
+    Run one replication with IPA and return its summary and gradients.
+
+    Module-level so it can be sent to worker processes.
+
+    Returns:
+        tuple: (summary from metrics.summarize_results(), results['sensitivities'])
+    """
+    from src.simulation import PaintShopSimulation
+
+    sim = PaintShopSimulation(scenario, seed=seed, log_level="OFF", verbose=False, keep_cars=False,
+                              sensitivities=True)
+    results = sim.run()
+    return summarize_results(results), results['sensitivities']
+
+
+def estimate_sensitivities(scenario=None, replications=20, base_seed=None, workers=None, confidence=None):
+    """
+    Average IPA gradients over independent replications.
+
+    Each replication gives every derivative at the cost of one run; the
+    interval reflects run-to-run noise.
+
+    Args:
+        scenario (Scenario): Scenario to differentiate (default: Scenario.from_config())
+        replications (int): Independent runs
+        base_seed (int): Root seed (None = fresh entropy)
+        workers (int): Worker processes (None = CPU count, 1 = run in this process)
+        confidence (float): Confidence level (default: the scenario's confidence_level)
+
+    Returns:
+        dict: 'parameters', 'values' (parameter -> current value),
+            'metrics' (metric -> interval of its value) and 'gradients'
+            (metric -> parameter -> interval of the derivative)
+    """
+    scenario = resolve_scenario(scenario)
+    if confidence is None:
+        confidence = scenario.confidence_level
+    workers = workers or os.cpu_count() or 1
+    seeds = np.random.SeedSequence(base_seed).spawn(replications)
+
+    run = partial(run_sensitivity, scenario=scenario)
+    if workers == 1 or replications <= 1:
+        runs = [run(seed) for seed in seeds]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            runs = list(pool.map(run, seeds, chunksize=max(1, replications // (workers * 4))))
+
+    parameters = parameter_names(scenario)
+    values = {name: 1.0 for name in parameters}
+    values[ARRIVAL_RATE] = 60 / distribution_mean(scenario.arrival_distribution)
+    return {
+        'parameters': parameters,
+        'values': values,
+        'replications': replications,
+        'metrics': {metric: mean_confidence_interval([summary[metric] for summary, _ in runs], confidence)
+                    for metric in SENSITIVITY_METRICS},
+        'gradients': {metric: {name: mean_confidence_interval([gradients[metric][name] for _, gradients in runs],
+                                                              confidence)
+                               for name in parameters}
+                      for metric in SENSITIVITY_METRICS}
+    }
+
+
+def perturb(scenario, parameter, step):
+    """
+    Return the scenario with one parameter increased by step.
+
+    Args:
+        scenario (Scenario): Scenario to change
+        parameter (str): Name from parameter_names()
+        step (float): Change of the service scale (from 1), or of the arrival
+            rate in cars per hour
+    """
+    if parameter == ARRIVAL_RATE:
+        rate = 60 / distribution_mean(scenario.arrival_distribution)
+        return scenario.replace(arrival_distribution=scale_distribution(scenario.arrival_distribution,
+                                                                        rate / (rate + step)))
+    name = parameter[:-len(".service_scale")]
+    if name not in scenario.station_names:
+        raise ValueError(f"Unknown parameter: {parameter!r}")
+    return scenario.replace(stations=[spec._replace(distribution=scale_distribution(spec.distribution, 1 + step))
+                                      if spec.name == name else spec for spec in scenario.stations])
+
+
+def finite_differences(scenario=None, seed=None, step=1e-6):
+    """
+    Forward-difference gradients of one seed, with common random numbers.
+
+    The brute-force check of IPA: one extra run per parameter. With a small
+    step the perturbed run keeps the same event order, so the differences
+    match the IPA gradients of the same seed (up to rounding) unless a car
+    crosses the acceptance time.
+
+    Args:
+        scenario (Scenario): Scenario to differentiate (default: Scenario.from_config())
+        seed (int or numpy.random.SeedSequence): Seed shared by all runs
+        step (float): Parameter change (see perturb())
+
+    Returns:
+        dict: Metric -> parameter name -> derivative, as results['sensitivities']
+    """
+    from src.simulation import PaintShopSimulation
+
+    scenario = resolve_scenario(scenario)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+
+    def run(variant):
+        return summarize_results(PaintShopSimulation(variant, seed=seed, log_level="OFF", verbose=False,
+                                                     keep_cars=False).run())
+
+    base = run(scenario)
+    gradients = {metric: {} for metric in SENSITIVITY_METRICS}
+    for name in parameter_names(scenario):
+        perturbed = run(perturb(scenario, name, step))
+        for metric in SENSITIVITY_METRICS:
+            gradients[metric][name] = (perturbed[metric] - base[metric]) / step
+    return gradients
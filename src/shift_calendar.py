@@ -0,0 +1,75 @@
+# shift_calendar.py
+# Maps working time onto a calendar of shifts and breaks
+
+MINUTES_PER_DAY = 1440
+
+
+class ShiftCalendar:
+    """
+    Shifts of fixed length, several per day, with breaks inside each shift.
+
+    New cars are only accepted during working time (inside a shift and
+    outside its breaks). Arrival intervals are drawn in working time and
+    then placed on the calendar, so a break delays arrivals instead of
+    dropping them.
+    """
+
+    def __init__(self, shift_length=480, shifts_per_day=3, breaks=()):
+        """
+        Initialize the calendar.
+
+        Args:
+            shift_length (float): Length of one shift in minutes
+            shifts_per_day (int): Shifts starting each day (back to back from midnight)
+            breaks (list): (start, end) minutes from the start of each shift
+                during which no new cars are accepted
+        """
+        if shift_length * shifts_per_day > MINUTES_PER_DAY:
+            raise ValueError(f"{shifts_per_day} shifts of {shift_length} minutes do not fit in a day")
+
+        self.shift_length = shift_length
+        self.shifts_per_day = shifts_per_day
+        self.breaks = sorted(breaks)
+
+        # Working segments of one shift, as (start, end) offsets from the shift start
+        self.segments = []
+        segment_start = 0
+        for break_start, break_end in self.breaks:
+            if not 0 <= break_start < break_end <= shift_length or break_start < segment_start:
+                raise ValueError(f"Invalid or overlapping break: {(break_start, break_end)}")
+            if break_start > segment_start:
+                self.segments.append((segment_start, break_start))
+            segment_start = break_end
+        if segment_start < shift_length:
+            self.segments.append((segment_start, shift_length))
+
+        self.working_time_per_shift = sum(end - start for start, end in self.segments)
+
+    def shift_start(self, index):
+        """Calendar time at which shift number index (0-based) starts"""
+        day, shift_of_day = divmod(index, self.shifts_per_day)
+        return day * MINUTES_PER_DAY + shift_of_day * self.shift_length
+
+    def shift_end(self, index):
+        """Calendar time at which shift number index (0-based) ends"""
+        return self.shift_start(index) + self.shift_length
+
+    def to_calendar_time(self, working_time):
+        """
+        Convert cumulative working time into calendar time.
+
+        Args:
+            working_time (float): Minutes of working time since the first shift started
+
+        Returns:
+            float: Calendar time (minutes since the first shift started)
+        """
+        index, offset = divmod(working_time, self.working_time_per_shift)
+        shift_start = self.shift_start(int(index))
+
+        for segment_start, segment_end in self.segments:
+            length = segment_end - segment_start
+            if offset < length:
+                return shift_start + segment_start + offset
+            offset -= length
+        return shift_start + self.segments[-1][1]
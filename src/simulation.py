@@ -2,258 +2,494 @@
 # Main simulation engine using SimPy
 
 import simpy
-import config
 from src.entities import Car, Station
+from src.car_store import CarStore
 from src.bottleneck_detector import BottleneckDetector
+from src import event_log
+from src.event_log import EventLogger
+from src.variates import VariateSupply
+from src.shift_calendar import ShiftCalendar
+from src.streaming_stats import RunningStats, QuantileSketch
+from src.instrumentation import Instrumentation
+from src.sensitivity import PathSensitivity
+from src.event_trace import TraceWriter
+from src.scenario import resolve_scenario
 
 class PaintShopSimulation:
     """
     Main simulation class that orchestrates the entire paint shop process.
     """
     
-    def __init__(self):
-        """Initialize simulation"""
+    def __init__(self, scenario=None, seed=None, log_level=None, log_path=None, verbose=None, variates=None,
+                 keep_history=None, stations=None, keep_cars=True, instrument=False, antithetic=False,
+                 sensitivities=False, trace_path=None):
+        """
+        Initialize simulation.
+        
+        All settings come from the scenario; the run never reads config.py
+        globals, so several simulations can run side by side in one process.
+        
+        Args:
+            scenario (Scenario): Scenario to run (see src/scenario.py);
+                defaults to Scenario.from_config()
+            seed (int or numpy.random.SeedSequence): Seed for this run's random streams;
+                None draws fresh entropy (non-reproducible run)
+            log_level (str): Log level override ("DETAILED", "SUMMARY", "MINIMAL" or "OFF")
+            log_path (str): Log file path override
+            verbose (bool): Echo logged lines to the console
+            variates: Source of arrival and service times (see src/variates.py);
+                defaults to a VariateSupply seeded with seed
+            keep_history (bool): Keep raw per-car lists in each Station
+            stations (list): Line layout override as (name, machines, distribution)
+                specs in processing order
+            keep_cars (bool): Store every completed car in 'cars_completed'
+                (turn off for long runs that only need summary statistics)
+            instrument (bool): Count events and time the hot paths (see
+                src/instrumentation.py); off by default and free when off
+            antithetic (bool): Use the antithetic twin of the seed's random
+                streams (see src/variance_reduction.py)
+            sensitivities (bool): Accumulate IPA derivatives of the results with
+                respect to each station's service-time scale and the arrival rate
+                (see src/sensitivity.py); single-shift runs only
+            trace_path (str): Also record every event in a binary trace file
+                for replay (see src/event_trace.py)
+        """
+        # The scenario with this run's overrides applied
+        self.scenario = scenario = resolve_scenario(
+            scenario, log_level=log_level, log_file_path=log_path, verbose=verbose,
+            keep_station_history=keep_history, stations=stations
+        )
+        
         # SimPy environment (the simulation clock)
         self.env = simpy.Environment()
         
-        # Create stations with their resources (machines)
-        self.cleaning_station = Station("Cleaning", config.CLEANING_MACHINES)
-        self.primer_station = Station("Primer", config.PRIMER_MACHINES)
-        self.painting_station = Station("Painting", config.PAINTING_MACHINES)
+        # Line layout, one spec per stage in processing order
+        self.station_specs = list(scenario.stations)
         
-        # SimPy Resources (limit how many cars can use each station simultaneously)
-        self.cleaning_resource = simpy.Resource(self.env, config.CLEANING_MACHINES)
-        self.primer_resource = simpy.Resource(self.env, config.PRIMER_MACHINES)
-        self.painting_resource = simpy.Resource(self.env, config.PAINTING_MACHINES)
+        # Private random streams, so runs are reproducible and independent of each other
+        if variates is None:
+            variates = VariateSupply(seed, scenario=scenario, antithetic=antithetic)
+        self.variates = variates
+        
+        # Per-stage statistics and SimPy Resources (limit how many cars can use
+        # each station simultaneously), both indexed by stage
+        self.stations = [Station(spec.name, spec.machines, scenario.keep_station_history)
+                         for spec in self.station_specs]
+        self.resources = [simpy.Resource(self.env, spec.machines) for spec in self.station_specs]
         
         # Tracking variables
-        self.cars_completed = []  # List of completed Car objects
+        self.keep_cars = keep_cars
+        self.cars_completed = CarStore([spec.name for spec in self.station_specs])  # Completed cars, one row each
+        self.system_time_stats = RunningStats()  # System times of all completed cars
+        self.system_time_sketch = QuantileSketch()  # Their distribution, for percentiles
         self.cars_in_system = 0  # Currently processing cars
         self.car_counter = 0  # Counter for car IDs
-        self.log_file = open(config.LOG_FILE_PATH, "w")
+        self.cars_truncated = 0  # Cars still in the system when the safety cap stopped the run
+        
+        # Termination: acceptance closes at acceptance_time, then the run ends
+        # as soon as the line is empty (the 'drained' event)
+        self.acceptance_time = scenario.acceptance_time
+        self.calendar = None  # ShiftCalendar in multi-shift mode
+        self.accepting = True
+        self.started = False
+        self.next_arrival_time = None  # When the pending arrival lands (for snapshots)
+        self.drained = self.env.event()
+        
+        # Event logger (level-gated and buffered; opens no file at level OFF)
+        self.logger = EventLogger(
+            scenario.log_file_path,
+            scenario.log_level,
+            buffer_size=scenario.log_buffer_size,
+            echo=scenario.verbose
+        )
         
         # Bottleneck detector
-        self.bottleneck_detector = BottleneckDetector(config.BOTTLENECK_THRESHOLD)
+        self.bottleneck_detector = BottleneckDetector(scenario.bottleneck_threshold,
+                                                      scenario.bottleneck_clear_threshold)
         self.alert_count = 0
+        
+        # Optional binary trace: every logged event is also recorded there
+        self.trace = None
+        if trace_path is not None:
+            self.trace = TraceWriter(trace_path, scenario)
+            self.log = self._traced(self.log)
+        
+        # Optional path derivatives, returned as 'sensitivities'
+        self.sensitivity = PathSensitivity(scenario) if sensitivities else None
+        
+        # Optional instrumentation (wraps this instance's methods, so it must come last)
+        self.instrumentation = Instrumentation(self) if instrument else None
+    
+    def log(self, code, car_id=None, station=None, value=None):
+        """Record a structured event (see src/event_log.py for codes and levels)"""
+        self.logger.event(code, self.env.now, car_id, station, value)
     
-    def log(self, message):
-        """Write message based on verbosity level"""
-        timestamp = f"[{self.env.now:.1f}]"
-        full_message = f"{timestamp} {message}"
-        
-        # Determine if this message should be logged
-        should_log = False
-        
-        if config.LOG_DETAIL_LEVEL == "DETAILED":
-            # Log everything
-            should_log = True
-        
-        elif config.LOG_DETAIL_LEVEL == "SUMMARY":
-            # Only log important events
-            important_keywords = ["ARRIVED", "EXITED", "ALERT", "STOP accepting", "SIMULATION"]
-            should_log = any(keyword in message for keyword in important_keywords)
-        
-        elif config.LOG_DETAIL_LEVEL == "MINIMAL":
-            # Only log alerts
-            should_log = "ALERT" in message or "STOP accepting" in message
-        
-        # Write to console and file if it should be logged
-        if should_log:
-            if config.VERBOSE_LOGGING:
-                print(full_message)
-            self.log_file.write(full_message + "\n")
-        else:
-            # Always write to file, just not to console
-            self.log_file.write(full_message + "\n")
-        
-        self.log_file.flush()
+    def _traced(self, log):
+        """Wrap log() so each event is also appended to the trace"""
+        env = self.env
+        record = self.trace.record
+        
+        def traced_log(code, car_id=None, station=None, value=None):
+            record(code, env.now, car_id, station)
+            log(code, car_id, station, value)
+        
+        return traced_log
     
-    def car_generator(self):
+    def car_generator(self, next_arrival_time=None):
         """
         Generator process that creates new cars at random intervals.
-        Runs until SIMULATION_TIME is reached.
+        Runs until acceptance_time is reached. With a shift calendar, intervals
+        count working time only, so no cars arrive during breaks or off-shift.
+        
+        Args:
+            next_arrival_time (float): Time of an arrival already drawn (when
+                resuming from a snapshot); the next interval is drawn after it
         """
+        env = self.env
+        calendar = self.calendar
+        working_time = 0.0
+        
         while True:
             # Wait for random interval until next car arrives
-            yield self.env.timeout(config.get_car_arrival_interval())
+            if next_arrival_time is not None:
+                self.next_arrival_time = next_arrival_time
+                yield env.timeout(max(0.0, next_arrival_time - env.now))
+                next_arrival_time = None
+            elif calendar is None:
+                interval = self.variates.arrival_interval()
+                self.next_arrival_time = env.now + interval
+                yield env.timeout(interval)
+            else:
+                working_time += self.variates.arrival_interval()
+                yield env.timeout(max(0.0, calendar.to_calendar_time(working_time) - env.now))
             
-            # Stop accepting new cars after 480 minutes
-            if self.env.now >= config.NEW_CAR_ACCEPTANCE_TIME:
-                self.log(f"STOP accepting new cars (shift end at {config.NEW_CAR_ACCEPTANCE_TIME} min)")
+            # Stop accepting new cars once the acceptance window closes
+            if env.now >= self.acceptance_time:
+                self.log(event_log.STOP_ACCEPTING, value=self.acceptance_time)
                 break
             
             # Create new car
             self.car_counter += 1
             car = Car(self.car_counter, self.env.now)
-            self.log(f"Car {car.car_id} ARRIVED")
+            self.log(event_log.CAR_ARRIVED, car.car_id)
             
             # Start car's journey through the system
             self.cars_in_system += 1
             self.env.process(self.car_journey(car))
+        
+        self.accepting = False
+        if self.cars_in_system == 0:
+            self.drained.succeed()
     
-    def car_journey(self, car):
+    def car_journey(self, car, first_stage=0):
         """
         Process that represents a single car's journey through all stations.
-        """
-        # STATION 1: CLEANING
-        self.log(f"Car {car.car_id} entering Cleaning queue")
-        car.cleaning_start_time = self.env.now
         
-        # Request access to cleaning machine
-        with self.cleaning_resource.request() as request:
-            # Wait for machine to be available
-            yield request
-            car.cleaning_start_time = self.env.now
-            
-            # Update station tracking
-            wait_time = car.cleaning_start_time - car.arrival_time
-            self.cleaning_station.add_wait_time(wait_time)
-            
-            self.log(f"Car {car.car_id} STARTED Cleaning")
-            
-            # Process cleaning (takes 15-20 minutes)
-            cleaning_time = config.get_cleaning_time()
-            yield self.env.timeout(cleaning_time)
-            
-            car.cleaning_end_time = self.env.now
-            self.cleaning_station.add_processing_time(cleaning_time)
-            self.cleaning_station.total_busy_time += cleaning_time
+        The same request/wait/process/record steps run once per stage, so the
+        cost per event does not depend on how many stations the line has.
+        
+        Args:
+            car (Car): The car
+            first_stage (int): Stage to start at (later than 0 when resuming)
+        """
+        env = self.env
+        variates = self.variates
+        sensitivity = self.sensitivity
+        # When the car became ready for the current stage
+        ready_time = car.end_times[-1] if first_stage else car.arrival_time
+        if sensitivity is not None:
+            # Gradient of the car's latest event time
+            arrival_gradient = gradient = sensitivity.arrived(car.arrival_time)
+        
+        for stage, station in enumerate(self.stations[first_stage:], first_stage):
+            self.log(event_log.QUEUE_ENTERED, car.car_id, station.name)
             
-            self.log(f"Car {car.car_id} FINISHED Cleaning")
+            # Request access to a machine and wait until one is available.
+            # A request not granted at once joins the queue until it is.
+            with self.resources[stage].request() as request:
+                request.car = car  # Lets a snapshot find the cars at each station
+                if request.triggered:
+                    yield request
+                else:
+                    self.queue_changed(stage, 1)
+                    yield request
+                    self.queue_changed(stage, -1)
+                    if sensitivity is not None:
+                        # Started when the car ahead released a machine
+                        gradient = request.gradient
+                start_time = env.now
+                car.start_times.append(start_time)
+                
+                # Update station tracking
+                station.add_wait_time(start_time - ready_time)
+                
+                self.log(event_log.SERVICE_STARTED, car.car_id, station.name)
+                
+                # Process the car
+                service_time = variates.service_time(station.name, car.car_id)
+                yield env.timeout(service_time)
+                
+                ready_time = env.now
+                car.end_times.append(ready_time)
+                station.add_processing_time(service_time)
+                station.total_busy_time += service_time
+                if sensitivity is not None:
+                    gradient = sensitivity.finished(stage, gradient, service_time, self.resources[stage])
+                
+                self.log(event_log.SERVICE_FINISHED, car.car_id, station.name)
         
-        # Update queue status
-        self.update_queue_status()
+        # CAR EXITS SYSTEM
+        car.exit_time = env.now
+        system_time = car.exit_time - car.arrival_time
+        self.system_time_stats.add(system_time)
+        self.system_time_sketch.add(system_time)
+        if self.keep_cars:
+            self.cars_completed.append(car)
+        if sensitivity is not None:
+            sensitivity.exited(arrival_gradient, gradient)
+        self.cars_in_system -= 1
         
-        # STATION 2: PRIMER APPLICATION
-        self.log(f"Car {car.car_id} entering Primer queue")
+        self.log(event_log.CAR_EXITED, car.car_id, value=car.get_total_system_time())
         
-        with self.primer_resource.request() as request:
-            # Wait for machine to be available
-            yield request
-            car.primer_start_time = self.env.now
-            
-            # Update station tracking
-            wait_time = car.primer_start_time - car.cleaning_end_time
-            self.primer_station.add_wait_time(wait_time)
-            
-            self.log(f"Car {car.car_id} STARTED Primer")
-            
-            # Process primer (takes 25-35 minutes)
-            primer_time = config.get_primer_time()
-            yield self.env.timeout(primer_time)
-            
-            car.primer_end_time = self.env.now
-            self.primer_station.add_processing_time(primer_time)
-            self.primer_station.total_busy_time += primer_time
-            
-            self.log(f"Car {car.car_id} FINISHED Primer")
+        # Last car out after acceptance closed: the run is over
+        if self.cars_in_system == 0 and not self.accepting:
+            self.drained.succeed()
+    
+    def resume_journey(self, car, stage, service_time=None):
+        """
+        Continue a car restored from a snapshot (see src/snapshot.py).
         
-        # Update queue status
-        self.update_queue_status()
+        Finishes the stage the car was at, then carries on as car_journey().
         
-        # STATION 3: PAINTING
-        self.log(f"Car {car.car_id} entering Painting queue")
+        Args:
+            car (Car): The car, with its times up to the snapshot
+            stage (int): Stage the car was at
+            service_time (float): Its processing time if it was being served,
+                None if it was waiting in the queue
+        """
+        env = self.env
+        station = self.stations[stage]
         
-        with self.painting_resource.request() as request:
-            # Wait for machine to be available
+        with self.resources[stage].request() as request:
+            request.car = car
             yield request
-            car.painting_start_time = self.env.now
-            
-            # Update station tracking
-            wait_time = car.painting_start_time - car.primer_end_time
-            self.painting_station.add_wait_time(wait_time)
-            
-            self.log(f"Car {car.car_id} STARTED Painting")
+            if service_time is None:
+                # Its arrival in the queue was counted before the snapshot
+                self.queue_changed(stage, -1)
+                start_time = env.now
+                car.start_times.append(start_time)
+                station.add_wait_time(start_time - (car.end_times[-1] if stage else car.arrival_time))
+                self.log(event_log.SERVICE_STARTED, car.car_id, station.name)
+                service_time = self.variates.service_time(station.name, car.car_id)
+                yield env.timeout(service_time)
+            else:
+                yield env.timeout(max(0.0, car.start_times[-1] + service_time - env.now))
             
-            # Process painting (takes 30-40 minutes)
-            painting_time = config.get_painting_time()
-            yield self.env.timeout(painting_time)
-            
-            car.painting_end_time = self.env.now
-            self.painting_station.add_processing_time(painting_time)
-            self.painting_station.total_busy_time += painting_time
-            
-            self.log(f"Car {car.car_id} FINISHED Painting")
+            car.end_times.append(env.now)
+            station.add_processing_time(service_time)
+            station.total_busy_time += service_time
+            self.log(event_log.SERVICE_FINISHED, car.car_id, station.name)
         
-        # CAR EXITS SYSTEM
-        car.exit_time = self.env.now
-        self.cars_completed.append(car)
-        self.cars_in_system -= 1
-        
-        self.log(f"Car {car.car_id} EXITED SYSTEM (Total time: {car.get_total_system_time():.1f} min)")
+        yield from self.car_journey(car, stage + 1)
     
-    def update_queue_status(self):
+    def queue_changed(self, stage, change):
         """
-        Check current queue lengths and detect bottlenecks.
+        Record a change in one station's queue and detect bottlenecks there.
+        
+        Called on every join and leave, so only the station whose queue
+        changed is checked.
+        
+        Args:
+            stage (int): Position of the station in the line
+            change (int): +1 when a car joins the queue, -1 when it leaves for a machine
         """
-        cleaning_queue = len(self.cleaning_resource.queue)
-        primer_queue = len(self.primer_resource.queue)
-        painting_queue = len(self.painting_resource.queue)
+        station = self.stations[stage]
+        queue_length = station.current_queue_length + change
         
         # Update station queue tracking
-        self.cleaning_station.update_queue(cleaning_queue, self.env.now)
-        self.primer_station.update_queue(primer_queue, self.env.now)
-        self.painting_station.update_queue(painting_queue, self.env.now)
+        station.update_queue(queue_length, self.env.now)
         
         # Check for bottlenecks
-        if self.bottleneck_detector.check_bottleneck("Cleaning", cleaning_queue, self.env.now):
+        if self.bottleneck_detector.check_bottleneck(station.name, queue_length, self.env.now):
             self.alert_count += 1
-            self.log(f"ALERT: Queue at Cleaning has {cleaning_queue} cars waiting")
+            self.log(event_log.BOTTLENECK_ALERT, station=station.name, value=queue_length)
+    
+    def start(self):
+        """Start the car generator (once; run() and advance() call this)"""
+        if self.started:
+            return
+        self.started = True
         
-        if self.bottleneck_detector.check_bottleneck("Primer", primer_queue, self.env.now):
-            self.alert_count += 1
-            self.log(f"ALERT: Queue at Primer has {primer_queue} cars waiting")
+        self.log(event_log.SEPARATOR)
+        self.log(event_log.SIMULATION_STARTED)
+        self.log(event_log.SEPARATOR)
         
-        if self.bottleneck_detector.check_bottleneck("Painting", painting_queue, self.env.now):
-            self.alert_count += 1
-            self.log(f"ALERT: Queue at Painting has {painting_queue} cars waiting")
+        self.env.process(self.car_generator())
+    
+    def advance(self, until):
+        """
+        Run part of the shift, up to a given time.
+        
+        Use with src/snapshot.py to capture the state mid-shift; run() then
+        finishes the shift.
+        
+        Args:
+            until (float): Simulation time to stop at
+        """
+        self.start()
+        self.env.run(until=until)
     
     def run(self):
         """
         Run the complete simulation.
         Start the car generator and run until all cars are processed.
         """
-        self.log("=" * 80)
-        self.log("PAINT SHOP CONVEYOR SYSTEM SIMULATION STARTED")
-        self.log("=" * 80)
+        self.start()
         
-        # Start car generator process
-        self.env.process(self.car_generator())
+        # Run until the last car leaves after acceptance closes
+        self.run_until_drained()
         
-        # Run simulation
-        # We simulate beyond 480 minutes to let cars in process finish
-        self.env.run(until=2000)  # Large number to ensure all cars finish
+        self.log(event_log.SEPARATOR)
+        self.log(event_log.SIMULATION_COMPLETE)
+        self.log(event_log.SEPARATOR)
         
-        self.log("=" * 80)
-        self.log("SIMULATION COMPLETE")
-        self.log("=" * 80)
-        
-        self.log_file.close()
+        self.logger.close()
+        if self.trace is not None:
+            self.trace.close()
         
         return self.get_results()
     
+    def run_until_drained(self):
+        """
+        Advance the clock until the line is empty after acceptance closes.
+        
+        Stops early at acceptance_time + the scenario's max_drain_time; cars still in
+        the system then are counted in cars_truncated.
+        """
+        cap_time = self.acceptance_time + self.scenario.max_drain_time
+        safety_cap = self.env.timeout(max(0.0, cap_time - self.env.now))
+        self.env.run(until=self.env.any_of([self.drained, safety_cap]))
+        
+        self.cars_truncated = self.cars_in_system
+        if self.cars_truncated:
+            self.log(event_log.SAFETY_CAP_REACHED, value=self.cars_truncated)
+    
+    def run_shifts(self, num_shifts, calendar=None, drain=True):
+        """
+        Run several shifts, yielding a summary as each shift ends.
+        
+        Summaries are produced from running counters, so nothing grows with
+        the horizon (combine with keep_cars=False for weeks or months).
+        
+        Args:
+            num_shifts (int): Number of shifts to run; acceptance closes at the end of the last
+            calendar (ShiftCalendar): Shift layout (default: from the scenario's shift settings)
+            drain (bool): After the last shift, keep running until the line is empty
+        
+        Yields:
+            dict: Per-shift summary (see _shift_summary())
+        """
+        if self.sensitivity is not None:
+            raise ValueError("Sensitivities are only computed for single-shift runs (run())")
+        if calendar is None:
+            scenario = self.scenario
+            calendar = ShiftCalendar(scenario.shift_length, scenario.shifts_per_day, scenario.shift_breaks)
+        self.calendar = calendar
+        self.acceptance_time = calendar.shift_end(num_shifts - 1)
+        self.start()
+        
+        previous = self._shift_counters()
+        for index in range(num_shifts):
+            self.env.run(until=calendar.shift_end(index))
+            current = self._shift_counters()
+            self.log(event_log.SHIFT_ENDED, value=index + 1)
+            yield self._shift_summary(index + 1, previous, current)
+            previous = current
+        
+        if drain:
+            self.run_until_drained()
+        
+        self.log(event_log.SEPARATOR)
+        self.log(event_log.SIMULATION_COMPLETE)
+        self.log(event_log.SEPARATOR)
+        
+        self.logger.close()
+        if self.trace is not None:
+            self.trace.close()
+    
+    def _shift_counters(self):
+        """Snapshot the cumulative counters used to build shift summaries"""
+        now = self.env.now
+        return {
+            'time': now,
+            'arrived': self.car_counter,
+            'exited': self.system_time_stats.count,
+            'system_time_total': self.system_time_stats.total,
+            'busy_time': [station.total_busy_time for station in self.stations],
+            'processed': [station.get_processed_count() for station in self.stations],
+            'queue_area': [station.get_queue_area(now) for station in self.stations]
+        }
+    
+    def _shift_summary(self, shift_number, previous, current):
+        """
+        Build the summary of one shift from two counter snapshots.
+        
+        Returns:
+            dict: Flat summary with per-station values under "<Station>.<metric>" keys
+        """
+        duration = current['time'] - previous['time']
+        exited = current['exited'] - previous['exited']
+        system_time_total = current['system_time_total'] - previous['system_time_total']
+        
+        summary = {
+            'shift': shift_number,
+            'start': previous['time'],
+            'end': current['time'],
+            'cars_arrived': current['arrived'] - previous['arrived'],
+            'cars_exited': exited,
+            'throughput_per_hour': exited / (duration / 60) if duration else 0,
+            'avg_system_time': system_time_total / exited if exited else 0,
+            'wip_at_end': self.cars_in_system
+        }
+        
+        for index, station in enumerate(self.stations):
+            busy_time = current['busy_time'][index] - previous['busy_time'][index]
+            queue_area = current['queue_area'][index] - previous['queue_area'][index]
+            summary[f"{station.name}.utilization"] = busy_time / (station.num_machines * duration) * 100 if duration else 0
+            summary[f"{station.name}.processed"] = current['processed'][index] - previous['processed'][index]
+            summary[f"{station.name}.avg_queue"] = queue_area / duration if duration else 0
+            summary[f"{station.name}.queue_at_end"] = station.current_queue_length
+        
+        return summary
+    
     def get_results(self):
         """
         Calculate and return all metrics from the simulation.
         """
-        simulation_time = config.SIMULATION_TIME
-        
-        total_cars = len(self.cars_completed)
+        simulation_time = self.scenario.simulation_time
         
-        if total_cars == 0:
-            avg_system_time = 0
-        else:
-            avg_system_time = sum([c.get_total_system_time() for c in self.cars_completed]) / total_cars
+        total_cars = self.system_time_stats.count
+        avg_system_time = self.system_time_stats.mean
         
         results = {
             'total_cars': total_cars,
             'avg_system_time': avg_system_time,
-            'cleaning_station': self.cleaning_station,
-            'primer_station': self.primer_station,
-            'painting_station': self.painting_station,
+            'system_time_sketch': self.system_time_sketch,
+            'stations': self.stations,
             'alert_count': self.alert_count,
             'cars_completed': self.cars_completed,
-            'simulation_time': simulation_time
+            'simulation_time': simulation_time,
+            'end_time': self.env.now,
+            'cars_truncated': self.cars_truncated,
+            'bottlenecks': self.bottleneck_detector.get_report(self.env.now, [station.name for station in self.stations]),
+            'scenario': self.scenario
         }
         
+        if self.sensitivity is not None:
+            results['sensitivities'] = self.sensitivity.get_results(self.env.now, self.drained.triggered)
+        
+        # Also expose each station by name (e.g. 'painting_station')
+        for station in self.stations:
+            results[f"{station.name.lower()}_station"] = station
+        
         return results
\ No newline at end of file
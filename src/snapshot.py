@@ -0,0 +1,236 @@
+# snapshot.py
+# Captures a running simulation mid-shift and forks what-if branches from it
+
+import dataclasses
+import os
+import pickle
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import simpy
+from src.entities import Car
+from src.metrics import summarize_results
+from src.simulation import PaintShopSimulation
+from src.scenario import resolve_scenario
+from src.variates import VariateSupply
+
+
+class CarState(namedtuple("CarState", ["car_id", "arrival_time", "start_times", "end_times", "service_time"])):
+    """
+    One car in the line at the moment of a snapshot.
+
+    Fields:
+        car_id (int): Car ID
+        arrival_time (float): When it entered the line
+        start_times, end_times (tuple): Service start/end times at the stages it reached
+        service_time (float): Processing time at its current stage if it is
+            being served, None if it is waiting in the queue
+    """
+    __slots__ = ()
+
+
+@dataclasses.dataclass(frozen=True)
+class SimulationSnapshot:
+    """
+    Everything needed to continue a PaintShopSimulation from a point in time.
+
+    Holds plain data only (no SimPy objects), so it pickles cheaply and one
+    snapshot can seed any number of branches, in this or other processes.
+    """
+
+    time: float
+    scenario: object  # Scenario the run was started with
+    seed: object  # numpy SeedSequence of the run's random streams
+    antithetic: bool
+    arrivals_drawn: int  # Arrival intervals taken from the arrival stream so far
+    next_arrival_time: float  # Time of the pending arrival (None once acceptance closed)
+    car_counter: int
+    stages: tuple  # Per stage: (cars in service, cars queued in FIFO order) as CarState tuples
+    accumulators: bytes  # Pickled station statistics, detector state and completed-car records
+
+    @property
+    def cars_in_system(self):
+        """Number of cars in the line at the snapshot"""
+        return sum(len(in_service) + len(queued) for in_service, queued in self.stages)
+
+
+def _car_state(car, service_time=None):
+    return CarState(car.car_id, car.arrival_time, tuple(car.start_times), tuple(car.end_times), service_time)
+
+
+def take_snapshot(sim):
+    """
+    Capture a simulation paused by advance().
+
+    Records the queue contents and cars in service (with their processing
+    times) at every station, the station accumulators, bottleneck detector
+    and completed cars, and the position of the arrival stream. Processing
+    times are looked up by car ID, so their streams need no position.
+
+    Args:
+        sim (PaintShopSimulation): Single-shift simulation stopped with advance()
+
+    Returns:
+        SimulationSnapshot: State at sim.env.now
+    """
+    if sim.calendar is not None:
+        raise ValueError("Snapshots of multi-shift runs are not supported")
+    if not sim.started or (sim.accepting and sim.next_arrival_time is None):
+        raise ValueError("Advance the simulation past time 0 before taking a snapshot")
+    if not isinstance(sim.variates, VariateSupply):
+        raise TypeError("Snapshots need a seeded VariateSupply as the source of random times")
+
+    stages = []
+    for station, resource in zip(sim.stations, sim.resources):
+        in_service = tuple(_car_state(request.car, sim.variates.service_time(station.name, request.car.car_id))
+                           for request in resource.users)
+        queued = tuple(_car_state(request.car) for request in resource.queue)
+        stages.append((in_service, queued))
+
+    accumulators = {
+        'stations': sim.stations,
+        'detector': sim.bottleneck_detector,
+        'alert_count': sim.alert_count,
+        'system_time_stats': sim.system_time_stats,
+        'system_time_sketch': sim.system_time_sketch,
+        'cars_completed': sim.cars_completed
+    }
+    return SimulationSnapshot(
+        time=sim.env.now,
+        scenario=sim.scenario,
+        seed=sim.variates.seed,
+        antithetic=sim.variates.antithetic,
+        arrivals_drawn=sim.car_counter + 1,
+        next_arrival_time=sim.next_arrival_time if sim.accepting else None,
+        car_counter=sim.car_counter,
+        stages=tuple(stages),
+        accumulators=pickle.dumps(accumulators, protocol=pickle.HIGHEST_PROTOCOL)
+    )
+
+
+def snapshot_at(time, scenario=None, seed=None, antithetic=False):
+    """
+    Run a shift up to a time and capture it there.
+
+    Args:
+        time (float): Simulation time of the snapshot
+        scenario (Scenario): Scenario to run (default: Scenario.from_config())
+        seed (int or numpy.random.SeedSequence): Seed of the run
+        antithetic (bool): Use the antithetic streams
+
+    Returns:
+        SimulationSnapshot: State at the given time
+    """
+    sim = PaintShopSimulation(scenario, seed=seed, log_level="OFF", verbose=False, antithetic=antithetic)
+    sim.advance(time)
+    return take_snapshot(sim)
+
+
+def restore(snapshot, scenario=None, log_level="OFF", keep_cars=True):
+    """
+    Build a simulation that continues from a snapshot, ready for run().
+
+    The branch may change machine counts, processing distributions,
+    acceptance time and detection thresholds. Cars keep the processing
+    times they had at the snapshot (a car already being served finishes on
+    its old schedule); later services use the branch's distributions on the
+    same random numbers, so branches differ only by the change made.
+    Utilization is computed with the branch's machine counts over the whole
+    shift.
+
+    Args:
+        snapshot (SimulationSnapshot): State to continue from
+        scenario (Scenario): Branch scenario (default: the snapshot's); must
+            have the same stations in the same order
+        log_level (str): Log level of the branch
+        keep_cars (bool): Store completed cars
+
+    Returns:
+        PaintShopSimulation: Simulation at snapshot.time
+    """
+    scenario = resolve_scenario(scenario or snapshot.scenario, log_level=log_level, verbose=False)
+    if scenario.station_names != snapshot.scenario.station_names:
+        raise ValueError("A branch must keep the snapshot's stations (it may change their machines)")
+    for spec, (in_service, _) in zip(scenario.stations, snapshot.stages):
+        if spec.machines < len(in_service):
+            raise ValueError(f"{spec.name} has {len(in_service)} cars in service; "
+                             f"it cannot drop to {spec.machines} machines")
+
+    # Same streams, with the arrival stream moved past the intervals already used
+    variates = VariateSupply(snapshot.seed, scenario=scenario, antithetic=snapshot.antithetic)
+    variates.stream("arrival").take(snapshot.arrivals_drawn)
+
+    sim = PaintShopSimulation(scenario, variates=variates, keep_cars=keep_cars)
+    sim.env = env = simpy.Environment(initial_time=snapshot.time)
+    sim.resources = [simpy.Resource(env, spec.machines) for spec in scenario.stations]
+    sim.drained = env.event()
+
+    state = pickle.loads(snapshot.accumulators)
+    sim.stations = state['stations']
+    for station, spec in zip(sim.stations, scenario.stations):
+        station.num_machines = spec.machines
+    sim.bottleneck_detector = state['detector']
+    sim.bottleneck_detector.threshold = scenario.bottleneck_threshold
+    sim.bottleneck_detector.clear_threshold = scenario.bottleneck_clear_threshold
+    sim.alert_count = state['alert_count']
+    sim.system_time_stats = state['system_time_stats']
+    sim.system_time_sketch = state['system_time_sketch']
+    if keep_cars:
+        sim.cars_completed = state['cars_completed']
+    sim.car_counter = snapshot.car_counter
+    sim.started = True
+
+    # Cars in service claim their machines first, then the queues re-form in order
+    for stage, (in_service, queued) in enumerate(snapshot.stages):
+        for car_state in in_service + queued:
+            car = Car(car_state.car_id, car_state.arrival_time)
+            car.start_times = list(car_state.start_times)
+            car.end_times = list(car_state.end_times)
+            env.process(sim.resume_journey(car, stage, car_state.service_time))
+    sim.cars_in_system = snapshot.cars_in_system
+
+    if snapshot.next_arrival_time is not None:
+        env.process(sim.car_generator(snapshot.next_arrival_time))
+    else:
+        sim.accepting = False
+        if sim.cars_in_system == 0:
+            sim.drained.succeed()
+    return sim
+
+
+def run_branch(branch, snapshot):
+    """
+    Continue a snapshot under one branch scenario and summarize the result.
+
+    Module-level so it can be sent to worker processes.
+
+    Args:
+        branch (Scenario): Branch scenario (None = unchanged)
+        snapshot (SimulationSnapshot): State to continue from
+
+    Returns:
+        dict: Summary from metrics.summarize_results()
+    """
+    return summarize_results(restore(snapshot, branch, keep_cars=False).run())
+
+
+def fork(snapshot, branches, workers=None):
+    """
+    Run several what-if branches from the same snapshot in parallel.
+
+    Each branch simulates only the rest of the shift.
+
+    Args:
+        snapshot (SimulationSnapshot): State to continue from
+        branches (list): Branch scenarios (e.g. snapshot.scenario.with_machines("Painting", 2))
+        workers (int): Worker processes (None = CPU count, 1 = run in this process)
+
+    Returns:
+        list: One summary dict per branch, in order
+    """
+    workers = workers or os.cpu_count() or 1
+    run = partial(run_branch, snapshot=snapshot)
+    if workers == 1 or len(branches) <= 1:
+        return [run(branch) for branch in branches]
+    with ProcessPoolExecutor(max_workers=min(workers, len(branches))) as pool:
+        return list(pool.map(run, branches))
@@ -0,0 +1,160 @@
+# streaming_stats.py
+# Constant-memory running statistics for long simulation runs
+
+import math
+import numpy as np
+
+
+class RunningStats:
+    """
+    Running count, mean, variance, min and max of a stream of values.
+
+    Uses Welford's update, so the mean and variance stay accurate over
+    millions of values without storing any of them.
+    """
+
+    def __init__(self):
+        """Initialize empty statistics"""
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0  # Sum of squared deviations from the mean
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def add(self, value):
+        """Add one value"""
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.total += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def add_many(self, values):
+        """Add an array of values at once"""
+        values = np.asarray(values, dtype=float)
+        if len(values) == 0:
+            return
+        other = RunningStats()
+        other.count = len(values)
+        other.mean = float(values.mean())
+        other.m2 = float(((values - other.mean) ** 2).sum())
+        other.total = float(values.sum())
+        other.min = float(values.min())
+        other.max = float(values.max())
+        self.merge(other)
+
+    def merge(self, other):
+        """Combine another RunningStats into this one (Chan et al. parallel update)"""
+        if other.count == 0:
+            return
+        if self.count == 0:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.total, self.min, self.max = other.total, other.min, other.max
+            return
+
+        count = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / count
+        self.m2 += other.m2 + delta ** 2 * self.count * other.count / count
+        self.count = count
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def get_variance(self):
+        """Sample variance (0 with fewer than two values)"""
+        if self.count < 2:
+            return 0.0
+        return self.m2 / (self.count - 1)
+
+    def get_std(self):
+        """Sample standard deviation"""
+        return math.sqrt(self.get_variance())
+
+    def __repr__(self):
+        return f"RunningStats(count={self.count}, mean={self.mean:.3f})"
+
+
+class QuantileSketch:
+    """
+    Streaming quantile estimates with bounded relative error.
+
+    Values are counted in logarithmically sized buckets: every estimate is
+    within relative_accuracy of a true value at that rank. The number of
+    buckets depends only on the range of values (a few hundred for minutes
+    to weeks), not on how many values were added.
+    """
+
+    def __init__(self, relative_accuracy=0.01, zero_threshold=1e-9):
+        """
+        Initialize an empty sketch.
+
+        Args:
+            relative_accuracy (float): Maximum relative error of estimates
+            zero_threshold (float): Values at or below this count as zero
+        """
+        self.relative_accuracy = relative_accuracy
+        self.zero_threshold = zero_threshold
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = {}  # Bucket index -> count
+        self.zero_count = 0
+        self.count = 0
+
+    def add(self, value):
+        """Add one value"""
+        self.count += 1
+        if value <= self.zero_threshold:
+            self.zero_count += 1
+            return
+        index = math.ceil(math.log(value) / self.log_gamma)
+        self.buckets[index] = self.buckets.get(index, 0) + 1
+
+    def add_many(self, values):
+        """Add an array of values at once"""
+        values = np.asarray(values, dtype=float)
+        self.count += len(values)
+        positive = values[values > self.zero_threshold]
+        self.zero_count += len(values) - len(positive)
+        if len(positive) == 0:
+            return
+        indexes, counts = np.unique(np.ceil(np.log(positive) / self.log_gamma).astype(np.int64), return_counts=True)
+        for index, count in zip(indexes.tolist(), counts.tolist()):
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def merge(self, other):
+        """Combine another sketch with the same accuracy into this one"""
+        self.count += other.count
+        self.zero_count += other.zero_count
+        for index, count in other.buckets.items():
+            self.buckets[index] = self.buckets.get(index, 0) + count
+
+    def get_quantile(self, q):
+        """
+        Estimate a quantile.
+
+        Args:
+            q (float): Quantile between 0 and 1 (e.g. 0.95)
+
+        Returns:
+            float: Estimated value (0 when the sketch is empty)
+        """
+        if self.count == 0:
+            return 0.0
+
+        rank = q * (self.count - 1)
+        seen = self.zero_count
+        if rank < seen:
+            return 0.0
+
+        for index in sorted(self.buckets):
+            seen += self.buckets[index]
+            if rank < seen:
+                # Midpoint of the bucket (gamma^(i-1), gamma^i] in relative terms
+                return 2 * self.gamma ** index / (self.gamma + 1)
+        return 2 * self.gamma ** max(self.buckets) / (self.gamma + 1)
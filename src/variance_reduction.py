@@ -0,0 +1,179 @@
+# variance_reduction.py
+# Compares two scenarios with common random numbers, antithetic pairs and control variates
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+import numpy as np
+from src.capacity_sweep import run_configuration
+from src.fast_engine import draw_line_inputs
+from src.output_analysis import mean_confidence_interval, t_critical
+from src.variates import VariateSupply, distribution_mean
+
+# How the two scenarios' random numbers relate
+INDEPENDENT = "independent"  # Separate seeds for each scenario
+CRN = "crn"  # Same seed for both: each car gets the same arrival and processing times
+ANTITHETIC = "antithetic"  # CRN, and each seed is run with its antithetic twin as well
+METHODS = (INDEPENDENT, CRN, ANTITHETIC)
+
+
+def service_controls(scenario, seed, antithetic=False):
+    """
+    Control variates of one run: realized minus expected mean processing time per station.
+
+    Averaged over the accepted cars. How many cars are accepted depends only
+    on the arrival stream, which is independent of the processing streams,
+    so each control has a known mean of zero.
+
+    Args:
+        scenario (Scenario): Scenario of the run
+        seed (numpy.random.SeedSequence): Seed of the run
+        antithetic (bool): Whether the run used the antithetic streams
+
+    Returns:
+        list: One value per station, in processing order
+    """
+    variates = VariateSupply(seed, scenario=scenario, antithetic=antithetic)
+    _, service_times = draw_line_inputs(variates, scenario.station_names, scenario.acceptance_time)
+    return [
+        float(service_times[spec.name].mean()) - distribution_mean(spec.distribution)
+        if len(service_times[spec.name]) else 0.0
+        for spec in scenario.stations
+    ]
+
+
+def compare_replication(seeds, baseline, alternative, metric, antithetic, engine, controls):
+    """
+    Run one comparison unit: both scenarios, plus their antithetic runs if asked.
+
+    Module-level so it can be sent to worker processes.
+
+    Args:
+        seeds (tuple): (baseline seed, alternative seed)
+        baseline, alternative (Scenario): Scenarios to compare
+        metric (str): Summary metric to compare
+        antithetic (bool): Also run both scenarios on the antithetic streams
+        engine (str): "fast", "heap" or "simpy" (see capacity_sweep.run_configuration())
+        controls (bool): Compute service_controls() for both scenarios
+
+    Returns:
+        dict: 'baseline' and 'alternative' (metric value per run) and
+            'controls' (unit-average controls, baseline's then alternative's)
+    """
+    unit = {'baseline': [], 'alternative': [], 'controls': []}
+    for use_antithetic in ((False, True) if antithetic else (False,)):
+        run_controls = []
+        for key, scenario, seed in (('baseline', baseline, seeds[0]), ('alternative', alternative, seeds[1])):
+            summary = run_configuration(scenario, [seed], engine, use_antithetic)[0]
+            unit[key].append(summary[metric])
+            if controls:
+                run_controls.extend(service_controls(scenario, seed, use_antithetic))
+        unit['controls'].append(run_controls)
+    unit['controls'] = np.mean(unit['controls'], axis=0).tolist()
+    return unit
+
+
+def compare_scenarios(baseline, alternative, metric="avg_system_time", replications=20, method=ANTITHETIC,
+                      control_variates=False, base_seed=None, workers=None, engine="simpy", confidence=None):
+    """
+    Estimate alternative minus baseline for a metric, with variance reduction.
+
+    The variance-reduction factor compares the variance of the estimated
+    difference with what independent runs would give for the same number of
+    simulation runs (estimated from the same runs: the per-run variances of
+    the two scenarios add up when they share nothing). A factor of 10 means
+    independent sampling would need about 10 times as many runs for the same
+    confidence interval.
+
+    Args:
+        baseline (Scenario): Reference scenario
+        alternative (Scenario): Scenario compared against it
+        metric (str): Summary metric (see metrics.summarize_results())
+        replications (int): Comparison units; with "antithetic" each unit is
+            a seed and its antithetic twin, so it costs two runs per scenario
+        method (str): "independent", "crn" or "antithetic" (CRN plus antithetic pairs)
+        control_variates (bool): Adjust the difference by regression on each
+            station's realized mean processing time (service_controls())
+        base_seed (int): Root seed (None = fresh entropy)
+        workers (int): Worker processes (None = CPU count, 1 = run in this process)
+        engine (str): "simpy", "heap" or "fast" (see capacity_sweep.run_configuration())
+        confidence (float): Confidence level (default: the baseline's confidence_level)
+
+    Returns:
+        dict: 'difference' (interval of alternative - baseline), 'baseline'
+            and 'alternative' (intervals), 'variance_reduction_factor',
+            'equivalent_independent_runs', 'runs', 'control_coefficients' and
+            'wall_time'
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method!r} (expected one of {', '.join(METHODS)})")
+    start = time.perf_counter()
+    if confidence is None:
+        confidence = baseline.confidence_level
+    workers = workers or os.cpu_count() or 1
+
+    # The alternative's seeds are the baseline's unless the runs are independent
+    root_seeds = np.random.SeedSequence(base_seed).spawn(2 * replications if method == INDEPENDENT else replications)
+    baseline_seeds = root_seeds[:replications]
+    alternative_seeds = root_seeds[replications:] if method == INDEPENDENT else baseline_seeds
+    pairs = list(zip(baseline_seeds, alternative_seeds))
+
+    run_unit = partial(compare_replication, baseline=baseline, alternative=alternative, metric=metric,
+                       antithetic=method == ANTITHETIC, engine=engine, controls=control_variates)
+    if workers == 1 or len(pairs) <= 1:
+        units = [run_unit(seeds) for seeds in pairs]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            units = list(pool.map(run_unit, pairs, chunksize=max(1, len(pairs) // (workers * 4))))
+
+    runs_per_unit = 2 if method == ANTITHETIC else 1
+    baseline_runs = np.array([unit['baseline'] for unit in units])
+    alternative_runs = np.array([unit['alternative'] for unit in units])
+    differences = alternative_runs.mean(axis=1) - baseline_runs.mean(axis=1)
+
+    # Control variates: regress the differences on the (zero-mean) controls
+    coefficients = []
+    degrees_of_freedom = replications - 1
+    if control_variates:
+        controls = np.array([unit['controls'] for unit in units])
+        controls = controls[:, np.sort(np.unique(controls, axis=1, return_index=True)[1])]  # Shared draws repeat
+        controls = controls[:, controls.std(axis=0) > 0]
+        degrees_of_freedom = replications - controls.shape[1] - 1
+        if degrees_of_freedom < 1:
+            raise ValueError(f"Control variates need more than {controls.shape[1] + 1} replications")
+        centered = controls - controls.mean(axis=0)
+        coefficients = np.linalg.lstsq(centered, differences - differences.mean(), rcond=None)[0]
+        differences = differences - controls @ coefficients
+        coefficients = coefficients.tolist()
+
+    mean = float(differences.mean())
+    variance = float(((differences - mean) ** 2).sum() / degrees_of_freedom)
+    half_width = t_critical(degrees_of_freedom, confidence) * (variance / replications) ** 0.5
+
+    # Variance of one run of each scenario, as independent sampling would see it
+    independent_variance = float(baseline_runs.var(ddof=1) + alternative_runs.var(ddof=1))
+    factor = independent_variance / (runs_per_unit * variance) if variance > 0 else float("inf")
+
+    return {
+        'metric': metric,
+        'method': method,
+        'control_variates': control_variates,
+        'engine': engine,
+        'replications': replications,
+        'runs': 2 * replications * runs_per_unit,
+        'baseline': mean_confidence_interval(baseline_runs.mean(axis=1).tolist(), confidence),
+        'alternative': mean_confidence_interval(alternative_runs.mean(axis=1).tolist(), confidence),
+        'difference': {
+            'mean': mean,
+            'std': variance ** 0.5,
+            'half_width': half_width,
+            'low': mean - half_width,
+            'high': mean + half_width,
+            'n': replications
+        },
+        'variance_reduction_factor': factor,
+        'equivalent_independent_runs': 2 * replications * runs_per_unit * factor,
+        'control_coefficients': coefficients,
+        'wall_time': time.perf_counter() - start
+    }
@@ -0,0 +1,350 @@
+# variates.py
+# Sources of random arrival and service times for the simulation engines
+
+import math
+import zlib
+import numpy as np
+from src.scenario import resolve_scenario
+
+
+def default_distributions(scenario=None):
+    """
+    Return the distribution spec for each random stream.
+
+    Stream "arrival" holds the time between arrivals; every other stream is
+    named after the station whose processing times it supplies.
+
+    Args:
+        scenario (Scenario): Scenario to take distributions from
+            (default: Scenario.from_config())
+    """
+    scenario = resolve_scenario(scenario)
+    distributions = {"arrival": scenario.arrival_distribution}
+    for name, machines, distribution in scenario.stations:
+        distributions[name] = distribution
+    return distributions
+
+
+def make_sampler(spec, antithetic=False):
+    """
+    Build a block sampler from a distribution spec.
+
+    Every distribution is sampled by inversion from one uniform (or, for the
+    lognormal, one standard normal) draw per value, which gives the same
+    values as numpy's own samplers. With antithetic=True each draw u is
+    replaced by 1 - u (z by -z), so a stream and its antithetic twin are
+    negatively correlated value by value.
+
+    Supported specs:
+        ("uniform", low, high)
+        ("triangular", low, mode, high)
+        ("lognormal", mean, std)  - mean and std of the times themselves
+        ("empirical", values)     - measured cycle times, sampled by
+                                    interpolating their empirical CDF
+
+    Args:
+        spec (tuple): Distribution name followed by its parameters
+        antithetic (bool): Produce the antithetic stream
+
+    Returns:
+        function: sampler(generator, size) -> numpy array of draws
+    """
+    kind = spec[0]
+
+    def uniforms(generator, size):
+        u = generator.random(size)
+        return 1.0 - u if antithetic else u
+
+    if kind == "uniform":
+        low, high = spec[1], spec[2]
+        return lambda generator, size: low + (high - low) * uniforms(generator, size)
+
+    if kind == "triangular":
+        low, mode, high = spec[1], spec[2], spec[3]
+        width = high - low
+        ratio = (mode - low) / width
+
+        def triangular(generator, size):
+            u = uniforms(generator, size)
+            return np.where(u <= ratio, low + np.sqrt(u * (mode - low) * width),
+                            high - np.sqrt((1.0 - u) * (high - mode) * width))
+
+        return triangular
+
+    if kind == "lognormal":
+        mean, std = spec[1], spec[2]
+        sigma = math.sqrt(math.log(1 + (std / mean) ** 2))
+        mu = math.log(mean) - sigma ** 2 / 2
+        if antithetic:
+            sigma = -sigma
+        return lambda generator, size: np.exp(mu + sigma * generator.standard_normal(size))
+
+    if kind == "empirical":
+        values = np.sort(np.asarray(spec[1], dtype=float))
+        if len(values) == 0:
+            raise ValueError("Empirical distribution needs at least one measured value")
+        cdf_points = np.linspace(0, 1, len(values))
+        return lambda generator, size: np.interp(uniforms(generator, size), cdf_points, values)
+
+    raise ValueError(f"Unknown distribution: {kind!r}")
+
+
+def distribution_mean(spec):
+    """
+    Return the mean of a distribution spec (see make_sampler() for the formats).
+
+    Args:
+        spec (tuple): Distribution name followed by its parameters
+    """
+    kind = spec[0]
+    if kind == "uniform":
+        return (spec[1] + spec[2]) / 2
+    if kind == "triangular":
+        return (spec[1] + spec[2] + spec[3]) / 3
+    if kind == "lognormal":
+        return spec[1]
+    if kind == "empirical":
+        values = np.sort(np.asarray(spec[1], dtype=float))
+        if len(values) == 1:
+            return float(values[0])
+        # Mean of the piecewise-linear inverse CDF used by the sampler
+        return float(((values[:-1] + values[1:]) / 2).mean())
+    raise ValueError(f"Unknown distribution: {kind!r}")
+
+
+def distribution_variance(spec):
+    """
+    Return the variance of a distribution spec (see make_sampler() for the formats).
+
+    Args:
+        spec (tuple): Distribution name followed by its parameters
+    """
+    kind = spec[0]
+    if kind == "uniform":
+        return (spec[2] - spec[1]) ** 2 / 12
+    if kind == "triangular":
+        low, mode, high = spec[1], spec[2], spec[3]
+        return (low ** 2 + mode ** 2 + high ** 2 - low * mode - low * high - mode * high) / 18
+    if kind == "lognormal":
+        return spec[2] ** 2
+    if kind == "empirical":
+        values = np.sort(np.asarray(spec[1], dtype=float))
+        if len(values) == 1:
+            return 0.0
+        # The sampler is uniform between neighbouring values, each segment equally likely
+        low, high = values[:-1], values[1:]
+        second_moment = ((low ** 2 + low * high + high ** 2) / 3).mean()
+        return float(second_moment - distribution_mean(spec) ** 2)
+    raise ValueError(f"Unknown distribution: {kind!r}")
+
+
+def scale_distribution(spec, factor):
+    """
+    Return a spec whose draws are the original draws times factor.
+
+    Args:
+        spec (tuple): Distribution name followed by its parameters
+        factor (float): Positive scale factor (e.g. 0.5 halves every time)
+    """
+    kind = spec[0]
+    if kind in ("uniform", "triangular", "lognormal"):
+        return (kind,) + tuple(value * factor for value in spec[1:])
+    if kind == "empirical":
+        return (kind, tuple(value * factor for value in spec[1]))
+    raise ValueError(f"Unknown distribution: {kind!r}")
+
+
+def stream_seed(seed, name):
+    """
+    Derive the seed of a named stream from a run's seed.
+
+    The stream key comes from the name alone, so a station's stream does not
+    change when other stations are added, removed or reordered.
+
+    Args:
+        seed (numpy.random.SeedSequence): Seed of the run
+        name (str): Stream name
+
+    Returns:
+        numpy.random.SeedSequence: Seed for the stream
+    """
+    return np.random.SeedSequence(seed.entropy, spawn_key=seed.spawn_key + (zlib.crc32(name.encode()),))
+
+
+class VariateStream:
+    """
+    One random stream, drawn in large blocks and handed out one value at a time.
+
+    Block k of the stream is drawn from its own generator, seeded from the
+    stream's seed and k, so any block can be drawn again on demand. Values
+    are either consumed in order (next(), take()) or looked up by position
+    (at()); a stream should be used one way or the other.
+    """
+
+    def __init__(self, seed, spec, block_size=4096, antithetic=False, cached_blocks=4):
+        """
+        Initialize the stream.
+
+        Args:
+            seed (numpy.random.SeedSequence): Seed for this stream
+            spec (tuple): Distribution spec (see make_sampler())
+            block_size (int): Values per block
+            antithetic (bool): Draw the antithetic twin of the stream
+            cached_blocks (int): Blocks at() keeps; an older one is drawn again if asked for
+        """
+        self.seed = seed
+        self.sampler = make_sampler(spec, antithetic)
+        self.block_size = block_size
+        self.cached_blocks = max(1, cached_blocks)
+        self._block = None
+        self._buffer = []
+        self._position = 0
+        self._next_block = 0  # Index of the block the next refill draws
+        self._recent = {}  # Block index -> values, the blocks at() used last (oldest first)
+
+    def _draw(self, block_index):
+        """Draw block block_index of the stream"""
+        seed = np.random.SeedSequence(self.seed.entropy, spawn_key=self.seed.spawn_key + (block_index,))
+        return self.sampler(np.random.default_rng(seed), self.block_size)
+
+    def _refill(self):
+        """Draw the next block (also kept as a list: indexing it is cheaper than an array)"""
+        self._block = self._draw(self._next_block)
+        self._buffer = self._block.tolist()
+        self._position = 0
+        self._next_block += 1
+
+    def next(self):
+        """Return the next value in the stream"""
+        if self._position >= len(self._buffer):
+            self._refill()
+        value = self._buffer[self._position]
+        self._position += 1
+        return value
+
+    def take(self, count):
+        """
+        Return the next count values as an array.
+
+        Gives exactly the values count calls to next() would have returned.
+        """
+        parts = []
+        remaining = count
+        while remaining > 0:
+            if self._position >= len(self._buffer):
+                self._refill()
+            chunk = self._block[self._position:self._position + remaining]
+            self._position += len(chunk)
+            remaining -= len(chunk)
+            parts.append(chunk)
+        return np.concatenate(parts) if parts else np.empty(0)
+
+    def at(self, index):
+        """
+        Return the value at a position of the stream (0-based).
+
+        Gives the value the index-th call to next() would have returned,
+        whatever order positions are asked for in. Only the last few blocks
+        are kept, so memory stays flat however long the stream gets.
+        """
+        block_index, offset = divmod(index, self.block_size)
+        values = self._recent.get(block_index)
+        if values is None:
+            if len(self._recent) >= self.cached_blocks:
+                del self._recent[next(iter(self._recent))]
+            values = self._recent[block_index] = self._draw(block_index).tolist()
+        return values[offset]
+
+
+class VariateSupply:
+    """
+    Arrival and service times, one independent buffered stream per quantity.
+
+    Each station always draws from its own stream, and a car's processing
+    time is the value at its car ID in that stream. So with the same seed
+    (common random numbers) the same car arrives at the same time and gets
+    the same processing times whatever the machine counts, the order cars
+    reach a station in, or the other stations' distributions.
+    """
+
+    def __init__(self, seed=None, distributions=None, block_size=None, scenario=None, antithetic=False):
+        """
+        Initialize the supply.
+
+        Args:
+            seed (int or numpy.random.SeedSequence): Seed for the run
+                (None draws fresh entropy)
+            distributions (dict): Stream name -> distribution spec, overriding the scenario
+            block_size (int): Values per stream block (default: the scenario's variate_block_size)
+            scenario (Scenario): Scenario to take distributions from (default: Scenario.from_config())
+            antithetic (bool): Draw every stream's antithetic twin (see make_sampler())
+        """
+        scenario = resolve_scenario(scenario)
+        if not isinstance(seed, np.random.SeedSequence):
+            seed = np.random.SeedSequence(seed)
+        self.seed = seed
+        self.block_size = block_size or scenario.variate_block_size
+        self.antithetic = antithetic
+
+        self.distributions = default_distributions(scenario)
+        if distributions:
+            self.distributions.update(distributions)
+
+        self._streams = {}
+
+    def stream(self, name):
+        """Return the stream with this name, creating it on first use"""
+        stream = self._streams.get(name)
+        if stream is None:
+            stream = VariateStream(stream_seed(self.seed, name), self.distributions[name], self.block_size,
+                                   self.antithetic)
+            self._streams[name] = stream
+        return stream
+
+    def arrival_interval(self):
+        """Return the time until the next car arrives"""
+        return self.stream("arrival").next()
+
+    def service_time(self, station_name, car_id=None):
+        """
+        Return a car's processing time at a station.
+
+        Args:
+            station_name (str): Station name
+            car_id (int): Car ID (from 1); None takes the next value in the stream
+        """
+        if car_id is None:
+            return self.stream(station_name).next()
+        return self.stream(station_name).at(car_id - 1)
+
+
+class ArrayVariates:
+    """
+    Hands out pre-drawn arrival and service times in order.
+
+    Each station has its own sequence, indexed by car ID (or consumed in
+    order when no car ID is given). Feeding the same arrays to two engines
+    makes them see identical random draws car by car.
+    """
+
+    def __init__(self, interarrival_times, service_times):
+        """
+        Initialize the variate source.
+
+        Args:
+            interarrival_times (sequence): Times between consecutive arrivals
+            service_times (dict): Station name -> sequence of processing times
+        """
+        self._arrivals = iter(interarrival_times)
+        self._service_times = service_times
+        self._services = {name: iter(times) for name, times in service_times.items()}
+
+    def arrival_interval(self):
+        """Return the time until the next car arrives"""
+        return float(next(self._arrivals))
+
+    def service_time(self, station_name, car_id=None):
+        """Return a car's processing time at a station (the next one if car_id is None)"""
+        if car_id is None:
+            return float(next(self._services[station_name]))
+        return float(self._service_times[station_name][car_id - 1])
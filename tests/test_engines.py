@@ -0,0 +1,22 @@
+# test_engines.py
+# The fast and heap engines must reproduce the SimPy engine car by car on the same seed
+
+import pytest
+import config
+from src.event_engine import validate_event_engine
+from src.fast_engine import validate_against_simpy
+
+SEEDS = (0, 1, 7, 42, 2024)
+LINES = {"overloaded": config.LINE_STATIONS, "balanced": config.BALANCED_LINE_STATIONS}
+
+
+@pytest.mark.parametrize("line", sorted(LINES))
+@pytest.mark.parametrize("seed", SEEDS)
+def test_event_engine_matches_simpy(seed, line):
+    assert validate_event_engine(seed, stations=LINES[line])['match']
+
+
+@pytest.mark.parametrize("line", sorted(LINES))
+@pytest.mark.parametrize("seed", SEEDS)
+def test_fast_engine_matches_simpy(seed, line):
+    assert validate_against_simpy(seed, stations=LINES[line])['match']